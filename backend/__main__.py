@@ -1,5 +1,9 @@
 # backend/__main__.py
+import argparse
+import asyncio
+import json
 import os
+import signal
 from dotenv import load_dotenv, find_dotenv
 import uvicorn
 
@@ -18,11 +22,320 @@ def _load_env():
     if f and not os.path.exists(f):
         print(f"[warn] FONT_ZH_PATH 指向的檔案不存在：{f}")
 
-def main():
-    _load_env()
+def _serve(args: argparse.Namespace):
     host = os.getenv("APP_HOST", "0.0.0.0")
     port = int(os.getenv("APP_PORT", "8000"))
-    uvicorn.run("backend.app.main:app", host=host, port=port, reload=True)
+    production = getattr(args, "prod", False) or os.getenv("APP_MODE", "").lower() == "production"
+    if not production:
+        uvicorn.run("backend.app.main:app", host=host, port=port, reload=True)
+        return
+
+    from backend.app.core.prefork import run_prefork
+
+    workers = getattr(args, "workers", None) or int(os.getenv("APP_WORKERS", "0")) or (os.cpu_count() or 1)
+    graceful = getattr(args, "graceful_timeout", None) or int(os.getenv("APP_GRACEFUL_TIMEOUT", "30"))
+    run_prefork(host, port, workers=workers, graceful_timeout=graceful)
+
+def _worker(args: argparse.Namespace):
+    if args.backend:
+        os.environ["TASK_QUEUE_BACKEND"] = args.backend
+    if args.queue_url:
+        os.environ["TASK_QUEUE_URL"] = args.queue_url
+
+    # config 於 import 時讀取環境變數，因此在設定完成後才載入
+    from backend.app.core.config import TASK_QUEUE_BACKEND, TASK_QUEUE_SECRET, TASK_WORKER_CONCURRENCY
+    from backend.app.services.queue.tasks import run_worker
+
+    if TASK_QUEUE_BACKEND in {"local", "memory"}:
+        raise SystemExit("worker 需要跨行程佇列：請設定 TASK_QUEUE_BACKEND=sqlite 或 redis。")
+    if not TASK_QUEUE_SECRET:
+        print("[worker] 未設定 TASK_QUEUE_SECRET：API 不會送出頁面摘要工作，只處理關鍵字等 CPU 工作")
+
+    async def _main():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        print(f"[worker] backend={TASK_QUEUE_BACKEND} concurrency={args.concurrency or TASK_WORKER_CONCURRENCY}")
+        await run_worker(concurrency=args.concurrency or TASK_WORKER_CONCURRENCY, stop_event=stop)
+
+    asyncio.run(_main())
+
+def _import_budget(args: argparse.Namespace):
+    from backend.perf.import_budget import DEFAULT_BUDGET_MS, run
+
+    raise SystemExit(run(budget_ms=args.budget_ms or DEFAULT_BUDGET_MS))
+
+def _fake_llm_config(args: argparse.Namespace):
+    from backend.perf.fake_llm import FakeLLMConfig
+
+    return FakeLLMConfig(
+        latency_ms=args.latency_ms,
+        latency_dist=args.latency_dist,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed,
+    )
+
+def _add_fake_llm_args(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="延遲中位數（毫秒）")
+    parser.add_argument("--latency-dist", choices=["fixed", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="lognormal sigma / uniform 的 ±比例")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="回傳 500 的比例")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="回傳 429 的比例")
+    parser.add_argument("--seed", type=int, default=0)
+
+def _fake_llm(args: argparse.Namespace):
+    from backend.perf.fake_llm import FakeLLMServer
+
+    server = FakeLLMServer(_fake_llm_config(args), host=args.host, port=args.port)
+    print(f"[fake-llm] listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+def _loadtest(args: argparse.Namespace):
+    from backend.perf.fake_llm import FakeLLMServer
+    from backend.perf.loadgen import LoadConfig, format_report, run_load
+
+    form = {"llm_model": args.llm_model, "llm_api_key": args.llm_api_key or "sk-fake"}
+    if args.stages:
+        form["stages"] = args.stages
+    if args.llm_fast_model:
+        form["llm_fast_model"] = args.llm_fast_model
+    if args.summary_mode:
+        form["summary_mode"] = args.summary_mode
+    fake = None
+    if args.fake_llm:
+        fake = FakeLLMServer(_fake_llm_config(args)).start()
+        form["llm_base_url"] = fake.base_url
+    elif args.llm_base_url:
+        form["llm_base_url"] = args.llm_base_url
+
+    config = LoadConfig(
+        target=args.target.rstrip("/"),
+        endpoint=args.endpoint,
+        files=args.files,
+        concurrency=args.concurrency,
+        requests=args.requests,
+        form=form,
+    )
+    try:
+        report = asyncio.run(run_load(config))
+    finally:
+        if fake is not None:
+            fake_stats = fake.stats
+            fake.stop()
+            print(f"[fake-llm] {fake_stats}")
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, ensure_ascii=False, indent=2)
+
+def _csv(value: str):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+def _corpus(args: argparse.Namespace):
+    from backend.perf.bench import BENCH_DIR
+    from backend.perf.corpus import build_corpus
+
+    paths = build_corpus(
+        args.out or os.path.join(BENCH_DIR, "corpus"),
+        page_counts=[int(p) for p in _csv(args.pages)],
+        langs=_csv(args.langs),
+        formats=_csv(args.formats),
+        paragraphs_per_page=args.paragraphs,
+        seed=args.seed,
+    )
+    for path in paths:
+        print(path)
+
+def _bench(args: argparse.Namespace):
+    from backend.perf.bench import DEFAULT_BASELINE, main as bench_main
+
+    raise SystemExit(
+        bench_main(
+            page_counts=[int(p) for p in _csv(args.pages)],
+            langs=_csv(args.langs),
+            formats=_csv(args.formats),
+            patterns=args.filter or [],
+            repeat=args.repeat,
+            baseline_path=args.baseline or DEFAULT_BASELINE,
+            write_baseline=args.save_baseline,
+            threshold=args.threshold,
+            json_path=args.json,
+        )
+    )
+
+def _membench(args: argparse.Namespace):
+    from backend.perf.memory import main as membench_main
+
+    raise SystemExit(
+        membench_main(
+            page_counts=[int(p) for p in _csv(args.pages)],
+            langs=_csv(args.langs),
+            formats=_csv(args.formats),
+            json_path=args.json,
+        )
+    )
+
+def _pdfbench(args: argparse.Namespace):
+    from backend.perf.pdfbench import main as pdfbench_main
+
+    raise SystemExit(
+        pdfbench_main(
+            paths=args.paths,
+            page_counts=[int(p) for p in _csv(args.pages)],
+            langs=_csv(args.langs),
+            backends=_csv(args.backends) if args.backends else None,
+            repeat=args.repeat,
+            json_path=args.json,
+        )
+    )
+
+def _analyze(args: argparse.Namespace):
+    from backend.app.services.analyze.bulk import BulkConfig, run_bulk
+    from backend.app.services.analyze.pipeline import PipelineInputError, build_pipeline_request
+
+    try:
+        settings, options = build_pipeline_request(
+            llm_api_key=args.llm_api_key or os.getenv("LLM_API_KEY") or None,
+            llm_base_url=args.llm_base_url or os.getenv("LLM_BASE_URL") or None,
+            llm_model=args.llm_model,
+            stages=args.stages,
+            summary_mode=args.summary_mode,
+            llm_fast_model=args.llm_fast_model,
+        )
+    except PipelineInputError as exc:
+        raise SystemExit(f"[bulk] {exc}") from exc
+
+    config = BulkConfig(
+        root=args.path,
+        out_path=args.out,
+        manifest_path=args.manifest,
+        workers=args.workers or (os.cpu_count() or 1),
+        documents_in_flight=args.in_flight,
+        llm_concurrency=args.llm_concurrency,
+        retry_failed=args.retry_failed,
+        limit=args.limit,
+    )
+    report = asyncio.run(run_bulk(config, settings, options))
+    print(
+        f"[bulk] 完成 {report.succeeded}，失敗 {report.failed}，略過 {report.skipped}；"
+        f"{report.pages} 頁，{report.elapsed_s:.1f}s，{report.docs_per_minute:.1f} docs/min"
+    )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(report.as_dict(), handle, ensure_ascii=False, indent=2)
+    raise SystemExit(1 if report.failed else 0)
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m backend")
+    sub = parser.add_subparsers(dest="command")
+
+    serve = sub.add_parser("serve", help="啟動 API 服務（預設；開發模式含自動重載）")
+    serve.add_argument("--prod", action="store_true", help="正式模式：pre-fork 多 worker、不重載（或設 APP_MODE=production）")
+    serve.add_argument("--workers", type=int, default=None, help="worker 數量（預設 APP_WORKERS 或 CPU 核心數）")
+    serve.add_argument("--graceful-timeout", type=int, default=None, help="SIGTERM 後等待請求排空的秒數")
+    serve.set_defaults(handler=_serve)
+
+    worker = sub.add_parser("worker", help="從工作佇列執行頁面摘要與 CPU 工作")
+    worker.add_argument("--concurrency", type=int, default=None, help="同時處理的工作數")
+    worker.add_argument("--backend", choices=["sqlite", "redis"], default=None, help="覆寫 TASK_QUEUE_BACKEND")
+    worker.add_argument("--queue-url", default=None, help="覆寫 TASK_QUEUE_URL（SQLite 路徑或 redis:// URL）")
+    worker.set_defaults(handler=_worker)
+
+    analyze = sub.add_parser("analyze", help="離線批次分析整個目錄，結果寫成 JSONL（可中斷後續跑）")
+    analyze.add_argument("path", help="要分析的目錄（遞迴）或單一檔案")
+    analyze.add_argument("--out", default="results.jsonl", help="結果 JSONL，每份文件一行")
+    analyze.add_argument("--manifest", default=None, help="檢查點檔（預設 <out>.manifest.jsonl）")
+    analyze.add_argument("--stages", default="summary,keywords")
+    analyze.add_argument("--summary-mode", default="llm", choices=("llm", "local", "auto"))
+    analyze.add_argument("--llm-model", default=os.getenv("LLM_MODEL", "gpt-5-mini-2025-08-07"))
+    analyze.add_argument("--llm-fast-model", default=None, help="輕量頁面改用的模型（模型分流）")
+    analyze.add_argument("--llm-api-key", default=None, help="預設讀 LLM_API_KEY")
+    analyze.add_argument("--llm-base-url", default=None, help="預設讀 LLM_BASE_URL")
+    analyze.add_argument("--workers", type=int, default=None, help="解析用的 process 數（預設 CPU 核心數）")
+    analyze.add_argument("--llm-concurrency", type=int, default=8, help="所有文件共用的 LLM 並行數")
+    analyze.add_argument("--in-flight", type=int, default=0, help="同時處理的文件數上限（預設 workers×2）")
+    analyze.add_argument("--retry-failed", action="store_true", help="續跑時重試先前失敗的檔案")
+    analyze.add_argument("--limit", type=int, default=None, help="本次最多處理幾份（分批回填用）")
+    analyze.add_argument("--json", default=None, help="另存吞吐量報告")
+    analyze.set_defaults(handler=_analyze)
+
+    budget = sub.add_parser("import-budget", help="檢查 backend.app.main 的冷啟動 import 時間與延遲載入")
+    budget.add_argument("--budget-ms", type=float, default=None, help="允許的 import 時間（預設 IMPORT_BUDGET_MS 或 1500）")
+    budget.set_defaults(handler=_import_budget)
+
+    fake = sub.add_parser("fake-llm", help="啟動離線用的 OpenAI 相容 fake server")
+    fake.add_argument("--host", default="127.0.0.1")
+    fake.add_argument("--port", type=int, default=9100)
+    _add_fake_llm_args(fake)
+    fake.set_defaults(handler=_fake_llm)
+
+    load = sub.add_parser("loadtest", help="對執行中的 API 壓測 /analyze 或 /mindmap")
+    load.add_argument("files", nargs="+", help="輪流上傳的檔案")
+    load.add_argument("--target", default=os.getenv("LOADTEST_TARGET", "http://127.0.0.1:8000"))
+    load.add_argument("--endpoint", choices=["analyze", "mindmap"], default="analyze")
+    load.add_argument("--concurrency", type=int, default=4)
+    load.add_argument("--requests", type=int, default=20, help="總請求數")
+    load.add_argument("--stages", default=None, help="/analyze 的 stages 參數")
+    load.add_argument("--llm-model", default="fake-model")
+    load.add_argument("--llm-fast-model", default=None, help="輕量頁面改用的模型（模型分流）")
+    load.add_argument("--summary-mode", default=None, choices=("llm", "local", "auto"))
+    load.add_argument("--llm-api-key", default=None)
+    load.add_argument("--llm-base-url", default=None)
+    load.add_argument("--fake-llm", action="store_true", help="在本行程啟動 fake LLM 並讓 API 連到它")
+    load.add_argument("--json", default=None, help="另存 JSON 報告")
+    _add_fake_llm_args(load)
+    load.set_defaults(handler=_loadtest)
+
+    corpus = sub.add_parser("corpus", help="產生合成文件語料（PDF/DOCX/PPTX/MD/TXT）")
+    corpus.add_argument("--out", default=None, help="輸出目錄（預設 storage/bench/corpus）")
+    corpus.add_argument("--pages", default="20", help="頁數，可用逗號列出多個，例如 50,500")
+    corpus.add_argument("--langs", default="zh,en,mixed")
+    corpus.add_argument("--formats", default="pdf,docx,pptx,md,txt")
+    corpus.add_argument("--paragraphs", type=int, default=4, help="每頁段落數")
+    corpus.add_argument("--seed", type=int, default=0)
+    corpus.set_defaults(handler=_corpus)
+
+    bench = sub.add_parser("bench", help="執行 micro-benchmark 並與 JSON 基準比較")
+    bench.add_argument("--pages", default="50")
+    bench.add_argument("--langs", default="zh,en,mixed")
+    bench.add_argument("--formats", default="pdf,docx,pptx,md,txt")
+    bench.add_argument("--filter", action="append", help="只跑符合 glob 的項目，例如 'parse_pages.*'")
+    bench.add_argument("--repeat", type=int, default=5)
+    bench.add_argument("--baseline", default=None, help="基準檔（預設 storage/bench/baseline.json）")
+    bench.add_argument("--save-baseline", action="store_true", help="把本次結果寫入基準檔")
+    bench.add_argument("--threshold", type=float, default=None, help="覆寫退步門檻（0.25 = 25%%）")
+    bench.add_argument("--json", default=None, help="另存本次結果")
+    bench.set_defaults(handler=_bench)
+
+    membench = sub.add_parser("membench", help="比較舊版與精簡文件表示法的記憶體用量（各自在子行程量測）")
+    membench.add_argument("--pages", default="1000")
+    membench.add_argument("--langs", default="zh")
+    membench.add_argument("--formats", default="txt,md,pdf")
+    membench.add_argument("--json", default=None, help="另存本次結果")
+    membench.set_defaults(handler=_membench)
+
+    pdfbench = sub.add_parser("pdfbench", help="比較各 PDF 引擎的速度與取字量，建議 PDF_BACKEND")
+    pdfbench.add_argument("paths", nargs="*", help="自備的 PDF；省略時使用合成語料")
+    pdfbench.add_argument("--pages", default="50")
+    pdfbench.add_argument("--langs", default="zh,en,mixed")
+    pdfbench.add_argument("--backends", default=None, help="逗號分隔，預設為全部已安裝的引擎")
+    pdfbench.add_argument("--repeat", type=int, default=3)
+    pdfbench.add_argument("--json", default=None, help="另存本次結果")
+    pdfbench.set_defaults(handler=_pdfbench)
+
+    parser.set_defaults(handler=_serve)
+    return parser
+
+def main(argv=None):
+    args = _build_parser().parse_args(argv)
+    _load_env()
+    args.handler(args)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,255 @@
+"""Memory/CPU-aware admission control for document pipelines."""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+import re
+import zipfile
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, Deque, Optional
+
+from backend.app.core.config import (
+    ADMISSION_CPU_UNITS,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_MAX_WAIT_S,
+    ADMISSION_MEMORY_MB,
+    ADMISSION_RETRY_AFTER_S,
+)
+from backend.app.core.metrics import ADMISSION_REJECTED, ADMISSION_RESERVED, QUEUE_DEPTH
+
+MB = 1024 * 1024
+# 每個 pipeline 的固定開銷：文字雲點陣圖、NLP 中間結構、回應序列化
+BASE_MEMORY = 64 * MB
+PER_PAGE_MEMORY = 256 * 1024
+# 解析後的尖峰記憶體相對於檔案大小的倍數（DOCX / PPTX 是壓縮的 XML，展開後遠大於檔案）
+MEMORY_FACTORS = {".pdf": 4, ".docx": 10, ".pptx": 6, ".md": 6, ".txt": 6}
+DEFAULT_MEMORY_FACTOR = 6
+PAGES_PER_CPU_UNIT = 200
+MB_PER_CPU_UNIT = 25
+
+PositionCallback = Callable[[int, int], Awaitable[None]]
+
+
+@dataclass
+class JobCost:
+    memory: int
+    cpu: int
+
+
+class AdmissionRejected(Exception):
+    """排隊已滿或等待逾時；HTTP 層轉成 503 並帶 Retry-After。"""
+
+    def __init__(self, message: str, retry_after: int, reason: str):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+_DOCX_PAGES = re.compile(rb"<Pages>(\d+)</Pages>")
+
+
+def probe_page_count(path: str) -> Optional[int]:
+    """不做完整解析，只讀結構資訊估算頁數；無法判斷時回傳 None。"""
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        if ext == ".pdf":
+            from backend.app.services.parsing.pdf_backends import pdf_page_count
+
+            return pdf_page_count(path)
+        if ext == ".pptx":
+            with zipfile.ZipFile(path) as archive:
+                return sum(
+                    1 for name in archive.namelist() if name.startswith("ppt/slides/slide") and name.endswith(".xml")
+                )
+        if ext == ".docx":
+            with zipfile.ZipFile(path) as archive:
+                match = _DOCX_PAGES.search(archive.read("docProps/app.xml"))
+                return int(match.group(1)) if match else None
+    except Exception:  # pylint: disable=broad-except
+        return None
+    return None
+
+
+def estimate_cost(size: int, ext: str, pages: Optional[int] = None) -> JobCost:
+    factor = MEMORY_FACTORS.get(ext.lower(), DEFAULT_MEMORY_FACTOR)
+    memory = BASE_MEMORY + size * factor + (pages or 0) * PER_PAGE_MEMORY
+    if pages:
+        cpu = 1 + pages // PAGES_PER_CPU_UNIT
+    else:
+        cpu = 1 + size // (MB_PER_CPU_UNIT * MB)
+    return JobCost(memory=memory, cpu=int(cpu))
+
+
+def estimate_file_cost(path: str) -> JobCost:
+    return estimate_cost(os.path.getsize(path), os.path.splitext(path)[1], probe_page_count(path))
+
+
+class _Ticket:
+    __slots__ = ("cost", "granted", "wake")
+
+    def __init__(self, cost: JobCost):
+        self.cost = cost
+        self.granted = False
+        self.wake = asyncio.Event()
+
+
+class AdmissionController:
+    """
+    以記憶體（bytes）與 CPU 單位兩種預算控制同時執行的 pipeline 數。
+    超出預算的工作依 FIFO 排隊（不插隊，避免大檔案餓死）；沒有任何工作在跑時，
+    即使單一工作超過預算也放行。每個行程各自一份預算（prefork 時為單一 worker 的預算）。
+    """
+
+    def __init__(
+        self,
+        memory_budget: int = ADMISSION_MEMORY_MB * MB,
+        cpu_budget: int = ADMISSION_CPU_UNITS,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        max_wait: float = ADMISSION_MAX_WAIT_S,
+        retry_after: int = ADMISSION_RETRY_AFTER_S,
+    ):
+        self.memory_budget = memory_budget
+        self.cpu_budget = max(1, cpu_budget)
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.retry_after = retry_after
+        self._memory = 0
+        self._cpu = 0
+        self._running = 0
+        self._waiters: Deque[_Ticket] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def reserved_memory(self) -> int:
+        return self._memory
+
+    def check_queue(self) -> None:
+        """串流開始前先檢查，佇列已滿就直接回 503。"""
+        if self.max_queue >= 0 and len(self._waiters) >= self.max_queue:
+            ADMISSION_REJECTED.labels(reason="queue_full").inc()
+            raise AdmissionRejected("伺服器忙碌中，請稍後再試。", self.retry_after, "queue_full")
+
+    def _fits(self, cost: JobCost) -> bool:
+        if self._running == 0:
+            return True
+        return self._memory + cost.memory <= self.memory_budget and self._cpu + cost.cpu <= self.cpu_budget
+
+    def _grant(self, ticket: _Ticket) -> None:
+        ticket.granted = True
+        self._memory += ticket.cost.memory
+        self._cpu += ticket.cost.cpu
+        self._running += 1
+        ADMISSION_RESERVED.labels(resource="memory_bytes").set(self._memory)
+        ADMISSION_RESERVED.labels(resource="cpu_units").set(self._cpu)
+
+    def _release(self, ticket: _Ticket) -> None:
+        self._memory -= ticket.cost.memory
+        self._cpu -= ticket.cost.cpu
+        self._running -= 1
+        ADMISSION_RESERVED.labels(resource="memory_bytes").set(self._memory)
+        ADMISSION_RESERVED.labels(resource="cpu_units").set(self._cpu)
+        self._drain()
+
+    def _drain(self) -> None:
+        while self._waiters and self._fits(self._waiters[0].cost):
+            ticket = self._waiters.popleft()
+            self._grant(ticket)
+            ticket.wake.set()
+        self._wake_all()
+
+    def _remove_waiter(self, ticket: _Ticket) -> None:
+        # 排頭離開後，後面原本被擋住的工作可能已經放得下
+        self._waiters.remove(ticket)
+        self._drain()
+
+    def _wake_all(self) -> None:
+        # 佇列有變動：叫醒所有等待者更新自己的位置
+        for ticket in self._waiters:
+            ticket.wake.set()
+
+    async def _wait(
+        self,
+        ticket: _Ticket,
+        on_position: Optional[PositionCallback],
+        max_wait: Optional[float],
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        deadline = None if max_wait is None else loop.time() + max_wait
+        last_position = None
+        while not ticket.granted:
+            ticket.wake.clear()
+            position = self._waiters.index(ticket) + 1
+            if on_position is not None and position != last_position:
+                last_position = position
+                await on_position(position, len(self._waiters))
+                if ticket.granted:
+                    break
+            timeout = None if deadline is None else deadline - loop.time()
+            if timeout is not None and timeout <= 0:
+                self._remove_waiter(ticket)
+                ADMISSION_REJECTED.labels(reason="timeout").inc()
+                raise AdmissionRejected(
+                    f"排隊超過 {max_wait:.0f} 秒仍未輪到，請稍後再試。", self.retry_after, "timeout"
+                )
+            try:
+                await asyncio.wait_for(ticket.wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    @asynccontextmanager
+    async def admit(
+        self,
+        cost: JobCost,
+        on_position: Optional[PositionCallback] = None,
+        max_wait: Optional[float] = -1.0,
+        enforce_queue_limit: bool = True,
+    ) -> AsyncIterator[JobCost]:
+        """
+        取得執行名額後才進入 with 區塊；排隊時以 on_position(位置, 佇列長度) 回報。
+        max_wait 預設使用 ADMISSION_MAX_WAIT_S，None 表示不限（背景工作）。
+        """
+        if max_wait is not None and max_wait < 0:
+            max_wait = self.max_wait
+        ticket = _Ticket(cost)
+        if not self._waiters and self._fits(cost):
+            self._grant(ticket)
+        else:
+            if enforce_queue_limit:
+                self.check_queue()
+            self._waiters.append(ticket)
+            try:
+                await self._wait(ticket, on_position, max_wait)
+            except BaseException:
+                if not ticket.granted:
+                    if ticket in self._waiters:
+                        self._remove_waiter(ticket)
+                    raise
+                # 在回報位置時剛好取得名額又被取消：歸還名額
+                self._release(ticket)
+                raise
+        try:
+            yield cost
+        finally:
+            self._release(ticket)
+
+
+_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> AdmissionController:
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController()
+        QUEUE_DEPTH.labels(queue="admission").set_function(lambda: _controller.queued)
+    return _controller
+
+
+def retry_after_header(exc: AdmissionRejected) -> dict:
+    return {"Retry-After": str(max(1, math.ceil(exc.retry_after)))}
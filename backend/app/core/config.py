@@ -1,4 +1,6 @@
+import json
 import os
+from functools import lru_cache
 from typing import Optional
 
 # === 專案路徑 ===
@@ -7,9 +9,122 @@ STORAGE_DIR = os.path.join(BASE_DIR, "storage")
 UPLOAD_DIR = os.path.join(STORAGE_DIR, "uploads")
 WORDCLOUD_DIR = os.path.join(STORAGE_DIR, "wordclouds")
 MINDMAP_DIR = os.path.join(STORAGE_DIR, "mindmaps")
+MINDMAP_RENDER_DIR = os.path.join(MINDMAP_DIR, "rendered")
+# 不對外提供的執行期狀態（佇列、資料庫等）；STORAGE_DIR 整個掛在 /static，不能放這類檔案
+VAR_DIR = os.getenv("VAR_DIR", os.path.join(BASE_DIR, "var"))
 ASSETS_DIR = os.path.join(BASE_DIR, "assets")
 FONTS_DIR = os.path.join(ASSETS_DIR, "fonts")
 
+# === 背景工作（/jobs）===
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", os.path.join(VAR_DIR, "jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# 每個行程定期續約自己負責的工作；租約過期（行程已結束）的工作才由其他行程接手恢復
+JOB_LEASE_S = float(os.getenv("JOB_LEASE_S", "60"))
+
+# === 准入控制（每個行程各自計算）===
+# 依檔案大小、類型與頁數估算每個 pipeline 的記憶體 / CPU 用量，超出預算的請求排隊
+ADMISSION_MEMORY_MB = int(os.getenv("ADMISSION_MEMORY_MB", "2048"))
+ADMISSION_CPU_UNITS = int(os.getenv("ADMISSION_CPU_UNITS", str(os.cpu_count() or 4)))
+# 排隊上限與最長等待；超過時回 503 並帶 Retry-After
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+ADMISSION_MAX_WAIT_S = float(os.getenv("ADMISSION_MAX_WAIT_S", "60"))
+ADMISSION_RETRY_AFTER_S = int(os.getenv("ADMISSION_RETRY_AFTER_S", "30"))
+
+# === 批次上傳（/analyze/batch）===
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "50"))
+# zip 解壓後的總大小上限，防止壓縮炸彈
+BATCH_MAX_EXTRACT_MB = int(os.getenv("BATCH_MAX_EXTRACT_MB", "512"))
+# 同一批次所有文件共用的 LLM 並行數，以及同時解析 / 分析的文件數
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "8"))
+BATCH_DOCUMENT_CONCURRENCY = int(os.getenv("BATCH_DOCUMENT_CONCURRENCY", "4"))
+
+# === PPTX / DOCX 解析 ===
+# 直接從 zip 讀 XML 抽文字（不建 python-pptx / python-docx 物件模型）；異常檔案自動改用函式庫
+OOXML_FAST_PATH = os.getenv("OOXML_FAST_PATH", "1").lower() not in {"0", "false", "no"}
+OOXML_WORKERS = int(os.getenv("OOXML_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# === PDF 解析 ===
+# pypdf（預設）/ pypdfium2 / pdfminer，或 auto：依 PDF_BACKEND_PREFERENCE 取第一個已安裝的引擎
+# 各引擎速度與取字量可用 `python -m backend pdfbench` 在自己的文件上比較
+PDF_BACKEND = os.getenv("PDF_BACKEND", "pypdf").strip().lower()
+PDF_BACKEND_PREFERENCE = [
+    name.strip().lower()
+    for name in os.getenv("PDF_BACKEND_PREFERENCE", "pypdfium2,pypdf,pdfminer").split(",")
+    if name.strip()
+]
+
+# === 分散式工作佇列（python -m backend worker）===
+# local：全部在收到上傳的行程內執行；memory / sqlite / redis：頁面摘要與 CPU 工作交給 worker
+TASK_QUEUE_BACKEND = os.getenv("TASK_QUEUE_BACKEND", "local").lower()
+TASK_QUEUE_URL = os.getenv("TASK_QUEUE_URL", os.path.join(VAR_DIR, "task_queue.sqlite3"))
+TASK_RESULT_TIMEOUT = float(os.getenv("TASK_RESULT_TIMEOUT", "600"))
+# 使用者的 LLM API key 以此密鑰加密（Fernet，有效期 TASK_RESULT_TIMEOUT）後才放進 sqlite / redis 佇列；
+# 未設定時這兩種後端不傳送 API key，頁面摘要改在收到請求的行程執行
+TASK_QUEUE_SECRET = os.getenv("TASK_QUEUE_SECRET", "")
+TASK_WORKER_CONCURRENCY = int(os.getenv("TASK_WORKER_CONCURRENCY", "8"))
+
+# === Graphviz 渲染 ===
+GRAPHVIZ_RENDER_WORKERS = int(os.getenv("GRAPHVIZ_RENDER_WORKERS", "2"))
+GRAPHVIZ_RENDER_TIMEOUT = float(os.getenv("GRAPHVIZ_RENDER_TIMEOUT", "20"))
+
+# === LLM 呼叫 ===
+# 暫時性錯誤（連線、逾時、429、5xx）由 SummaryEngine 自行重試，才能計入 metrics
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF", "0.5"))
+# /analyze 的 deadline_ms：預算依比例保留給全局摘要與其後的階段，逐頁 LLM 摘要只能用剩下的時間
+DEADLINE_GLOBAL_SHARE = float(os.getenv("DEADLINE_GLOBAL_SHARE", "0.2"))
+DEADLINE_TAIL_SHARE = float(os.getenv("DEADLINE_TAIL_SHARE", "0.15"))
+# 摘要完成後剩餘時間少於此秒數時略過文字雲與心智圖
+DEADLINE_OPTIONAL_MIN_S = float(os.getenv("DEADLINE_OPTIONAL_MIN_S", "2"))
+# 頁面摘要請求對沖：呼叫超過該模型最近延遲的 p90 仍未返回時，再送一份相同請求，先回來者勝出
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE", "0").lower() in {"1", "true", "yes", "on"}
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.9"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_MIN_DELAY_S = float(os.getenv("LLM_HEDGE_MIN_DELAY_S", "1"))
+LLM_HEDGE_WINDOW = int(os.getenv("LLM_HEDGE_WINDOW", "200"))
+# 對沖請求數上限（相對於主請求數的比例），例如 0.1 = 最多多送 10% 的請求
+LLM_HEDGE_MAX_RATE = float(os.getenv("LLM_HEDGE_MAX_RATE", "0.1"))
+# 模型分流：設定 fast model 後，字數少、數據密度低的頁面改用它，其餘頁面仍用主模型
+LLM_FAST_MODEL = os.getenv("LLM_FAST_MODEL", "")
+CASCADE_LIGHT_MAX_ALNUM = int(os.getenv("CASCADE_LIGHT_MAX_ALNUM", "600"))
+CASCADE_DENSE_DIGIT_RATIO = float(os.getenv("CASCADE_DENSE_DIGIT_RATIO", "0.08"))
+# fast model 回傳無效 JSON 或不足 3 條要點時改用主模型重跑
+CASCADE_ESCALATE = os.getenv("CASCADE_ESCALATE", "1").lower() not in {"0", "false", "no"}
+# summary_mode=auto 時，頁面排隊等 LLM 超過此秒數即改用本地 TextRank 摘要；0 = 不限制
+SUMMARY_QUEUE_BUDGET_S = float(os.getenv("SUMMARY_QUEUE_BUDGET_S", "30"))
+# 每百萬 token 的美元單價，JSON 字串或 JSON 檔路徑；未設定的模型不計算成本
+# 例：{"gpt-5-mini-2025-08-07": {"input": 0.25, "cached_input": 0.025, "output": 2.0}}
+LLM_PRICING = os.getenv("LLM_PRICING", "")
+# 設定後每個請求的 token 用量以 JSONL 附加寫入此檔
+LLM_USAGE_LEDGER = os.getenv("LLM_USAGE_LEDGER", "")
+# record：照常呼叫 LLM 並把回應與延遲寫入 cassette；replay：只從 cassette 回放，不連網
+LLM_CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "off").lower()
+LLM_CASSETTE_PATH = os.getenv("LLM_CASSETTE_PATH", os.path.join(VAR_DIR, "cassettes", "llm.jsonl"))
+# 回放延遲倍率：1 = 原始延遲，0 = 不等待
+LLM_CASSETTE_LATENCY_SCALE = float(os.getenv("LLM_CASSETTE_LATENCY_SCALE", "1"))
+
+# === /metrics（pre-fork 時跨 worker 彙整）===
+# 各 worker 把指標快照寫到這個目錄；未設定時 run_prefork 使用暫存目錄並在結束時刪除
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR", "")
+METRICS_FLUSH_INTERVAL_S = float(os.getenv("METRICS_FLUSH_INTERVAL_S", "1"))
+# LLM 指標的 model / base_url 標籤只保留這些值（逗號分隔），其餘一律記為 other：
+# 兩者都來自使用者表單，不設上限時任意字串都會產生新的時間序列。base_url 未填時標籤為 default
+METRICS_MODEL_LABELS = {
+    name.strip()
+    for name in os.getenv("METRICS_MODEL_LABELS", f"gpt-5-mini-2025-08-07,{LLM_FAST_MODEL}").split(",")
+    if name.strip()
+}
+METRICS_BASE_URL_LABELS = {
+    url.strip().rstrip("/") for url in os.getenv("METRICS_BASE_URL_LABELS", "").split(",") if url.strip()
+} | {"default"}
+
+# === 單一請求剖析（opt-in）===
+# 未設定 PROFILE_TOKEN 時完全停用；請求需帶 X-Profile-Token 標頭且值相符才會剖析
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+# 剖析輸出含程式路徑與記憶體內容，不放在 /static 底下；經 GET /profiles/{name}（同樣驗證 token）下載
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(VAR_DIR, "profiles"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+
 STATIC_DIR = STORAGE_DIR
 STATIC_MOUNT = "/static"
 ASSETS_MOUNT = "/assets"
@@ -47,7 +162,67 @@ def _discover_font(root: str) -> Optional[str]:
     candidates.sort(key=lambda x: (-x[1], x[0]))
     return candidates[0][0]
 
-DEFAULT_ZH_FONT = _discover_font(FONTS_DIR)
+FONT_CACHE_PATH = os.path.join(STORAGE_DIR, "cache", "font_discovery.json")
+
+
+def _fonts_signature(root: str) -> list:
+    """
+    字型目錄下每一層資料夾的 mtime；新增/刪除字型檔會改變所在資料夾的 mtime。
+    只走訪資料夾、不評分字型檔，比 _discover_font 便宜得多（例如 NotoSansTC/static/*.ttf 也涵蓋）。
+    """
+    if not os.path.isdir(root):
+        return []
+    signature = []
+    for directory, subdirs, _ in os.walk(root):
+        subdirs.sort()
+        signature.append([os.path.relpath(directory, root), os.stat(directory).st_mtime_ns])
+    return signature
+
+
+@lru_cache(maxsize=1)
+def get_default_zh_font() -> Optional[str]:
+    """
+    回傳中文字型路徑：優先 FONT_ZH_PATH，否則搜尋 assets/fonts。
+    搜尋結果寫入 storage/cache/font_discovery.json，目錄未變動時直接沿用，啟動不再 os.walk。
+    """
+    env_path = os.getenv("FONT_ZH_PATH")
+    if env_path and os.path.exists(env_path):
+        return env_path
+
+    signature = _fonts_signature(FONTS_DIR)
+    try:
+        with open(FONT_CACHE_PATH, "r", encoding="utf-8") as handle:
+            cached = json.load(handle)
+        # 快取的「沒有字型」不沿用：重新搜尋的成本只在沒有字型時才發生，且字型可能剛放進來
+        if (
+            cached.get("root") == FONTS_DIR
+            and cached.get("signature") == signature
+            and cached.get("font")
+            and os.path.exists(cached["font"])
+        ):
+            return cached["font"]
+    except (OSError, ValueError):
+        pass
+
+    font = _discover_font(FONTS_DIR)
+    try:
+        os.makedirs(os.path.dirname(FONT_CACHE_PATH), exist_ok=True)
+        tmp = f"{FONT_CACHE_PATH}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as handle:
+            json.dump({"root": FONTS_DIR, "signature": signature, "font": font}, handle)
+        os.replace(tmp, FONT_CACHE_PATH)
+    except OSError:
+        pass
+    return font
+
+
 DEFAULT_EN_FONT = None  # 英文不用指定字型
 
+
+def __getattr__(name: str):
+    # 相容舊寫法 `from config import DEFAULT_ZH_FONT`；新程式請呼叫 get_default_zh_font()
+    if name == "DEFAULT_ZH_FONT":
+        return get_default_zh_font()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 # ✅ 不再顯示「請設 FONT_ZH_PATH」的 warning
@@ -0,0 +1,89 @@
+"""Latency tracking and budget for hedged LLM requests."""
+
+from __future__ import annotations
+
+import math
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from backend.app.core.config import (
+    LLM_HEDGE_ENABLED,
+    LLM_HEDGE_MAX_RATE,
+    LLM_HEDGE_MIN_DELAY_S,
+    LLM_HEDGE_MIN_SAMPLES,
+    LLM_HEDGE_PERCENTILE,
+    LLM_HEDGE_WINDOW,
+)
+
+# token bucket 上限：避免長時間沒有對沖後一次累積大量額度
+_MAX_TOKENS = 10.0
+
+
+class Hedger:
+    """
+    每個模型保留最近 window 次呼叫延遲，取 percentile 作為對沖門檻；
+    對沖次數以 token bucket 限制：每次主請求存入 max_rate 個 token，每次對沖消耗 1 個。
+    """
+
+    def __init__(
+        self,
+        enabled: bool = LLM_HEDGE_ENABLED,
+        percentile: float = LLM_HEDGE_PERCENTILE,
+        min_samples: int = LLM_HEDGE_MIN_SAMPLES,
+        min_delay: float = LLM_HEDGE_MIN_DELAY_S,
+        max_rate: float = LLM_HEDGE_MAX_RATE,
+        window: int = LLM_HEDGE_WINDOW,
+    ):
+        self.enabled = enabled and max_rate > 0
+        self._percentile = percentile
+        self._min_samples = max(1, min_samples)
+        self._min_delay = min_delay
+        self._max_rate = max_rate
+        self._window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, model: str, latency: float) -> None:
+        with self._lock:
+            samples = self._samples.get(model)
+            if samples is None:
+                samples = self._samples[model] = deque(maxlen=self._window)
+            samples.append(latency)
+
+    def delay(self, model: str) -> Optional[float]:
+        """回傳應等待多久才送出對沖請求；樣本不足或停用時回傳 None（不對沖）。"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            samples = self._samples.get(model)
+            if samples is None or len(samples) < self._min_samples:
+                return None
+            ordered = sorted(samples)
+        rank = max(1, math.ceil(self._percentile * len(ordered)))
+        return max(self._min_delay, ordered[rank - 1])
+
+    def credit(self) -> None:
+        """每次發出主請求時呼叫，累積對沖額度。"""
+        with self._lock:
+            self._tokens = min(_MAX_TOKENS, self._tokens + self._max_rate)
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            return True
+
+
+_hedger: Optional[Hedger] = None
+_hedger_lock = threading.Lock()
+
+
+def get_hedger() -> Hedger:
+    global _hedger
+    with _hedger_lock:
+        if _hedger is None:
+            _hedger = Hedger()
+        return _hedger
@@ -1,14 +1,187 @@
-from typing import Optional, List
-from openai import OpenAI
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from backend.app.core.config import (
+    LLM_CASSETTE_LATENCY_SCALE,
+    LLM_CASSETTE_MODE,
+    LLM_CASSETTE_PATH,
+)
+
+CASSETTE_MODES = ("off", "record", "replay")
+# 只有這些欄位會影響模型輸出，用來計算請求雜湊（API key、base_url 不列入）
+_HASH_FIELDS = ("model", "messages", "response_format", "temperature", "max_tokens", "max_completion_tokens")
+
+
+class CassetteMissError(RuntimeError):
+    """replay 模式下找不到對應的錄製紀錄。"""
+
+
+def request_hash(request: Dict[str, Any]) -> str:
+    canonical = {key: request.get(key) for key in _HASH_FIELDS if request.get(key) is not None}
+    return hashlib.sha256(json.dumps(canonical, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """
+    JSONL 檔，每行一筆 {hash, model, latency_s, response}。
+    同一雜湊錄到多筆時依序回放（例如重複頁面、重試），用完後從頭循環。
+    """
+
+    def __init__(self, path: str, latency_scale: float = 1.0):
+        self.path = path
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._cursor: Dict[str, int] = defaultdict(int)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as handle:
+                for line in handle:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["hash"]].append(entry)
+
+    def __len__(self) -> int:
+        return sum(len(items) for items in self._entries.values())
+
+    def record(self, key: str, model: str, latency: float, response: Dict[str, Any]) -> None:
+        entry = {"hash": key, "model": model, "latency_s": round(latency, 4), "response": response}
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as handle:
+                handle.write(line)
+            self._entries[key].append(entry)
+
+    def lookup(self, key: str) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise CassetteMissError(f"cassette {self.path} 沒有請求 {key[:12]} 的紀錄")
+            index = self._cursor[key] % len(entries)
+            self._cursor[key] += 1
+            return entries[index]
+
+
+def _completion_from_dict(data: Dict[str, Any]):
+    from openai.types.chat import ChatCompletion
+
+    return ChatCompletion.model_validate(data)
+
+
+def _dump(response: Any) -> Dict[str, Any]:
+    return response.model_dump(mode="json") if hasattr(response, "model_dump") else dict(response)
+
+
+class _Completions:
+    def __init__(self, inner, cassette: Cassette, mode: str):
+        self._inner = inner
+        self._cassette = cassette
+        self._mode = mode
+
+    def create(self, **request):
+        key = request_hash(request)
+        if self._mode == "replay":
+            entry = self._cassette.lookup(key)
+            time.sleep(entry["latency_s"] * self._cassette.latency_scale)
+            return _completion_from_dict(entry["response"])
+        started = time.perf_counter()
+        response = self._inner.create(**request)
+        self._cassette.record(key, request.get("model", ""), time.perf_counter() - started, _dump(response))
+        return response
+
+
+class _AsyncCompletions(_Completions):
+    async def create(self, **request):
+        key = request_hash(request)
+        if self._mode == "replay":
+            entry = self._cassette.lookup(key)
+            await asyncio.sleep(entry["latency_s"] * self._cassette.latency_scale)
+            return _completion_from_dict(entry["response"])
+        started = time.perf_counter()
+        response = await self._inner.create(**request)
+        latency = time.perf_counter() - started
+        await asyncio.to_thread(self._cassette.record, key, request.get("model", ""), latency, _dump(response))
+        return response
+
+
+class _Chat:
+    def __init__(self, completions):
+        self.completions = completions
+
+
+class CassetteClient:
+    """
+    只包裝 `client.chat.completions.create`（SummaryEngine / LLMClient 用到的介面）。
+    replay 模式不建立真正的 OpenAI client，因此完全不連網。
+    """
+
+    def __init__(self, inner, cassette: Cassette, mode: str, is_async: bool):
+        self._inner = inner
+        completions_cls = _AsyncCompletions if is_async else _Completions
+        inner_completions = inner.chat.completions if inner is not None else None
+        self.chat = _Chat(completions_cls(inner_completions, cassette, mode))
+
+
+_cassettes: Dict[str, Cassette] = {}
+_cassettes_lock = threading.Lock()
+
+
+def get_cassette(path: str = LLM_CASSETTE_PATH, latency_scale: float = LLM_CASSETTE_LATENCY_SCALE) -> Cassette:
+    with _cassettes_lock:
+        cassette = _cassettes.get(path)
+        if cassette is None:
+            cassette = Cassette(path, latency_scale)
+            _cassettes[path] = cassette
+        return cassette
+
+
+def _check_mode(mode: str) -> str:
+    if mode not in CASSETTE_MODES:
+        raise ValueError(f"LLM_CASSETTE_MODE 僅支援 {', '.join(CASSETTE_MODES)}：{mode}")
+    return mode
+
+
+def create_async_client(api_key: str, base_url: Optional[str] = None, mode: str = LLM_CASSETTE_MODE, **kwargs):
+    """SummaryEngine 使用的 AsyncOpenAI；依 LLM_CASSETTE_MODE 包上錄製 / 回放層。"""
+    mode = _check_mode(mode)
+    if mode == "replay":
+        return CassetteClient(None, get_cassette(), mode, is_async=True)
+    from openai import AsyncOpenAI
+
+    client = AsyncOpenAI(api_key=api_key, base_url=base_url, **kwargs)
+    if mode == "record":
+        return CassetteClient(client, get_cassette(), mode, is_async=True)
+    return client
+
+
+def create_client(api_key: str, base_url: Optional[str] = None, mode: str = LLM_CASSETTE_MODE, **kwargs):
+    """同步版 OpenAI client（LLMClient 使用）。"""
+    mode = _check_mode(mode)
+    if mode == "replay":
+        return CassetteClient(None, get_cassette(), mode, is_async=False)
+    from openai import OpenAI
+
+    client = OpenAI(api_key=api_key, base_url=base_url, **kwargs)
+    if mode == "record":
+        return CassetteClient(client, get_cassette(), mode, is_async=False)
+    return client
+
 
 class LLMClient:
     """
     封裝 LLM 客戶端：
     - 支援自填 base_url（可空）
     - 支援指定 model
+    - 支援 LLM_CASSETTE_MODE 錄製 / 回放
     """
     def __init__(self, api_key: str, model: str, base_url: Optional[str] = None):
-        self.client = OpenAI(api_key=api_key, base_url=base_url)
+        self.client = create_client(api_key=api_key, base_url=base_url)
         self.model = model
 
     def chat(self, messages: List[dict], temperature: float = 0.2) -> str:
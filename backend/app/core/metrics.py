@@ -0,0 +1,530 @@
+"""Minimal in-process Prometheus metrics (text exposition format 0.0.4), plus per-request stage timings."""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from backend.app.core.config import METRICS_BASE_URL_LABELS, METRICS_MODEL_LABELS
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 涵蓋 1ms 的解析到數分鐘的 LLM 全局摘要
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[LabelValues, object] = {}
+        REGISTRY.register(self)
+
+    def labels(self, **labels: str):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._new_child()
+                self._children[key] = child
+            return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _read(self, child) -> object:
+        raise NotImplementedError
+
+    def _samples(self, items: Sequence[Tuple[LabelValues, object]]) -> Iterator[str]:
+        raise NotImplementedError
+
+    def snapshot(self) -> List[Tuple[LabelValues, object]]:
+        with self._lock:
+            children = list(self._children.items())
+        return [(values, self._read(child)) for values, child in children]
+
+    def reset(self) -> None:
+        """歸零所有數值（保留 set_function 與已建立的 label 組合）。"""
+        with self._lock:
+            children = list(self._children.values())
+        for child in children:
+            child.reset()
+
+    def collect(self, items: Optional[Sequence[Tuple[LabelValues, object]]] = None) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples(self.snapshot() if items is None else items))
+        return lines
+
+
+class _Value:
+    __slots__ = ("_value", "_lock", "_function")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+        self._function: Optional[Callable[[], float]] = None
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self._value = float(value)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._value = 0.0
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """scrape 時才呼叫 function 取值（佇列長度等不方便即時維護的數值）。"""
+        self._function = function
+
+    @contextmanager
+    def track_inprogress(self) -> Iterator[None]:
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+    def get(self) -> float:
+        if self._function is not None:
+            try:
+                return float(self._function())
+            except Exception:  # pylint: disable=broad-except
+                return math.nan
+        with self._lock:
+            return self._value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def _read(self, child: _Value) -> float:
+        return child.get()
+
+    def _samples(self, items: Sequence[Tuple[LabelValues, object]]) -> Iterator[str]:
+        for values, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+
+class _HistogramValue:
+    __slots__ = ("_bounds", "_counts", "_sum", "_lock")
+
+    def __init__(self, bounds: Sequence[float]):
+        self._bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = len(self._bounds)
+        for position, bound in enumerate(self._bounds):
+            if value <= bound:
+                index = position
+                break
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        with self._lock:
+            return list(self._counts), self._sum
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = [0] * len(self._counts)
+            self._sum = 0.0
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self._bounds = tuple(sorted(float(b) for b in buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self._bounds)
+
+    def _read(self, child: _HistogramValue) -> Tuple[List[int], float]:
+        return child.snapshot()
+
+    def _samples(self, items: Sequence[Tuple[LabelValues, object]]) -> Iterator[str]:
+        for values, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip((*self._bounds, math.inf), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, values)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, values)} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> None:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+
+    def metrics(self) -> List[_Metric]:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics():
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# ===== 應用程式指標 =====
+
+STAGE_SECONDS = Histogram(
+    "autonote_stage_duration_seconds",
+    "Wall time spent in each pipeline stage.",
+    ["pipeline", "stage"],
+)
+INFLIGHT = Gauge(
+    "autonote_inflight",
+    "Work currently holding a concurrency slot (requests, LLM page semaphore, renders).",
+    ["resource"],
+)
+QUEUE_DEPTH = Gauge(
+    "autonote_queue_depth",
+    "Items waiting in internal queues, sampled at scrape time.",
+    ["queue"],
+)
+ADMISSION_RESERVED = Gauge(
+    "autonote_admission_reserved",
+    "Estimated memory (bytes) and CPU units reserved by admitted pipelines.",
+    ["resource"],
+)
+ADMISSION_REJECTED = Counter(
+    "autonote_admission_rejected_total",
+    "Requests turned away by admission control (queue full or waited too long).",
+    ["reason"],
+)
+LLM_REQUEST_SECONDS = Histogram(
+    "autonote_llm_request_duration_seconds",
+    "Latency of a single chat completion call, including retries.",
+    ["model", "kind"],
+)
+LLM_REQUESTS = Counter(
+    "autonote_llm_requests_total",
+    "Chat completion calls by outcome.",
+    ["model", "kind", "outcome"],
+)
+LLM_ERRORS = Counter(
+    "autonote_llm_errors_total",
+    "Chat completion attempts that raised, by exception type.",
+    ["model", "error"],
+)
+LLM_RETRIES = Counter(
+    "autonote_llm_retries_total",
+    "Chat completion attempts retried after a transient error.",
+    ["model"],
+)
+LLM_HEDGES = Counter(
+    "autonote_llm_hedges_total",
+    "Hedged page calls: won / lost against the original request, or skipped for lack of budget.",
+    ["model", "result"],
+)
+LLM_CASCADE = Counter(
+    "autonote_llm_cascade_total",
+    "Page summaries by routed model tier and whether the fast model had to escalate.",
+    ["tier", "outcome"],
+)
+LOCAL_SUMMARIES = Counter(
+    "autonote_local_summaries_total",
+    "Summaries produced by the local TextRank tier instead of the LLM, by reason.",
+    ["kind", "reason"],
+)
+OOXML_EXTRACTIONS = Counter(
+    "autonote_ooxml_extractions_total",
+    "PPTX / DOCX text extractions by the streaming OOXML parser or the library fallback.",
+    ["format", "path"],
+)
+
+PDF_EXTRACTIONS = Counter(
+    "autonote_pdf_extractions_total",
+    "PDF documents extracted, by text extraction backend.",
+    ["backend"],
+)
+
+
+OTHER_LABEL = "other"
+
+
+def model_label(model: Optional[str]) -> str:
+    """不在 METRICS_MODEL_LABELS 的模型名稱記為 other，避免使用者輸入撐爆時間序列。"""
+    return model if model in METRICS_MODEL_LABELS else OTHER_LABEL
+
+
+def base_url_label(base_url: Optional[str]) -> str:
+    base = (base_url or "default").rstrip("/")
+    return base if base in METRICS_BASE_URL_LABELS else OTHER_LABEL
+
+
+# ===== pre-fork 多 worker 彙整 =====
+#
+# 每個 worker 的 registry 各自獨立，scrape 只會打到其中一個。multiprocess 模式下（run_prefork 啟用）：
+# - 每個 worker 定期（以及被 scrape 時）把自己的快照原子性地寫成 <dir>/worker-<pid>-<uuid>.json
+#   （pid 可能被重用，加上 uuid 才能區分同一 pid 的不同 worker）
+# - /metrics 合併所有快照：counter / histogram 相加，gauge 只加總仍在執行的 worker
+# - worker 結束後由父行程把它的 counter / histogram 併入 archived.json，重生 worker 不會讓 counter 倒退
+
+_WORKER_PREFIX = "worker-"
+_ARCHIVE_FILE = "archived.json"
+# archive 中的 absorbed 記錄在快照檔刪除後再保留這麼久，足以涵蓋進行中的 scrape，之後清掉
+_ABSORBED_GRACE_S = 60.0
+_multiproc_dir: Optional[str] = None
+_worker_pid: Optional[int] = None
+_worker_id: Optional[str] = None
+
+
+def configure_multiprocess(directory: str) -> None:
+    """父行程在 fork 前呼叫：清掉上一次執行留下的快照。"""
+    global _multiproc_dir
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith(".json"):
+            os.remove(os.path.join(directory, name))
+    _multiproc_dir = directory
+
+
+def start_worker_exporter(interval: float = 1.0) -> None:
+    """fork 後的 worker 呼叫：歸零從父行程繼承的數值，並在背景定期寫出快照。"""
+    global _worker_pid, _worker_id
+    if _multiproc_dir is None:
+        return
+    _worker_pid = os.getpid()
+    _worker_id = f"{_worker_pid}-{uuid.uuid4().hex}"
+    for metric in REGISTRY.metrics():
+        metric.reset()
+
+    def _loop() -> None:
+        while True:
+            time.sleep(interval)
+            try:
+                flush_worker_snapshot()
+            except Exception:  # pylint: disable=broad-except
+                pass
+
+    threading.Thread(target=_loop, name="metrics-exporter", daemon=True).start()
+
+
+def _snapshot_path(worker_id: str) -> str:
+    return os.path.join(_multiproc_dir, f"{_WORKER_PREFIX}{worker_id}.json")
+
+
+def _write_json(path: str, data: dict) -> None:
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as handle:
+        json.dump(data, handle)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str) -> Optional[dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def flush_worker_snapshot() -> None:
+    if _multiproc_dir is None or _worker_pid != os.getpid():
+        return
+    metrics = {metric.name: [[list(values), data] for values, data in metric.snapshot()] for metric in REGISTRY.metrics()}
+    _write_json(_snapshot_path(_worker_id), {"id": _worker_id, "metrics": metrics})
+
+
+def _merge_into(target: Dict[str, Dict[LabelValues, object]], metrics: dict, include_gauges: bool) -> None:
+    kinds = {metric.name: metric.kind for metric in REGISTRY.metrics()}
+    for name, items in metrics.items():
+        kind = kinds.get(name)
+        if kind is None or (kind == "gauge" and not include_gauges):
+            continue
+        merged = target.setdefault(name, {})
+        for values, data in items:
+            key = tuple(values)
+            if kind == "histogram":
+                counts, total = data
+                previous = merged.get(key)
+                if previous is not None:
+                    counts = [a + b for a, b in zip(previous[0], counts)]
+                    total += previous[1]
+                merged[key] = (list(counts), total)
+            elif not math.isnan(data):
+                merged[key] = merged.get(key, 0.0) + data
+
+
+def archive_worker(pid: int) -> None:
+    """
+    父行程在 worker 結束（已 waitpid）後呼叫：把它的 counter / histogram 併入 archived.json。
+    此時該 pid 的快照都屬於已結束的 worker（新 worker 由父行程之後才 spawn）。
+    """
+    if _multiproc_dir is None:
+        return
+    prefix = f"{_WORKER_PREFIX}{pid}-"
+    for name in os.listdir(_multiproc_dir):
+        if name.startswith(prefix) and name.endswith(".json"):
+            _archive_snapshot(os.path.join(_multiproc_dir, name))
+
+
+def _archive_snapshot(path: str) -> None:
+    snapshot = _read_json(path)
+    if snapshot is not None:
+        archive_path = os.path.join(_multiproc_dir, _ARCHIVE_FILE)
+        archive = _read_json(archive_path) or {"absorbed": {}, "metrics": {}}
+        merged: Dict[str, Dict[LabelValues, object]] = {}
+        _merge_into(merged, archive["metrics"], include_gauges=False)
+        _merge_into(merged, snapshot["metrics"], include_gauges=False)
+        now = time.time()
+        # absorbed 記下已併入的快照：scrape 若同時讀到 archive 與尚未刪除的快照，以此避免重複計算。
+        # 快照檔早已刪除且超過寬限時間的記錄不再需要
+        absorbed = {
+            worker_id: absorbed_at
+            for worker_id, absorbed_at in archive["absorbed"].items()
+            if now - absorbed_at < _ABSORBED_GRACE_S or os.path.exists(_snapshot_path(worker_id))
+        }
+        absorbed[snapshot["id"]] = now
+        archive = {
+            "absorbed": absorbed,
+            "metrics": {name: [[list(key), data] for key, data in items.items()] for name, items in merged.items()},
+        }
+        _write_json(archive_path, archive)
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _render_multiprocess() -> str:
+    flush_worker_snapshot()
+    # 先讀 worker 快照再讀 archive：快照在兩次讀取之間被併入時，absorbed 會把它排除
+    snapshots = []
+    for name in sorted(os.listdir(_multiproc_dir)):
+        if name.startswith(_WORKER_PREFIX) and name.endswith(".json"):
+            snapshot = _read_json(os.path.join(_multiproc_dir, name))
+            if snapshot is not None:
+                snapshots.append(snapshot)
+    archive = _read_json(os.path.join(_multiproc_dir, _ARCHIVE_FILE)) or {"absorbed": {}, "metrics": {}}
+    absorbed = archive["absorbed"]
+
+    merged: Dict[str, Dict[LabelValues, object]] = {}
+    _merge_into(merged, archive["metrics"], include_gauges=False)
+    for snapshot in snapshots:
+        if snapshot["id"] not in absorbed:
+            _merge_into(merged, snapshot["metrics"], include_gauges=True)
+
+    lines: List[str] = []
+    for metric in REGISTRY.metrics():
+        items = merged.get(metric.name, {})
+        lines.extend(metric.collect(sorted(items.items())))
+    return "\n".join(lines) + "\n"
+
+
+def render_metrics() -> str:
+    if _multiproc_dir is not None and _worker_pid == os.getpid():
+        return _render_multiprocess()
+    return REGISTRY.render()
+
+
+class StageTimings:
+    """
+    同時記錄到 Prometheus histogram 與單一請求的 timings（毫秒），
+    後者放進最終的 NDJSON result 事件。
+    """
+
+    def __init__(self, pipeline: str):
+        self._pipeline = pipeline
+        self._timings: Dict[str, float] = {}
+        self._started = time.perf_counter()
+
+    def record(self, stage: str, seconds: float) -> None:
+        STAGE_SECONDS.labels(pipeline=self._pipeline, stage=stage).observe(seconds)
+        self._timings[stage] = self._timings.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def as_dict(self) -> Dict[str, float]:
+        timings = {stage: round(seconds * 1000, 1) for stage, seconds in self._timings.items()}
+        timings["total"] = round((time.perf_counter() - self._started) * 1000, 1)
+        return timings
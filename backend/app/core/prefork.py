@@ -0,0 +1,126 @@
+"""Pre-fork production server: preload once in the parent, fork N uvicorn workers."""
+
+from __future__ import annotations
+
+import gc
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import time
+from typing import Dict
+
+import uvicorn
+
+from backend.app.core import metrics
+from backend.app.core.config import METRICS_FLUSH_INTERVAL_S, METRICS_MULTIPROC_DIR
+from backend.app.core.warmup import preload_heavy_modules
+
+
+def _bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_child(app, sock: socket.socket, index: int, graceful_timeout: int) -> None:
+    # 子行程還原預設訊號處理，交由 uvicorn 自行接手 SIGINT/SIGTERM 的優雅關閉
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    os.environ["APP_WORKER_INDEX"] = str(index)
+    metrics.start_worker_exporter(METRICS_FLUSH_INTERVAL_S)
+    config = uvicorn.Config(
+        app,
+        proxy_headers=True,
+        timeout_graceful_shutdown=graceful_timeout,
+        log_level=os.getenv("APP_LOG_LEVEL", "info"),
+    )
+    server = uvicorn.Server(config)
+    try:
+        server.run(sockets=[sock])
+    finally:
+        # 優雅關閉時寫出最後一份快照，父行程再把它併入 archive
+        metrics.flush_worker_snapshot()
+
+
+def run_prefork(host: str, port: int, workers: int, graceful_timeout: int = 30) -> None:
+    """
+    父行程：預先載入 jieba / stopwords / langdetect / 字型 / FastAPI app，
+    gc.freeze() 後 fork，使子行程以 copy-on-write 共用這些記憶體頁。
+    收到 SIGTERM 時轉發給所有子行程並等待其排空請求，逾時才 SIGKILL。
+    各 worker 的 metrics 快照寫到共用目錄，/metrics 回傳所有 worker 的合計。
+    """
+    timings = preload_heavy_modules()
+    print("[prefork] preload " + ", ".join(f"{k}={v * 1000:.0f}ms" for k, v in timings.items()))
+    from backend.app.main import app
+
+    sock = _bind_socket(host, port)
+    # /metrics 彙整所有 worker 的快照，scrape 打到哪個 worker 結果都一樣
+    metrics_dir = METRICS_MULTIPROC_DIR or tempfile.mkdtemp(prefix="autonote-metrics-")
+    metrics.configure_multiprocess(metrics_dir)
+    # 把目前所有物件移出 GC 追蹤，避免子行程的 GC 觸碰（寫入）共享頁面
+    gc.freeze()
+
+    children: Dict[int, int] = {}
+    shutting_down = False
+
+    def spawn(index: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _run_child(app, sock, index, graceful_timeout)
+            except BaseException:  # pylint: disable=broad-except
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = index
+
+    def on_terminate(signum, _frame):
+        nonlocal shutting_down
+        shutting_down = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, on_terminate)
+    signal.signal(signal.SIGINT, on_terminate)
+
+    for index in range(max(1, workers)):
+        spawn(index)
+    print(f"[prefork] serving on {host}:{port} with {len(children)} workers (parent pid {os.getpid()})")
+
+    deadline = None
+    while children:
+        if shutting_down and deadline is None:
+            deadline = time.monotonic() + graceful_timeout + 5
+        if deadline is not None and time.monotonic() > deadline:
+            for pid in list(children):
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+        try:
+            pid, _status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            time.sleep(0.2)
+            continue
+        index = children.pop(pid, None)
+        if index is not None:
+            metrics.archive_worker(pid)
+        if index is not None and not shutting_down:
+            print(f"[prefork] worker {index} (pid {pid}) exited, respawning")
+            spawn(index)
+
+    sock.close()
+    if not METRICS_MULTIPROC_DIR:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
@@ -0,0 +1,178 @@
+"""Opt-in per-request profiling: a wall-clock stack sampler plus tracemalloc, written to PROFILE_DIR."""
+
+from __future__ import annotations
+
+import asyncio
+import hmac
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from typing import Dict, Optional
+
+from backend.app.core.config import PROFILE_DIR, PROFILE_SAMPLE_INTERVAL_MS, PROFILE_TOKEN
+
+PROFILE_MOUNT = "/profiles"
+
+# tracemalloc 與取樣器都是整個行程共用，同一時間只剖析一個請求
+_active = threading.Lock()
+
+
+def profiling_requested(token: Optional[str]) -> bool:
+    """
+    沒帶標頭：不剖析。帶了標頭但服務未設定 PROFILE_TOKEN 或值不符：拋出 PermissionError。
+    """
+    if not token:
+        return False
+    if not PROFILE_TOKEN or not hmac.compare_digest(token, PROFILE_TOKEN):
+        raise PermissionError("profiling 未啟用或 X-Profile-Token 不正確")
+    return True
+
+
+class StackSampler(threading.Thread):
+    """
+    每 interval 秒對所有 thread 的 stack 取樣一次，輸出 folded stacks
+    （`thread;outer;...;inner count`），可直接交給 flamegraph.pl 或 speedscope。
+    以牆鐘時間取樣，因此 event loop、asyncio.to_thread 的解析與 jieba 工作都看得到；
+    同一時間在本行程執行的其他請求也會一併被取樣。
+    """
+
+    def __init__(self, interval: float):
+        super().__init__(name="profile-sampler", daemon=True)
+        self._interval = interval
+        self._stop_event = threading.Event()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+
+    @staticmethod
+    def _frame_label(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop_event.wait(self._interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():  # pylint: disable=protected-access
+                if ident == own:
+                    continue
+                parts = []
+                while frame is not None:
+                    parts.append(self._frame_label(frame))
+                    frame = frame.f_back
+                parts.append(names.get(ident, f"thread-{ident}"))
+                self.stacks[";".join(reversed(parts))] += 1
+            self.samples += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+class RequestProfiler:
+    """
+    用法：
+        async with RequestProfiler("analyze") as profiler:
+            ...
+        profiler.report  # 檔案路徑與記憶體峰值
+    若已有其他請求在剖析，這次不剖析（report["skipped"] 為 True）。
+    async with 在 thread 中停止取樣、拍 tracemalloc 快照並寫檔，不卡住 event loop。
+    """
+
+    def __init__(self, label: str, interval_ms: float = PROFILE_SAMPLE_INTERVAL_MS, top_allocations: int = 25):
+        self._label = label
+        self._interval = max(0.001, interval_ms / 1000)
+        self._top = top_allocations
+        self._sampler: Optional[StackSampler] = None
+        self._owns_tracemalloc = False
+        self._started = 0.0
+        self.report: Dict = {}
+
+    def __enter__(self) -> "RequestProfiler":
+        if not _active.acquire(blocking=False):
+            self.report = {"skipped": True, "reason": "另一個請求正在剖析"}
+            return self
+        self._owns_tracemalloc = not tracemalloc.is_tracing()
+        if self._owns_tracemalloc:
+            tracemalloc.start(16)
+        tracemalloc.reset_peak()
+        self._sampler = StackSampler(self._interval)
+        self._started = time.perf_counter()
+        self._sampler.start()
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        if self._sampler is None:
+            return
+        try:
+            self._sampler.stop()
+            elapsed = time.perf_counter() - self._started
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            if self._owns_tracemalloc:
+                tracemalloc.stop()
+            self.report = self._write(elapsed, current, peak, snapshot)
+        finally:
+            self._sampler = None
+            _active.release()
+
+    async def __aenter__(self) -> "RequestProfiler":
+        return self.__enter__()
+
+    async def __aexit__(self, *exc) -> None:
+        await asyncio.to_thread(self.__exit__, *exc)
+
+    def _write(self, elapsed: float, current: int, peak: int, snapshot: tracemalloc.Snapshot) -> Dict:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        stem = f"{self._label}_{time.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        folded_path = os.path.join(PROFILE_DIR, f"{stem}.folded")
+        memory_path = os.path.join(PROFILE_DIR, f"{stem}.memory.txt")
+
+        sampler = self._sampler
+        with open(folded_path, "w", encoding="utf-8") as handle:
+            for stack, count in sampler.stacks.most_common():
+                handle.write(f"{stack} {count}\n")
+
+        snapshot = snapshot.filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            )
+        )
+        with open(memory_path, "w", encoding="utf-8") as handle:
+            handle.write(f"elapsed: {elapsed:.3f}s\n")
+            handle.write(f"peak traced memory: {peak / 1024 / 1024:.2f} MiB\n")
+            handle.write(f"traced memory at end: {current / 1024 / 1024:.2f} MiB\n\n")
+            handle.write(f"top {self._top} allocation sites still alive at end:\n")
+            for stat in snapshot.statistics("lineno")[: self._top]:
+                handle.write(f"{stat}\n")
+
+        return {
+            "skipped": False,
+            "elapsed_ms": round(elapsed * 1000, 1),
+            "samples": sampler.samples,
+            "peak_memory_mb": round(peak / 1024 / 1024, 2),
+            "flamegraph_path": folded_path,
+            "memory_report_path": memory_path,
+        }
+
+
+def profile_links(report: Dict) -> Dict:
+    """把剖析輸出的檔案路徑轉成 /profiles 連結（下載時需帶 X-Profile-Token），放進最終事件。"""
+    links = {key: value for key, value in report.items() if not key.endswith("_path")}
+    if report.get("flamegraph_path"):
+        links["flamegraph_url"] = f"{PROFILE_MOUNT}/{os.path.basename(report['flamegraph_path'])}"
+    if report.get("memory_report_path"):
+        links["memory_report_url"] = f"{PROFILE_MOUNT}/{os.path.basename(report['memory_report_path'])}"
+    return links
+
+
+def resolve_profile(name: str) -> Optional[str]:
+    """剖析檔名轉成 PROFILE_DIR 內的路徑；不是單純檔名或檔案不存在時回傳 None。"""
+    if not name or name != os.path.basename(name) or name.startswith("."):
+        return None
+    path = os.path.join(PROFILE_DIR, name)
+    return path if os.path.isfile(path) else None
@@ -0,0 +1,200 @@
+"""Per-request LLM token accounting: metrics per model/base_url, result payload, optional JSONL ledger."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from backend.app.core.config import LLM_PRICING, LLM_USAGE_LEDGER
+from backend.app.core.metrics import Counter, base_url_label, model_label
+
+logger = logging.getLogger(__name__)
+
+TOKEN_FIELDS = ("prompt_tokens", "completion_tokens", "cached_tokens", "reasoning_tokens")
+
+LLM_TOKENS = Counter(
+    "autonote_llm_tokens_total",
+    "Tokens consumed by chat completions (type: prompt, completion, cached, reasoning).",
+    ["model", "base_url", "type"],
+)
+LLM_COST = Counter(
+    "autonote_llm_cost_usd_total",
+    "Estimated spend in USD for models listed in LLM_PRICING.",
+    ["model", "base_url"],
+)
+
+_current: ContextVar[Optional["UsageTracker"]] = ContextVar("llm_usage", default=None)
+_ledger_lock = threading.Lock()
+_origin: Tuple[int, str] = (0, "")
+
+
+def process_origin() -> str:
+    """
+    目前行程的識別碼，標在 worker 回傳的用量上。
+    pid 在不同容器間會重複（常常都是 1），所以加上隨機值；fork 後 pid 改變時重新產生。
+    """
+    global _origin
+    pid = os.getpid()
+    if _origin[0] != pid:
+        _origin = (pid, f"{pid}:{uuid.uuid4().hex}")
+    return _origin[1]
+
+
+@lru_cache(maxsize=1)
+def load_pricing() -> Dict[str, Dict[str, float]]:
+    raw = LLM_PRICING.strip()
+    if not raw:
+        return {}
+    try:
+        if not raw.startswith("{"):
+            with open(raw, "r", encoding="utf-8") as handle:
+                return json.load(handle)
+        return json.loads(raw)
+    except (OSError, ValueError) as exc:
+        logger.warning("LLM_PRICING 無法解析，略過成本計算：%s", exc)
+        return {}
+
+
+def estimate_cost(model: str, counts: Dict[str, int]) -> Optional[float]:
+    """依 LLM_PRICING（USD / 1M tokens）估算成本；cached token 以 cached_input 單價計。"""
+    price = load_pricing().get(model)
+    if not price:
+        return None
+    cached = counts.get("cached_tokens", 0)
+    uncached = max(0, counts.get("prompt_tokens", 0) - cached)
+    cached_price = price.get("cached_input", price.get("input", 0.0))
+    total = (
+        uncached * price.get("input", 0.0)
+        + cached * cached_price
+        + counts.get("completion_tokens", 0) * price.get("output", 0.0)
+    )
+    return total / 1_000_000
+
+
+def usage_counts(usage: Any) -> Dict[str, int]:
+    """把 OpenAI `response.usage`（物件或 dict）轉成固定欄位；相容服務缺少的欄位視為 0。"""
+    if usage is None:
+        return {}
+    if not isinstance(usage, dict):
+        usage = usage.model_dump() if hasattr(usage, "model_dump") else dict(vars(usage))
+    prompt_details = usage.get("prompt_tokens_details") or {}
+    completion_details = usage.get("completion_tokens_details") or {}
+    return {
+        "prompt_tokens": int(usage.get("prompt_tokens") or 0),
+        "completion_tokens": int(usage.get("completion_tokens") or 0),
+        "cached_tokens": int(prompt_details.get("cached_tokens") or 0),
+        "reasoning_tokens": int(completion_details.get("reasoning_tokens") or 0),
+    }
+
+
+class UsageTracker:
+    """
+    單一請求的 token 帳本，依 (model, base_url) 分組。
+    透過 contextvar 傳遞，SummaryEngine 與遠端 worker 回傳的用量都記到同一份。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_model: Dict[Tuple[str, str], Dict[str, int]] = {}
+
+    def record(self, model: str, base_url: Optional[str], counts: Dict[str, int], calls: int = 1) -> None:
+        base = base_url or "default"
+        with self._lock:
+            entry = self._by_model.setdefault((model, base), {"calls": 0, **{f: 0 for f in TOKEN_FIELDS}})
+            entry["calls"] += calls
+            for field in TOKEN_FIELDS:
+                entry[field] += counts.get(field, 0)
+
+    def merge(self, payload: Dict[str, Any]) -> None:
+        """
+        合併另一份 as_dict() 的結果（例如 worker 回傳的單頁用量）。
+        同一行程內的 worker（TASK_QUEUE_BACKEND=memory）呼叫 LLM 時已經更新過 metrics，只記入帳本。
+        """
+        observe = payload.get("origin") != process_origin()
+        for item in payload.get("models") or []:
+            if observe:
+                _observe(item["model"], item.get("base_url"), item)
+            self.record(item["model"], item.get("base_url"), item, calls=item.get("calls", 1))
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            items = [(key, dict(entry)) for key, entry in self._by_model.items()]
+        models = []
+        totals = {"calls": 0, **{f: 0 for f in TOKEN_FIELDS}}
+        total_cost: Optional[float] = None
+        for (model, base), entry in items:
+            cost = estimate_cost(model, entry)
+            if cost is not None:
+                total_cost = (total_cost or 0.0) + cost
+            for field, value in entry.items():
+                totals[field] += value
+            models.append({"model": model, "base_url": base, **entry, "cost_usd": cost})
+        totals["total_tokens"] = totals["prompt_tokens"] + totals["completion_tokens"]
+        return {**totals, "cost_usd": total_cost, "models": models}
+
+
+def _observe(model: str, base_url: Optional[str], counts: Dict[str, int]) -> None:
+    labels = {"model": model_label(model), "base_url": base_url_label(base_url)}
+    for field in TOKEN_FIELDS:
+        amount = counts.get(field, 0)
+        if amount:
+            LLM_TOKENS.labels(**labels, type=field.replace("_tokens", "")).inc(amount)
+    cost = estimate_cost(model, counts)
+    if cost:
+        LLM_COST.labels(**labels).inc(cost)
+
+
+def record_usage(model: str, base_url: Optional[str], usage: Any) -> Dict[str, int]:
+    """記錄一次 LLM 呼叫：更新 metrics，並記入目前請求的 UsageTracker（若有）。"""
+    counts = usage_counts(usage)
+    if not counts:
+        return counts
+    _observe(model, base_url, counts)
+    tracker = _current.get()
+    if tracker is not None:
+        tracker.record(model, base_url, counts)
+    return counts
+
+
+def current_usage() -> Optional[UsageTracker]:
+    return _current.get()
+
+
+@contextmanager
+def track_usage(tracker: Optional[UsageTracker] = None) -> Iterator[UsageTracker]:
+    """在此範圍內（含衍生的 asyncio task）的 LLM 呼叫都記入 tracker。"""
+    tracker = tracker or UsageTracker()
+    token = _current.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _current.reset(token)
+
+
+def key_fingerprint(api_key: Optional[str]) -> Optional[str]:
+    """帳本只記錄 API key 的雜湊前綴，足以區分使用者但無法還原金鑰。"""
+    if not api_key:
+        return None
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+def write_ledger(entry: Dict[str, Any], path: str = LLM_USAGE_LEDGER) -> None:
+    if not path:
+        return
+    record = {"ts": time.time(), **entry}
+    line = json.dumps(record, ensure_ascii=False) + "\n"
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    with _ledger_lock:
+        with open(path, "a", encoding="utf-8") as handle:
+            handle.write(line)
@@ -0,0 +1,106 @@
+"""Preload heavy NLP resources so they are paid for once (and shared across forked workers)."""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _warm_jieba() -> None:
+    import jieba
+
+    jieba.initialize()
+
+
+def _warm_stopwords() -> None:
+    from backend.app.services.nlp.keyword_extractor import en_stopwords
+
+    en_stopwords()
+
+
+def _warm_langdetect() -> None:
+    from langdetect.detector_factory import init_factory
+
+    init_factory()
+
+
+def _warm_fonts() -> None:
+    from backend.app.core.config import get_default_zh_font
+
+    font_path = get_default_zh_font()
+    if font_path:
+        # 讀一次字型檔，讓內容進入 page cache
+        with open(font_path, "rb") as handle:
+            while handle.read(1 << 20):
+                pass
+
+
+def _warm_app() -> None:
+    import backend.app.main  # noqa: F401
+
+
+WARMUP_STEPS = {
+    "jieba": _warm_jieba,
+    "fonts": _warm_fonts,
+    "stopwords": _warm_stopwords,
+    "langdetect": _warm_langdetect,
+    "app": _warm_app,
+}
+# /health/ready 以這些步驟完成為準
+READINESS_STEPS = ("jieba", "fonts")
+BACKGROUND_STEPS = ("jieba", "fonts", "stopwords", "langdetect")
+
+_lock = threading.Lock()
+_timings: Dict[str, float] = {}
+_errors: Dict[str, str] = {}
+_thread: Optional[threading.Thread] = None
+
+
+def _run_steps(names: Iterable[str]) -> Dict[str, float]:
+    timings: Dict[str, float] = {}
+    for name in names:
+        with _lock:
+            if name in _timings:
+                continue
+        started = time.perf_counter()
+        try:
+            WARMUP_STEPS[name]()
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning("warmup step %s failed: %s", name, exc)
+            with _lock:
+                _errors[name] = str(exc)
+        elapsed = time.perf_counter() - started
+        timings[name] = elapsed
+        with _lock:
+            _timings[name] = elapsed
+    return timings
+
+
+def preload_heavy_modules() -> Dict[str, float]:
+    """同步執行全部暖機步驟（pre-fork 父行程使用），回傳各步驟耗時（秒）。"""
+    return _run_steps(WARMUP_STEPS)
+
+
+def start_background_warmup() -> None:
+    """在背景 thread 暖機，讓服務先開始回應 /health；已暖機（例如 fork 自父行程）則不重做。"""
+    global _thread
+    with _lock:
+        if _thread is not None or all(name in _timings for name in BACKGROUND_STEPS):
+            return
+        _thread = threading.Thread(target=_run_steps, args=(BACKGROUND_STEPS,), name="warmup", daemon=True)
+        _thread.start()
+
+
+def warmup_status() -> Dict:
+    with _lock:
+        steps = {name: round(seconds * 1000, 1) for name, seconds in _timings.items()}
+        errors = dict(_errors)
+    return {
+        "ready": all(name in steps for name in READINESS_STEPS),
+        "steps_ms": steps,
+        "errors": errors,
+    }
@@ -1,11 +1,39 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import RedirectResponse, PlainTextResponse
 import os
 
-from backend.app.routes import analyze, health, mindmap
-from backend.app.core.config import ASSETS_DIR, ASSETS_MOUNT, STATIC_DIR, STATIC_MOUNT
+from backend.app.routes import analyze, health, jobs, metrics, mindmap, profiles
+from backend.app.core.config import ASSETS_DIR, ASSETS_MOUNT, STATIC_DIR, STATIC_MOUNT, TASK_QUEUE_BACKEND
+from backend.app.core.warmup import start_background_warmup
+from backend.app.services.jobs.manager import get_job_manager
+from backend.app.services.queue.tasks import run_worker
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    # jieba / 字型在背景暖機，/health 立即可用；/health/ready 回報完成與否
+    start_background_warmup()
+    # 背景工作 worker（/jobs）隨服務啟停
+    manager = get_job_manager()
+    await manager.start()
+    # memory 佇列只存在本行程，因此由本行程自帶 worker 消化
+    worker_stop = asyncio.Event()
+    worker_task = (
+        asyncio.create_task(run_worker(stop_event=worker_stop)) if TASK_QUEUE_BACKEND == "memory" else None
+    )
+    try:
+        yield
+    finally:
+        worker_stop.set()
+        if worker_task is not None:
+            await worker_task
+        await manager.stop()
+
 
 app = FastAPI(
     title="AutoNoteSlide API",
@@ -13,6 +41,7 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_url="/openapi.json",
+    lifespan=lifespan,
 )
 
 # ===== CORS =====
@@ -53,4 +82,7 @@ async def limit_upload_size(request: Request, call_next):
 # ===== 掛載路由 =====
 app.include_router(health.router)
 app.include_router(analyze.router)
-app.include_router(mindmap.router)
\ No newline at end of file
+app.include_router(mindmap.router)
+app.include_router(jobs.router)
+app.include_router(metrics.router)
+app.include_router(profiles.router)
\ No newline at end of file
@@ -0,0 +1,116 @@
+"""Compact document text: one backing string with offset-based views."""
+
+from __future__ import annotations
+
+import re
+from array import array
+from typing import Iterable, List, Optional, Pattern, Tuple, Union
+
+
+class TextSpan:
+    """
+    指向 backing string 某段的輕量 view，欄位與 schemas.Paragraph 相同（index / text / start_char / end_char），
+    可直接交給關鍵字抽取與心智圖；text 每次存取才切片，不長期持有副本。
+    """
+
+    __slots__ = ("_source", "index", "start_char", "end_char")
+
+    def __init__(self, source: str, index: int, start_char: int, end_char: int):
+        self._source = source
+        self.index = index
+        self.start_char = start_char
+        self.end_char = end_char
+
+    @property
+    def text(self) -> str:
+        return self._source[self.start_char : self.end_char]
+
+    def __len__(self) -> int:
+        return self.end_char - self.start_char
+
+    def to_dict(self) -> dict:
+        return {"index": self.index, "text": self.text, "start_char": self.start_char, "end_char": self.end_char}
+
+    def __repr__(self) -> str:
+        return f"TextSpan(index={self.index}, {self.start_char}:{self.end_char})"
+
+
+def _strip_bounds(text: str, start: int, end: int):
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def split_spans(text: str, separator: Union[str, Pattern[str]], flags: int = 0) -> List[TextSpan]:
+    """等同 `[b.strip() for b in re.split(separator, text) if b.strip()]`，但回傳 offset view 而非子字串。"""
+    pattern = re.compile(separator, flags) if isinstance(separator, str) else separator
+    spans: List[TextSpan] = []
+    cursor = 0
+    for match in pattern.finditer(text):
+        if match.end() == match.start():
+            continue
+        start, end = _strip_bounds(text, cursor, match.start())
+        if end > start:
+            spans.append(TextSpan(text, len(spans), start, end))
+        cursor = match.end()
+    start, end = _strip_bounds(text, cursor, len(text))
+    if end > start:
+        spans.append(TextSpan(text, len(spans), start, end))
+    return spans
+
+
+def join_spans(items: Iterable[str], separator: str = "\n\n") -> Tuple[str, List[TextSpan]]:
+    """把已整理好的片段串成一份文字，同時記下每段的 offset（不必事後 find）。"""
+    pieces = list(items)
+    text = separator.join(pieces)
+    spans: List[TextSpan] = []
+    offset = 0
+    for index, piece in enumerate(pieces):
+        spans.append(TextSpan(text, index, offset, offset + len(piece)))
+        offset += len(piece) + len(separator)
+    return text, spans
+
+
+class DocumentText:
+    """
+    整份文件只保留一份文字（各頁 strip 後以換行串接），頁面以 offset 陣列描述。
+    取代「PageContent.text + ClassifiedPage.text + joined_text + Paragraph」的多份副本。
+    """
+
+    __slots__ = ("text", "_starts", "_ends")
+
+    def __init__(self, text: str, starts: array, ends: array):
+        self.text = text
+        self._starts = starts
+        self._ends = ends
+
+    @classmethod
+    def from_pages(cls, pages: Iterable[Optional[str]], separator: str = "\n") -> "DocumentText":
+        pieces: List[str] = []
+        starts = array("q")
+        ends = array("q")
+        offset = 0
+        for raw in pages:
+            piece = (raw or "").strip()
+            if pieces:
+                offset += len(separator)
+            pieces.append(piece)
+            starts.append(offset)
+            offset += len(piece)
+            ends.append(offset)
+        text = separator.join(pieces)
+        return cls(text, starts, ends)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def page(self, index: int) -> TextSpan:
+        return TextSpan(self.text, index, self._starts[index], self._ends[index])
+
+    def pages(self) -> List[TextSpan]:
+        return [self.page(index) for index in range(len(self._starts))]
+
+    def page_text(self, index: int) -> str:
+        return self.text[self._starts[index] : self._ends[index]]
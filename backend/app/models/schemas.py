@@ -10,6 +10,9 @@ class PageSummary(BaseModel):
     keywords: List[str] = Field(default_factory=list)
     skipped: bool
     skip_reason: Optional[str] = None
+    summary_source: Optional[str] = None  # llm / local（TextRank）/ skip
+    model: Optional[str] = None  # 實際產生摘要的模型（含升級後的主模型）
+    degraded: bool = False  # 原本要走 LLM，但因 deadline / 過載 / 錯誤改用本地摘要
 
 
 class GlobalSummaryExpansions(BaseModel):
@@ -21,11 +24,14 @@ class GlobalSummaryExpansions(BaseModel):
 class GlobalSummary(BaseModel):
     bullets: List[str]
     expansions: GlobalSummaryExpansions
+    source: Optional[str] = None  # llm / local
 
 class LLMSettings(BaseModel):
     api_key: str
     base_url: Optional[str] = None
     model: str = "gpt-5-mini-2025-08-07"
+    fast_model: Optional[str] = None  # 輕量頁面使用的較快 / 便宜模型；未設定則全部用 model
+    escalate: bool = True  # fast model 輸出不合格時改用 model 重跑
 
 class Paragraph(BaseModel):
     index: int
@@ -41,10 +47,46 @@ class KeywordItem(BaseModel):
     paragraph_index: int
     keywords: List[str]
 
+class MindmapResult(BaseModel):
+    doc_title: str
+    mindmap_mermaid: str
+    mindmap_file_url: str
+    mindmap_image_url: Optional[str] = None
+    mindmap_image_file: Optional[str] = None
+    mindmap_image_status: Optional[str] = None
+    mindmap_image_error: Optional[str] = None
+    mindmap_image_status_url: Optional[str] = None
+
+class LLMModelUsage(BaseModel):
+    model: str
+    base_url: Optional[str] = None
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    reasoning_tokens: int = 0
+    cost_usd: Optional[float] = None
+
+class LLMUsage(BaseModel):
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    reasoning_tokens: int = 0
+    total_tokens: int = 0
+    cost_usd: Optional[float] = None  # 僅在 LLM_PRICING 有設定該模型時計算
+    models: List[LLMModelUsage] = Field(default_factory=list)
+
 class AnalyzeResponse(BaseModel):
     language: str
     total_pages: int
     page_summaries: List[PageSummary]
-    global_summary: GlobalSummary
+    global_summary: Optional[GlobalSummary] = None
     system_prompt: Optional[str] = None
     wordcloud_image_url: Optional[str] = None
+    stages: List[str] = Field(default_factory=list)
+    mindmap: Optional[MindmapResult] = None
+    usage: Optional[LLMUsage] = None
+    deadline_ms: Optional[int] = None
+    degraded: bool = False  # 有頁面或全局摘要降級，或有 stage 因 deadline 被略過
+    skipped_stages: List[str] = Field(default_factory=list)
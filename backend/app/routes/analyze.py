@@ -1,31 +1,76 @@
 import asyncio
 import json
 import os
-from typing import Optional
+from contextlib import nullcontext
+from typing import List, Optional, Tuple
 
-from fastapi import APIRouter, File, Form, HTTPException, UploadFile
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, File, Form, Header, HTTPException, UploadFile
+from fastapi.responses import FileResponse, StreamingResponse
 
-from backend.app.models.schemas import AnalyzeResponse, LLMSettings, PageSummary, Paragraph
-from backend.app.services.analyze.page_classifier import classify_page
-from backend.app.services.analyze.page_parser import parse_pages
-from backend.app.services.analyze.summary_engine import SummaryEngine, SYSTEM_PROMPT
-from backend.app.services.nlp.language_detect import detect_lang, determine_visual_language
-from backend.app.services.nlp.keyword_extractor import extract_keywords_by_paragraph
-from backend.app.services.storage import make_public_url, save_upload
-from backend.app.services.wordcloud.wordcloud_gen import build_wordcloud
+from backend.app.core.admission import (
+    AdmissionRejected,
+    estimate_file_cost,
+    get_admission_controller,
+    retry_after_header,
+)
+from backend.app.core.config import BATCH_MAX_EXTRACT_MB, BATCH_MAX_FILES
+from backend.app.core.metrics import INFLIGHT, STAGE_SECONDS, StageTimings
+from backend.app.core.profiling import RequestProfiler, profile_links, profiling_requested
+from backend.app.services.analyze.batch import BatchDocument, run_batch
+from backend.app.services.analyze.deadline import Deadline
+from backend.app.services.analyze.page_parser import SUPPORTED_EXTENSIONS
+from backend.app.services.analyze.pipeline import (
+    PipelineInputError,
+    build_pipeline_request,
+    run_analysis,
+)
+from backend.app.services.storage import ArchiveError, extract_archive, remove_files, save_upload
+from backend.app.services.wordcloud.wordcloud_gen import load_wordcloud_spec, render_wordcloud
 
 router = APIRouter(prefix="/analyze", tags=["analyze"])
 
+
 @router.post("")
 async def analyze_file(
     file: UploadFile = File(...),
-    llm_api_key: str = Form(...),
+    llm_api_key: Optional[str] = Form(None),
     llm_base_url: Optional[str] = Form(None),
     llm_model: str = Form("gpt-5-mini-2025-08-07"),
+    llm_fast_model: Optional[str] = Form(None),  # 輕量頁面改用的模型；未填則用 LLM_FAST_MODEL
+    wordcloud_mode: str = Form("lazy"),  # lazy：回傳延遲渲染 URL；inline：等圖片完成才回傳
+    stages: Optional[str] = Form(None),  # 例如 summary,keywords,wordcloud,mindmap；預設不含 mindmap
+    mindmap_image_format: str = Form("png"),
+    mindmap_render_mode: str = Form("async"),
+    summary_mode: str = Form("llm"),  # llm / local（本地 TextRank，不需 API key）/ auto（LLM 過載時自動降級）
+    deadline_ms: Optional[int] = Form(None),  # 需在此時間內回應；來不及的部分降級為本地摘要或略過
+    x_profile_token: Optional[str] = Header(None),  # 帶上與 PROFILE_TOKEN 相同的值即剖析本次請求
 ):
     if not file.filename:
         raise HTTPException(400, "檔案名稱缺失，請重新上傳。")
+    try:
+        profile = profiling_requested(x_profile_token)
+    except PermissionError as exc:
+        raise HTTPException(403, str(exc)) from exc
+    try:
+        settings, options = build_pipeline_request(
+            llm_api_key,
+            llm_base_url,
+            llm_model,
+            wordcloud_mode=wordcloud_mode,
+            stages=stages,
+            mindmap_image_format=mindmap_image_format,
+            mindmap_render_mode=mindmap_render_mode,
+            summary_mode=summary_mode,
+            llm_fast_model=llm_fast_model,
+            deadline_ms=deadline_ms,
+        )
+    except PipelineInputError as exc:
+        raise HTTPException(400, str(exc)) from exc
+    admission = get_admission_controller()
+    try:
+        admission.check_queue()
+    except AdmissionRejected as exc:
+        raise HTTPException(503, str(exc), headers=retry_after_header(exc)) from exc
 
     async def event_stream():
         queue: asyncio.Queue[Optional[str]] = asyncio.Queue()
@@ -34,142 +79,191 @@ async def analyze_file(
             await queue.put(json.dumps(payload, ensure_ascii=False) + "\n")
 
         async def run_pipeline():
+            timings = StageTimings("analyze")
+            # 截止時間從收到請求起算（包含儲存上傳檔）
+            deadline = Deadline.from_ms(options.deadline_ms)
             try:
-                await push_event({"type": "progress", "progress": 5, "message": "開始儲存檔案"})
-                saved_path = save_upload(file)
-                await push_event({"type": "progress", "progress": 12, "message": "檔案儲存完成"})
+                async with RequestProfiler("analyze") if profile else nullcontext() as profiler:
+                    await push_event({"type": "progress", "progress": 5, "message": "開始儲存檔案"})
+                    with timings.stage("upload_save"):
+                        saved_path = save_upload(file)
+                    await push_event({"type": "progress", "progress": 12, "message": "檔案儲存完成"})
 
-                _, ext = os.path.splitext(saved_path)
-                try:
-                    pages = parse_pages(saved_path, ext)
-                except ValueError as exc:
-                    raise HTTPException(400, str(exc)) from exc
+                    async def queue_progress(position: int, queued: int):
+                        await push_event(
+                            {
+                                "type": "progress",
+                                "progress": 12,
+                                "message": f"排隊中（第 {position}/{queued} 位）",
+                                "queue_position": position,
+                                "queue_length": queued,
+                            }
+                        )
+
+                    async def analyze():
+                        with INFLIGHT.labels(resource="analyze_requests").track_inprogress():
+                            return await run_analysis(
+                                saved_path, file.filename, settings, options, push_event, timings, deadline
+                            )
+
+                    cost = await asyncio.to_thread(estimate_file_cost, saved_path)
+                    # 有 deadline 時排隊不超過剩餘時間
+                    max_wait = admission.max_wait if deadline is None else min(admission.max_wait, deadline.remaining())
+                    try:
+                        async with admission.admit(cost, on_position=queue_progress, max_wait=max_wait):
+                            response_payload = await analyze()
+                    except AdmissionRejected as exc:
+                        if deadline is None or exc.reason != "timeout" or not deadline.expired():
+                            raise
+                        # 排隊到 deadline 仍未輪到：照 deadline 語意回傳降級結果（全部本地摘要、略過選用 stage），
+                        # 不呼叫 LLM，也不再等名額
+                        response_payload = await analyze()
 
+                result_event = {
+                    "type": "result",
+                    "progress": 100,
+                    "message": "分析完成",
+                    "data": response_payload.model_dump(mode="json"),
+                    "timings": timings.as_dict(),
+                }
+                if profiler is not None:
+                    result_event["profile"] = profile_links(profiler.report)
+                await push_event(result_event)
+            except AdmissionRejected as exc:
+                # 串流已開始，無法再改 HTTP 狀態碼：以 error 事件帶出 503 與建議重試秒數
                 await push_event(
                     {
-                        "type": "progress",
-                        "progress": 28,
-                        "message": f"完成文字解析，共 {len(pages)} 頁",
+                        "type": "error",
+                        "progress": 100,
+                        "message": str(exc),
+                        "status": 503,
+                        "retry_after": exc.retry_after,
                     }
                 )
-
-                classified = [classify_page(page.page_number, page.text) for page in pages]
+            except PipelineInputError as exc:
                 await push_event(
                     {
-                        "type": "progress",
-                        "progress": 35,
-                        "message": "頁面判定完成",
+                        "type": "error",
+                        "progress": 100,
+                        "message": str(exc),
                     }
                 )
-
-                settings = LLMSettings(api_key=llm_api_key, base_url=llm_base_url, model=llm_model)
-                engine = SummaryEngine(settings=settings, concurrency=4)
-
-                total_pages = len(classified)
-                completed_pages = 0
-
-                async def page_progress(_: int):
-                    nonlocal completed_pages
-                    completed_pages += 1
-                    base = 35
-                    span = 50
-                    percent = base + int(span * completed_pages / max(1, total_pages))
-                    await push_event(
-                        {
-                            "type": "progress",
-                            "progress": min(percent, 90),
-                            "message": f"完成第 {completed_pages}/{total_pages} 頁摘要",
-                        }
-                    )
-
-                page_results = await engine.summarize_pages(classified, progress_callback=page_progress)
-
+            except Exception as exc:  # pylint: disable=broad-except
                 await push_event(
                     {
-                        "type": "progress",
-                        "progress": 92,
-                        "message": "彙整全局摘要",
+                        "type": "error",
+                        "progress": 100,
+                        "message": f"分析失敗：{exc}",
                     }
                 )
+            finally:
+                await queue.put(None)
 
-                global_summary = await engine.summarize_global(page_results)
+        pipeline_task = asyncio.create_task(run_pipeline())
 
-                joined_text = "\n".join(page.text for page in pages)
-                language = detect_lang(joined_text)
-                visual_language = determine_visual_language(joined_text, language)
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield event
+        finally:
+            await pipeline_task
 
-                paragraph_objs = [
-                    Paragraph(index=idx, text=page.text or "", start_char=0, end_char=len(page.text or ""))
-                    for idx, page in enumerate(pages)
-                ]
-                paragraph_keywords = extract_keywords_by_paragraph(paragraph_objs, language)
-                keyword_lookup = {item["paragraph_index"]: item["keywords"] for item in paragraph_keywords}
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
 
-                visual_keywords = (
-                    paragraph_keywords
-                    if visual_language == language
-                    else extract_keywords_by_paragraph(paragraph_objs, visual_language)
-                )
 
-                wordcloud_url = None
+def _save_batch_uploads(files: List[UploadFile]) -> List[BatchDocument]:
+    """逐檔串流存檔；zip 逐一解壓其中支援的文件後刪除壓縮檔本身。任何一檔不合法就清掉已存的檔案。"""
+    saved: List[Tuple[str, str]] = []
+    try:
+        for upload in files:
+            name = upload.filename or ""
+            ext = os.path.splitext(name)[1].lower()
+            if ext == ".zip":
+                archive_path = save_upload(upload)
                 try:
-                    wc_path = build_wordcloud(visual_keywords, visual_language, joined_text)
-                    wordcloud_url = make_public_url(wc_path)
-                except Exception as exc:  # pylint: disable=broad-except
-                    reason = "文字雲生成失敗"
-                    if isinstance(exc, RuntimeError) and "不足" in str(exc):
-                        reason = "文字雲素材不足"
-                    await push_event(
-                        {
-                            "type": "progress",
-                            "progress": 95,
-                            "message": f"{reason}：{exc}",
-                        }
+                    saved.extend(
+                        extract_archive(
+                            archive_path,
+                            SUPPORTED_EXTENSIONS,
+                            max_files=BATCH_MAX_FILES - len(saved),
+                            max_bytes=BATCH_MAX_EXTRACT_MB * 1024 * 1024,
+                        )
                     )
+                finally:
+                    remove_files([archive_path])
+            elif ext in SUPPORTED_EXTENSIONS:
+                if len(saved) >= BATCH_MAX_FILES:
+                    raise ArchiveError(f"一次最多上傳 {BATCH_MAX_FILES} 份文件")
+                saved.append((name, save_upload(upload)))
+            else:
+                raise ArchiveError(f"不支援的檔案：{name}（可用：{', '.join(SUPPORTED_EXTENSIONS)}、.zip）")
+    except BaseException:
+        # 任何失敗（含寫檔錯誤）都不留下已存的檔案
+        remove_files(path for _, path in saved)
+        raise
+    return [
+        BatchDocument(doc_id=f"d{index}", filename=name, path=path)
+        for index, (name, path) in enumerate(saved, start=1)
+    ]
 
-                response_payload = AnalyzeResponse(
-                    language=language,
-                    total_pages=total_pages,
-                    page_summaries=[
-                        PageSummary(
-                            page_number=result.page_number,
-                            classification=result.classification,
-                            bullets=result.bullets,
-                            keywords=keyword_lookup.get(result.page_number - 1, []),
-                            skipped=result.skipped,
-                            skip_reason=result.skip_reason,
-                        )
-                        for result in page_results
-                    ],
-                    global_summary=global_summary,
-                    system_prompt=SYSTEM_PROMPT,
-                    wordcloud_image_url=wordcloud_url,
-                )
 
-                await push_event(
-                    {
-                        "type": "result",
-                        "progress": 100,
-                        "message": "分析完成",
-                        "data": response_payload.model_dump(mode="json"),
-                    }
-                )
-            except HTTPException as exc:
-                await push_event(
-                    {
-                        "type": "error",
-                        "progress": 100,
-                        "message": exc.detail,
-                    }
-                )
+@router.post("/batch")
+async def analyze_batch(
+    files: List[UploadFile] = File(...),  # 多個文件，或一個以上的 zip
+    llm_api_key: Optional[str] = Form(None),
+    llm_base_url: Optional[str] = Form(None),
+    llm_model: str = Form("gpt-5-mini-2025-08-07"),
+    llm_fast_model: Optional[str] = Form(None),
+    wordcloud_mode: str = Form("lazy"),
+    stages: Optional[str] = Form(None),
+    mindmap_image_format: str = Form("png"),
+    mindmap_render_mode: str = Form("async"),
+    summary_mode: str = Form("llm"),
+):
+    """
+    批次分析：所有文件的頁面共用同一個 LLM 連線池與並行上限（BATCH_LLM_CONCURRENCY），
+    以單一 NDJSON 串流回傳，每個事件以 doc_id 區分文件，最後送出 batch_result。
+    """
+    try:
+        settings, options = build_pipeline_request(
+            llm_api_key,
+            llm_base_url,
+            llm_model,
+            wordcloud_mode=wordcloud_mode,
+            stages=stages,
+            mindmap_image_format=mindmap_image_format,
+            mindmap_render_mode=mindmap_render_mode,
+            summary_mode=summary_mode,
+            llm_fast_model=llm_fast_model,
+        )
+    except PipelineInputError as exc:
+        raise HTTPException(400, str(exc)) from exc
+    admission = get_admission_controller()
+    try:
+        admission.check_queue()
+    except AdmissionRejected as exc:
+        raise HTTPException(503, str(exc), headers=retry_after_header(exc)) from exc
+    # 在回應開始前存檔：上傳暫存檔在串流期間可能已被關閉，且壓縮檔錯誤可以直接回 400
+    try:
+        documents = await asyncio.to_thread(_save_batch_uploads, files)
+    except ArchiveError as exc:
+        raise HTTPException(400, str(exc)) from exc
+    if not documents:
+        raise HTTPException(400, "沒有可分析的文件。")
+
+    async def event_stream():
+        queue: asyncio.Queue[Optional[str]] = asyncio.Queue()
+
+        async def push_event(payload: dict):
+            await queue.put(json.dumps(payload, ensure_ascii=False) + "\n")
+
+        async def run_pipeline():
+            try:
+                await push_event(await run_batch(documents, settings, options, push_event))
             except Exception as exc:  # pylint: disable=broad-except
-                await push_event(
-                    {
-                        "type": "error",
-                        "progress": 100,
-                        "message": f"分析失敗：{exc}",
-                    }
-                )
+                await push_event({"type": "error", "progress": 100, "message": f"批次分析失敗：{exc}"})
             finally:
                 await queue.put(None)
 
@@ -185,3 +279,19 @@ async def analyze_file(
             await pipeline_task
 
     return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+
+@router.get("/wordcloud/{key}")
+async def wordcloud_image(key: str):
+    """延遲渲染文字雲：第一次請求時在 process pool 產生圖片，之後直接讀快取。"""
+    if not key.isalnum():
+        raise HTTPException(400, "無效的文字雲代碼")
+    spec = load_wordcloud_spec(key)
+    if spec is None:
+        raise HTTPException(404, "找不到對應的文字雲")
+    try:
+        with STAGE_SECONDS.labels(pipeline="wordcloud", stage="render").time():
+            path = await render_wordcloud(spec)
+    except Exception as exc:  # pylint: disable=broad-except
+        raise HTTPException(500, f"文字雲生成失敗：{exc}") from exc
+    return FileResponse(path, media_type="image/png")
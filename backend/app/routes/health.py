@@ -1,4 +1,7 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from backend.app.core.warmup import warmup_status
 
 router = APIRouter(prefix="/health", tags=["health"])
 
@@ -6,14 +9,20 @@ router = APIRouter(prefix="/health", tags=["health"])
 def ok():
     return {"status": "ok"}
 
+@router.get("/ready")
+def ready():
+    """jieba 詞典與字型暖機完成前回 503，讓負載平衡器暫緩導入流量。"""
+    status = warmup_status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
 @router.get("/debug/paths")
 def debug_paths():
-    from backend.app.core.config import BASE_DIR, STORAGE_DIR, UPLOAD_DIR, WORDCLOUD_DIR, FONTS_DIR, DEFAULT_ZH_FONT
+    from backend.app.core.config import BASE_DIR, STORAGE_DIR, UPLOAD_DIR, WORDCLOUD_DIR, FONTS_DIR, get_default_zh_font
     return {
         "BASE_DIR": BASE_DIR,
         "STORAGE_DIR": STORAGE_DIR,
         "UPLOAD_DIR": UPLOAD_DIR,
         "WORDCLOUD_DIR": WORDCLOUD_DIR,
         "FONTS_DIR": FONTS_DIR,
-        "DEFAULT_ZH_FONT": DEFAULT_ZH_FONT,
-    }
\ No newline at end of file
+        "DEFAULT_ZH_FONT": get_default_zh_font(),
+    }
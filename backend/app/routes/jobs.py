@@ -0,0 +1,104 @@
+import asyncio
+import json
+from typing import Optional
+
+from fastapi import APIRouter, File, Form, HTTPException, Query, UploadFile
+from fastapi.responses import StreamingResponse
+
+from backend.app.services.analyze.pipeline import PipelineInputError, build_pipeline_request
+from backend.app.services.jobs.manager import get_job_manager
+from backend.app.services.storage import save_upload
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+# 沒有新事件時多久重新查一次 SQLite（涵蓋其他 worker 行程寫入的事件）
+EVENT_POLL_SECONDS = 1.0
+
+
+@router.post("", status_code=202)
+async def create_job(
+    file: UploadFile = File(...),
+    llm_api_key: Optional[str] = Form(None),
+    llm_base_url: Optional[str] = Form(None),
+    llm_model: str = Form("gpt-5-mini-2025-08-07"),
+    llm_fast_model: Optional[str] = Form(None),  # 輕量頁面改用的模型；未填則用 LLM_FAST_MODEL
+    wordcloud_mode: str = Form("lazy"),
+    stages: Optional[str] = Form(None),
+    mindmap_image_format: str = Form("png"),
+    mindmap_render_mode: str = Form("async"),
+    summary_mode: str = Form("llm"),  # llm / local（本地 TextRank，不需 API key）/ auto（LLM 過載時自動降級）
+):
+    """與 /analyze 參數相同，但立即回傳 job id；進度改由 /jobs/{id}/events 取得。"""
+    if not file.filename:
+        raise HTTPException(400, "檔案名稱缺失，請重新上傳。")
+    try:
+        settings, options = build_pipeline_request(
+            llm_api_key,
+            llm_base_url,
+            llm_model,
+            wordcloud_mode=wordcloud_mode,
+            stages=stages,
+            mindmap_image_format=mindmap_image_format,
+            mindmap_render_mode=mindmap_render_mode,
+            summary_mode=summary_mode,
+            llm_fast_model=llm_fast_model,
+        )
+    except PipelineInputError as exc:
+        raise HTTPException(400, str(exc)) from exc
+
+    saved_path = save_upload(file)
+    job_id = await get_job_manager().submit(file.filename, saved_path, settings, options)
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"{router.prefix}/{job_id}",
+        "events_url": f"{router.prefix}/{job_id}/events",
+    }
+
+
+@router.get("/{job_id}")
+def get_job(job_id: str):
+    """回傳工作狀態；完成後 result 即為 AnalyzeResponse。"""
+    record = get_job_manager().store.get_job(job_id)
+    if record is None:
+        raise HTTPException(404, "找不到指定的工作")
+    return {
+        "job_id": record.id,
+        "status": record.status,
+        "filename": record.filename,
+        "result": record.result,
+        "error": record.error,
+        "created_at": record.created_at,
+        "updated_at": record.updated_at,
+    }
+
+
+@router.get("/{job_id}/events")
+async def job_events(job_id: str, after: int = Query(0, ge=0), follow: bool = True):
+    """
+    以 NDJSON 串流事件，每行帶 seq。斷線後用 after=<最後收到的 seq> 續傳；
+    follow=false 時只回傳目前已有的事件。
+    """
+    manager = get_job_manager()
+    # SQLite 查詢會阻塞（鎖住時最多等 30 秒），一律放到執行緒，避免拖住整個 event loop
+    if await asyncio.to_thread(manager.store.get_job, job_id) is None:
+        raise HTTPException(404, "找不到指定的工作")
+
+    async def stream():
+        cursor = after
+        while True:
+            events = await asyncio.to_thread(manager.store.events_after, job_id, cursor)
+            for seq, payload in events:
+                cursor = seq
+                yield json.dumps({"seq": seq, **payload}, ensure_ascii=False) + "\n"
+            if events:
+                continue
+            record = await asyncio.to_thread(manager.store.get_job, job_id)
+            if not follow or record is None or record.finished:
+                # 終止狀態在最後事件之後才寫入，再補查一次即可確保不漏
+                for seq, payload in await asyncio.to_thread(manager.store.events_after, job_id, cursor):
+                    yield json.dumps({"seq": seq, **payload}, ensure_ascii=False) + "\n"
+                break
+            await manager.wait_for_update(job_id, EVENT_POLL_SECONDS)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from backend.app.core.metrics import CONTENT_TYPE, render_metrics
+
+router = APIRouter(tags=["metrics"])
+
+@router.get("/metrics")
+def metrics():
+    """
+    Prometheus 文字格式。pre-fork 模式下合併所有 worker 的快照（counter / histogram 含已結束的 worker，
+    gauge 只計仍在執行的 worker），不論 scrape 打到哪個 worker 結果一致。
+    """
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
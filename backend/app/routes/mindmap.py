@@ -1,18 +1,22 @@
+import asyncio
+from contextlib import nullcontext
 from typing import Optional
 
-from fastapi import APIRouter, File, Form, HTTPException, UploadFile
+from fastapi import APIRouter, File, Form, Header, HTTPException, UploadFile
 
-from backend.app.services.mindmap.mindmap_gen import (
-    build_graphviz_mindmap,
-    build_mermaid_mindmap,
-    infer_doc_title,
-    save_graphviz_png,
-    save_mermaid,
-    select_root_label,
+from backend.app.core.admission import (
+    AdmissionRejected,
+    estimate_file_cost,
+    get_admission_controller,
+    retry_after_header,
 )
+from backend.app.core.metrics import StageTimings
+from backend.app.core.profiling import RequestProfiler, profile_links, profiling_requested
+
+from backend.app.services.mindmap.mindmap_gen import generate_mindmap, infer_doc_title
+from backend.app.services.mindmap.render_service import RENDER_FORMATS, get_render_service
 from backend.app.services.nlp.keyword_extractor import extract_keywords_by_paragraph
 from backend.app.services.nlp.language_detect import detect_lang, determine_visual_language
-from backend.app.services.nlp.segmenter import ensure_offsets_if_needed
 from backend.app.services.parsing.file_loader import load_file_as_text_and_paragraphs
 from backend.app.services.storage import make_public_url, save_upload
 
@@ -24,6 +28,9 @@ async def mindmap_endpoint(
     llm_api_key: Optional[str] = Form(None),   # 目前心智圖不一定需要 LLM；保留擴充
     llm_base_url: Optional[str] = Form(None),
     llm_model: Optional[str] = Form(None),
+    image_format: str = Form("png"),          # png / svg（svg 較小且渲染較快）
+    render_mode: str = Form("sync"),          # sync：等圖片完成；async：先回傳 Mermaid，圖片背景渲染
+    x_profile_token: Optional[str] = Header(None),
 ):
     """
     讀取上傳檔案 -> 分段 -> 關鍵字 -> 生成 Mermaid mindmap 文字，並把 .mmd 存到 storage/mindmaps。
@@ -33,14 +40,52 @@ async def mindmap_endpoint(
       - paragraph_keywords
       - mindmap_mermaid (文字)
       - mindmap_file_url (下載 .mmd 的公開 URL)
-      - mindmap_image_url (PNG 心智圖圖片)
+      - mindmap_image_url (PNG/SVG 心智圖圖片；async 模式下完成前檔案可能尚未存在)
+      - mindmap_image_status (ready / pending / failed)
+      - mindmap_image_status_url (查詢背景渲染進度)
+      - timings (各階段耗時，毫秒)
+      - profile (帶 X-Profile-Token 時：flamegraph 與記憶體報告連結)
     """
+    image_format = (image_format or "png").lower()
+    if image_format not in RENDER_FORMATS:
+        raise HTTPException(400, f"不支援的心智圖圖片格式: {image_format}")
+    if render_mode not in {"sync", "async"}:
+        raise HTTPException(400, f"render_mode 僅支援 sync / async：{render_mode}")
+    try:
+        profile = profiling_requested(x_profile_token)
+    except PermissionError as exc:
+        raise HTTPException(403, str(exc)) from exc
+
+    async with RequestProfiler("mindmap") if profile else nullcontext() as profiler:
+        result = await _build_mindmap(file, image_format, render_mode)
+    if profiler is not None:
+        result["profile"] = profile_links(profiler.report)
+    return result
+
+
+async def _build_mindmap(file: UploadFile, image_format: str, render_mode: str) -> dict:
+    timings = StageTimings("mindmap")
+
     # 1) 先存上傳檔（沿用現有 storage 邏輯）
-    abs_path = save_upload(file)
+    with timings.stage("upload_save"):
+        abs_path = save_upload(file)
+
+    # 超出記憶體 / CPU 預算時排隊，等太久回 503
+    cost = await asyncio.to_thread(estimate_file_cost, abs_path)
+    try:
+        async with get_admission_controller().admit(cost):
+            return await _mindmap_from_upload(abs_path, file.filename, timings, image_format, render_mode)
+    except AdmissionRejected as exc:
+        raise HTTPException(503, str(exc), headers=retry_after_header(exc)) from exc
 
+
+async def _mindmap_from_upload(
+    abs_path: str, filename: Optional[str], timings: StageTimings, image_format: str, render_mode: str
+) -> dict:
     # 2) 讀檔 + 分段
     try:
-        full_text, paragraphs = load_file_as_text_and_paragraphs(abs_path)
+        with timings.stage("parse"):
+            full_text, paragraphs = load_file_as_text_and_paragraphs(abs_path)
     except ValueError as exc:
         raise HTTPException(400, str(exc)) from exc
     except Exception as exc:  # pylint: disable=broad-except
@@ -49,37 +94,44 @@ async def mindmap_endpoint(
     if not full_text or not full_text.strip():
         raise HTTPException(400, "檔案內容為空，或解析不到文字（掃描 PDF 可考慮加 OCR）")
 
-    lang = detect_lang(full_text)
-    visual_lang = determine_visual_language(full_text, lang)
-    paragraphs = ensure_offsets_if_needed(full_text, paragraphs)
-    doc_title = infer_doc_title(paragraphs, file.filename or "Document")
+    with timings.stage("language"):
+        lang = detect_lang(full_text)
+        visual_lang = determine_visual_language(full_text, lang)
+    doc_title = infer_doc_title(paragraphs, filename or "Document")
 
-    # 整理 paragraphs 結構（index, text, start_char, end_char）
-    para_payload = [p.model_dump() for p in paragraphs]
+    # 解析器回傳的是 offset view，只在回應時才轉成 (index, text, start_char, end_char)
+    para_payload = [p.to_dict() for p in paragraphs]
 
     # 3) 關鍵字（每段）
-    paragraph_keywords = extract_keywords_by_paragraph(paragraphs, visual_lang)
+    with timings.stage("keywords"):
+        paragraph_keywords = extract_keywords_by_paragraph(paragraphs, visual_lang)
 
-    # 4) 生成 Mermaid mindmap
+    # 4) 生成 Mermaid mindmap + Graphviz 圖片
     # doc title 盡量取原檔名；沒有就用 meta/title
-    root_title = select_root_label(paragraph_keywords, doc_title)
-    mmd_text = build_mermaid_mindmap(root_title, paragraph_keywords, top_k=8, max_refs_per_kw=5)
-    mmd_abs, _ = save_mermaid(mmd_text, name_hint=root_title)
-
-    graph = build_graphviz_mindmap(root_title, paragraph_keywords, top_k=8, max_refs_per_kw=5)
-    png_abs, png_name = save_graphviz_png(graph, name_hint=root_title)
-
-    # 5) 對外 URL
-    mmd_url = make_public_url(mmd_abs)
+    mindmap = await generate_mindmap(paragraph_keywords, doc_title, image_format, render_mode, timings=timings)
 
     return {
         "language": visual_lang,
         "paragraphs": para_payload,
         "paragraph_keywords": paragraph_keywords,
-        "doc_title": root_title,
-        "mindmap_mermaid": mmd_text,
-        "mindmap_file_url": mmd_url,           # e.g. /static/mindmaps/xxx.mmd
-        "mindmap_image_url": make_public_url(png_abs) if png_abs else None,
-        "mindmap_image_file": png_name,
+        **mindmap,
         "source_upload_url": make_public_url(abs_path),  # 方便除錯
+        "timings": timings.as_dict(),
+    }
+
+
+@router.get("/render/{render_key}")
+def mindmap_render_status(render_key: str, fmt: str = "png"):
+    """查詢背景渲染狀態：ready 時附上圖片 URL。"""
+    if fmt not in RENDER_FORMATS or not render_key.isalnum():
+        raise HTTPException(400, "無效的渲染查詢參數")
+    service = get_render_service()
+    status, error = service.status(render_key, fmt)
+    if status == "missing":
+        raise HTTPException(404, "找不到對應的心智圖渲染工作")
+    image_abs = service.lookup(render_key, fmt)
+    return {
+        "status": status,
+        "error": error,
+        "mindmap_image_url": make_public_url(image_abs) if image_abs else None,
     }
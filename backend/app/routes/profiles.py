@@ -0,0 +1,22 @@
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import FileResponse
+
+from backend.app.core.profiling import profiling_requested, resolve_profile
+
+router = APIRouter(prefix="/profiles", tags=["profiles"])
+
+@router.get("/{name}")
+def get_profile(name: str, x_profile_token: Optional[str] = Header(None)):
+    """下載剖析輸出（folded stacks / 記憶體報告）；需帶與 PROFILE_TOKEN 相同的 X-Profile-Token。"""
+    try:
+        allowed = profiling_requested(x_profile_token)
+    except PermissionError as exc:
+        raise HTTPException(403, str(exc)) from exc
+    if not allowed:
+        raise HTTPException(403, "需要 X-Profile-Token")
+    path = resolve_profile(name)
+    if path is None:
+        raise HTTPException(404, "找不到剖析檔案")
+    return FileResponse(path, media_type="text/plain; charset=utf-8")
@@ -0,0 +1,136 @@
+"""Multi-document analysis sharing one LLM pool, multiplexed into one event stream."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+from backend.app.core.admission import AdmissionRejected, estimate_file_cost, get_admission_controller
+from backend.app.core.config import BATCH_DOCUMENT_CONCURRENCY, BATCH_LLM_CONCURRENCY
+from backend.app.core.metrics import INFLIGHT, StageTimings
+from backend.app.models.schemas import LLMSettings
+from backend.app.services.analyze.page_parser import parse_document
+from backend.app.services.analyze.pipeline import EventSink, PipelineInputError, PipelineOptions, run_analysis
+from backend.app.services.analyze.summary_engine import LLMPool
+
+
+@dataclass
+class BatchDocument:
+    doc_id: str
+    filename: str
+    path: str
+
+
+async def run_batch(
+    documents: List[BatchDocument],
+    settings: Optional[LLMSettings],
+    options: PipelineOptions,
+    push_event: EventSink,
+    llm_concurrency: int = BATCH_LLM_CONCURRENCY,
+    document_concurrency: int = BATCH_DOCUMENT_CONCURRENCY,
+) -> dict:
+    """
+    同時分析多份文件：所有文件的頁面摘要在同一個 LLMPool 排隊（一個 client、一個並行上限），
+    解析在執行緒中進行，最多 document_concurrency 份文件同時佔用記憶體。
+    每個事件都帶 doc_id / filename，單一文件失敗只回報該文件的 error 事件，不中斷整批。
+    """
+    pool = LLMPool(settings, llm_concurrency)
+    slots = asyncio.Semaphore(max(1, document_concurrency))
+    admission = get_admission_controller()
+    statuses = {doc.doc_id: "queued" for doc in documents}
+    started = time.perf_counter()
+
+    await push_event(
+        {
+            "type": "batch",
+            "progress": 0,
+            "message": f"收到 {len(documents)} 份文件",
+            "documents": [{"doc_id": doc.doc_id, "filename": doc.filename} for doc in documents],
+        }
+    )
+
+    async def _run_one(doc: BatchDocument) -> None:
+        async def doc_event(payload: dict) -> None:
+            await push_event({**payload, "doc_id": doc.doc_id, "filename": doc.filename})
+
+        async def queue_progress(position: int, queued: int) -> None:
+            await doc_event(
+                {
+                    "type": "progress",
+                    "progress": 12,
+                    "message": f"排隊中（第 {position}/{queued} 位）",
+                    "queue_position": position,
+                    "queue_length": queued,
+                }
+            )
+
+        timings = StageTimings("batch")
+        try:
+            async with slots:
+                statuses[doc.doc_id] = "running"
+                cost = await asyncio.to_thread(estimate_file_cost, doc.path)
+                # 批次已在開始前檢查過佇列長度，個別文件不再因佇列已滿被拒
+                async with admission.admit(cost, on_position=queue_progress, enforce_queue_limit=False):
+                    with INFLIGHT.labels(resource="batch_documents").track_inprogress():
+                        try:
+                            with timings.stage("parse"):
+                                document = await asyncio.to_thread(
+                                    parse_document, doc.path, os.path.splitext(doc.path)[1]
+                                )
+                        except ValueError as exc:
+                            raise PipelineInputError(str(exc)) from exc
+                        response = await run_analysis(
+                            doc.path,
+                            doc.filename,
+                            settings,
+                            options,
+                            doc_event,
+                            timings,
+                            document=document,
+                            llm_pool=pool,
+                        )
+            statuses[doc.doc_id] = "succeeded"
+            await doc_event(
+                {
+                    "type": "result",
+                    "progress": 100,
+                    "message": "分析完成",
+                    "data": response.model_dump(mode="json"),
+                    "timings": timings.as_dict(),
+                }
+            )
+        except AdmissionRejected as exc:
+            statuses[doc.doc_id] = "failed"
+            await doc_event(
+                {
+                    "type": "error",
+                    "progress": 100,
+                    "message": str(exc),
+                    "status": 503,
+                    "retry_after": exc.retry_after,
+                }
+            )
+        except PipelineInputError as exc:
+            statuses[doc.doc_id] = "failed"
+            await doc_event({"type": "error", "progress": 100, "message": str(exc)})
+        except Exception as exc:  # pylint: disable=broad-except
+            statuses[doc.doc_id] = "failed"
+            await doc_event({"type": "error", "progress": 100, "message": f"分析失敗：{exc}"})
+
+    await asyncio.gather(*(_run_one(doc) for doc in documents))
+
+    succeeded = sum(1 for status in statuses.values() if status == "succeeded")
+    return {
+        "type": "batch_result",
+        "progress": 100,
+        "message": f"批次完成：成功 {succeeded} / {len(documents)}",
+        "succeeded": succeeded,
+        "failed": len(documents) - succeeded,
+        "documents": [
+            {"doc_id": doc.doc_id, "filename": doc.filename, "status": statuses[doc.doc_id]} for doc in documents
+        ],
+        "timings": {"total": round((time.perf_counter() - started) * 1000, 1)},
+    }
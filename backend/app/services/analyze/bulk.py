@@ -0,0 +1,276 @@
+"""Offline bulk analysis of a directory tree with a resumable manifest."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set
+
+from backend.app.core.metrics import StageTimings
+from backend.app.models.document import DocumentText
+from backend.app.models.schemas import LLMSettings
+from backend.app.services.analyze.page_parser import SUPPORTED_EXTENSIONS, parse_document
+from backend.app.services.analyze.pipeline import PipelineOptions, run_analysis
+from backend.app.services.analyze.summary_engine import LLMPool
+
+STATUS_OK = "ok"
+STATUS_ERROR = "error"
+
+
+def discover(root: str, extensions=SUPPORTED_EXTENSIONS) -> List[str]:
+    """遞迴列出支援的檔案（依路徑排序，重跑時順序固定）；root 也可以是單一檔案。"""
+    if os.path.isfile(root):
+        return [root]
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if os.path.splitext(name)[1].lower() in extensions and not name.startswith("~$"):
+                found.append(os.path.join(dirpath, name))
+    return found
+
+
+def fingerprint(path: str) -> str:
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class Manifest:
+    """
+    JSONL 檢查點：每份文件處理完（成功或失敗）追加一行 {path, fingerprint, status, ...}。
+    重跑時略過 fingerprint 未變且已成功的檔案；同一路徑有多行時以最後一行為準。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as handle:
+                for line in handle:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 中斷時可能留下寫到一半的最後一行
+                        continue
+                    self.entries[entry["path"]] = entry
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._handle = open(path, "a", encoding="utf-8")
+
+    def is_done(self, path: str, current: str, retry_failed: bool = False) -> bool:
+        entry = self.entries.get(path)
+        if entry is None or entry.get("fingerprint") != current:
+            return False
+        return entry.get("status") == STATUS_OK or not retry_failed
+
+    def append(self, entry: dict) -> None:
+        self.entries[entry["path"]] = entry
+        self._handle.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+
+    def close(self) -> None:
+        self._handle.close()
+
+
+def _compact_results(out_path: str, manifest: Manifest, pending: Set[str]) -> None:
+    """
+    移除結果檔中沒有對應檢查點的行（寫完結果、還沒寫 manifest 就中斷），
+    以及這次要重跑的檔案的舊結果，避免續跑後出現重複。
+    """
+    if not os.path.exists(out_path):
+        return
+    tmp_path = f"{out_path}.tmp"
+    dropped = 0
+    with open(out_path, "r", encoding="utf-8") as source, open(tmp_path, "w", encoding="utf-8") as target:
+        for line in source:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                dropped += 1
+                continue
+            entry = manifest.entries.get(record.get("path"))
+            if (
+                record.get("path") in pending
+                or entry is None
+                or entry.get("fingerprint") != record.get("fingerprint")
+            ):
+                dropped += 1
+                continue
+            target.write(line if line.endswith("\n") else line + "\n")
+    if dropped:
+        os.replace(tmp_path, out_path)
+    else:
+        os.remove(tmp_path)
+
+
+def _parse_in_worker(path: str) -> DocumentText:
+    return parse_document(path, os.path.splitext(path)[1].lower())
+
+
+async def _noop_event(_: dict) -> None:
+    return None
+
+
+@dataclass
+class BulkConfig:
+    root: str
+    out_path: str
+    manifest_path: Optional[str] = None
+    # 解析用的 process 數
+    workers: int = field(default_factory=lambda: os.cpu_count() or 1)
+    # 同時在記憶體中的文件數（已解析、等待 LLM）；0 表示 workers * 2
+    documents_in_flight: int = 0
+    # 所有文件共用的 LLM 並行數
+    llm_concurrency: int = 8
+    retry_failed: bool = False
+    limit: Optional[int] = None
+
+    def resolved_manifest(self) -> str:
+        return self.manifest_path or f"{self.out_path}.manifest.jsonl"
+
+
+@dataclass
+class BulkReport:
+    total: int = 0
+    skipped: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    pages: int = 0
+    elapsed_s: float = 0.0
+
+    @property
+    def processed(self) -> int:
+        return self.succeeded + self.failed
+
+    @property
+    def docs_per_minute(self) -> float:
+        return self.processed / self.elapsed_s * 60 if self.elapsed_s > 0 else 0.0
+
+    @property
+    def pages_per_minute(self) -> float:
+        return self.pages / self.elapsed_s * 60 if self.elapsed_s > 0 else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "total": self.total,
+            "skipped": self.skipped,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "pages": self.pages,
+            "elapsed_s": round(self.elapsed_s, 2),
+            "docs_per_minute": round(self.docs_per_minute, 2),
+            "pages_per_minute": round(self.pages_per_minute, 1),
+        }
+
+
+async def run_bulk(
+    config: BulkConfig,
+    settings: Optional[LLMSettings],
+    options: PipelineOptions,
+    log: Callable[[str], None] = print,
+) -> BulkReport:
+    """
+    解析交給 process pool（spawn，避免 fork 複製 event loop 與執行緒狀態），
+    摘要 / 關鍵字在本行程的 event loop 執行，所有文件的頁面共用同一個 LLMPool。
+    每份文件完成後先寫結果、再寫 manifest，中斷後以相同參數重跑即可續做。
+    """
+    root = os.path.abspath(config.root)
+    base = root if os.path.isdir(root) else os.path.dirname(root)
+    manifest = Manifest(config.resolved_manifest())
+    report = BulkReport()
+
+    todo: List[str] = []
+    for path in discover(root):
+        rel = os.path.relpath(path, base)
+        report.total += 1
+        try:
+            current = fingerprint(path)
+        except OSError:
+            # 列目錄後才消失的檔案交給 _process 記為失敗
+            current = None
+        if current is not None and manifest.is_done(rel, current, config.retry_failed):
+            report.skipped += 1
+            continue
+        if config.limit is None or len(todo) < config.limit:
+            todo.append(rel)
+    _compact_results(config.out_path, manifest, set(todo))
+    log(f"[bulk] {report.total} 份文件，已完成 {report.skipped}，本次處理 {len(todo)}")
+
+    workers = max(1, config.workers)
+    in_flight = asyncio.Semaphore(config.documents_in_flight or workers * 2)
+    pool = LLMPool(settings, config.llm_concurrency)
+    loop = asyncio.get_running_loop()
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    out_dir = os.path.dirname(os.path.abspath(config.out_path))
+    os.makedirs(out_dir, exist_ok=True)
+    out = open(config.out_path, "a", encoding="utf-8")
+    started = time.perf_counter()
+
+    async def _process(rel: str) -> None:
+        path = os.path.join(base, rel)
+        entry = {"path": rel}
+        doc_started = time.perf_counter()
+        try:
+            # 檔案可能在長時間回填期間被刪除或變成無法讀取；也要記成失敗並歸還名額
+            entry["fingerprint"] = fingerprint(path)
+            timings = StageTimings("bulk")
+            parse_started = time.perf_counter()
+            document = await loop.run_in_executor(executor, _parse_in_worker, path)
+            timings.record("parse", time.perf_counter() - parse_started)
+            response = await run_analysis(
+                path,
+                os.path.basename(path),
+                settings,
+                options,
+                _noop_event,
+                timings=timings,
+                document=document,
+                llm_pool=pool,
+            )
+            record = {**entry, "status": STATUS_OK, "timings": timings.as_dict(), "result": response.model_dump()}
+            entry.update(status=STATUS_OK, pages=response.total_pages)
+            report.succeeded += 1
+            report.pages += response.total_pages
+        except Exception as exc:  # pylint: disable=broad-except
+            record = {**entry, "status": STATUS_ERROR, "error": f"{type(exc).__name__}: {exc}"}
+            entry.update(status=STATUS_ERROR, error=record["error"])
+            report.failed += 1
+        finally:
+            in_flight.release()
+        entry["elapsed_ms"] = int((time.perf_counter() - doc_started) * 1000)
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+        manifest.append(entry)
+
+        report.elapsed_s = time.perf_counter() - started
+        detail = f"{entry.get('pages', 0)}p" if entry["status"] == STATUS_OK else entry["error"]
+        log(
+            f"[bulk] {report.processed}/{len(todo)} {entry['status']:<5} {rel} ({detail}, "
+            f"{entry['elapsed_ms'] / 1000:.1f}s) | {report.docs_per_minute:.1f} docs/min"
+        )
+
+    tasks: List[asyncio.Task] = []
+    try:
+        for rel in todo:
+            # 限制已解析、尚未完成的文件數，避免大量文件同時佔用記憶體
+            await in_flight.acquire()
+            tasks.append(asyncio.create_task(_process(rel)))
+            for task in tasks:
+                if task.done():
+                    # 單檔錯誤已在 _process 內記錄；這裡只會是寫結果 / manifest 失敗，繼續跑也寫不進去
+                    task.result()
+            tasks = [task for task in tasks if not task.done()]
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+        out.close()
+        manifest.close()
+        report.elapsed_s = time.perf_counter() - started
+    return report
@@ -0,0 +1,46 @@
+"""Request deadline bookkeeping for the analysis pipeline."""
+
+from __future__ import annotations
+
+import time
+from typing import Optional
+
+from backend.app.core.config import DEADLINE_GLOBAL_SHARE, DEADLINE_TAIL_SHARE
+
+
+class Deadline:
+    """
+    以 time.monotonic()（與 asyncio loop.time() 同一時鐘）表示的截止時間。
+    預算依比例切給三段：逐頁摘要、全局摘要、其後的關鍵字 / 文字雲 / 心智圖與回傳。
+    """
+
+    def __init__(self, seconds: float, started: Optional[float] = None):
+        self.budget = max(0.0, seconds)
+        self.started = time.monotonic() if started is None else started
+        self.expires_at = self.started + self.budget
+
+    @classmethod
+    def from_ms(cls, deadline_ms: Optional[int]) -> Optional["Deadline"]:
+        return cls(deadline_ms / 1000) if deadline_ms else None
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def checkpoint(self, share_left: float) -> float:
+        """預算剩下 share_left 比例時的時間點。"""
+        return self.expires_at - self.budget * share_left
+
+    @property
+    def pages_until(self) -> float:
+        """逐頁 LLM 摘要最晚到此為止，之後的頁面改用本地摘要。"""
+        return self.checkpoint(DEADLINE_GLOBAL_SHARE + DEADLINE_TAIL_SHARE)
+
+    @property
+    def global_until(self) -> float:
+        return self.checkpoint(DEADLINE_TAIL_SHARE)
+
+    def elapsed_ms(self) -> int:
+        return int((time.monotonic() - self.started) * 1000)
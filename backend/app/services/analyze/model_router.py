@@ -0,0 +1,46 @@
+"""Per-page model routing for the summary cascade."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional
+
+from backend.app.core.config import CASCADE_DENSE_DIGIT_RATIO, CASCADE_LIGHT_MAX_ALNUM
+from .page_classifier import ClassifiedPage
+
+TIER_FAST = "fast"
+TIER_PRIMARY = "primary"
+# 行尾帶數字的行佔比超過此值（表格、財報明細）一律視為數據頁
+TABLE_LINE_RATIO = 0.3
+
+
+@dataclass
+class RouteDecision:
+    model: str
+    tier: str
+    reason: str
+
+
+def route_page(
+    page: ClassifiedPage,
+    primary_model: str,
+    fast_model: Optional[str],
+    light_max_alnum: int = CASCADE_LIGHT_MAX_ALNUM,
+    dense_digit_ratio: float = CASCADE_DENSE_DIGIT_RATIO,
+) -> RouteDecision:
+    """
+    依頁面特徵選模型：短且數據稀疏的頁面（章節扉頁、過場投影片）交給 fast model，
+    長頁、數字密集或表格狀的頁面留給主模型。
+    """
+    if not fast_model or fast_model == primary_model:
+        return RouteDecision(primary_model, TIER_PRIMARY, "no_fast_model")
+    features = page.features
+    if features is None:
+        return RouteDecision(primary_model, TIER_PRIMARY, "no_features")
+    if features.alnum_count > light_max_alnum:
+        return RouteDecision(primary_model, TIER_PRIMARY, "long")
+    if features.alnum_count and features.digit_count / features.alnum_count >= dense_digit_ratio:
+        return RouteDecision(primary_model, TIER_PRIMARY, "numeric")
+    if features.trailing_number_ratio >= TABLE_LINE_RATIO:
+        return RouteDecision(primary_model, TIER_PRIMARY, "table")
+    return RouteDecision(fast_model, TIER_FAST, "light")
@@ -2,96 +2,113 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Union
 
+from backend.app.models.document import TextSpan
 
-@dataclass
-class ClassifiedPage:
-    page_number: int
-    text: str
-    classification: str
-    skip_reason: Optional[str]
+from .page_features import PageFeatures, compute_page_features
 
 
-SKIP_CLASS_LABELS = {"toc", "pure_image", "blank", "cover"}
+class ClassifiedPage:
+    """
+    頁面判定結果。text 可以是字串或指向 DocumentText 的 TextSpan；
+    後者不另存副本，存取 .text 時才切片。
+    """
+
+    __slots__ = ("page_number", "_text", "classification", "skip_reason", "features")
+
+    def __init__(
+        self,
+        page_number: int,
+        text: Union[str, TextSpan],
+        classification: str,
+        skip_reason: Optional[str],
+        features: Optional[PageFeatures] = None,
+    ):
+        self.page_number = page_number
+        self._text = text
+        self.classification = classification
+        self.skip_reason = skip_reason
+        self.features = features
+
+    @property
+    def text(self) -> str:
+        text = self._text
+        return text if isinstance(text, str) else text.text
+
+    def __repr__(self) -> str:
+        return f"ClassifiedPage(page_number={self.page_number}, classification={self.classification!r})"
 
 
-def _line_tokens(text: str) -> list[str]:
-    return [line.strip() for line in text.splitlines() if line.strip()]
+SKIP_CLASS_LABELS = {"toc", "pure_image", "blank", "cover"}
 
 
-def _is_probably_cover(text: str, page_number: int) -> bool:
+def _is_probably_cover(features: PageFeatures, page_number: int) -> bool:
     if page_number != 1:
         return False
-    lines = _line_tokens(text)
-    if not lines:
+    if not features.line_count:
         return True
-    if len(lines) <= 4 and any(keyword in lines[0] for keyword in {"報告", "企畫", "簡報", "計畫", "Proposal", "Report"}):
-        return True
-    return False
+    return features.line_count <= 4 and features.has_cover_keyword
 
 
-def _is_probably_blank(text: str) -> bool:
-    stripped = text.strip()
-    if not stripped:
+def _is_probably_blank(features: PageFeatures) -> bool:
+    if not features.char_count:
         return False
-    alnum = [ch for ch in stripped if ch.isalnum()]
-    return len(alnum) <= 4
-
+    return features.alnum_count <= 4
 
-def _is_probably_pure_image(text: str) -> bool:
-    stripped = text.strip()
-    if stripped:
-        return False
-    return True
 
+def _is_probably_pure_image(features: PageFeatures) -> bool:
+    return not features.char_count
 
-def _is_probably_toc(text: str) -> bool:
-    import re
 
-    lines = _line_tokens(text)
-    if not lines:
+def _is_probably_toc(features: PageFeatures) -> bool:
+    if not features.line_count:
         return False
-    toc_hits = sum(1 for line in lines if re.search(r"\.{2,}\s*\d+$", line) or re.search(r"\s\d+$", line))
-    keywords = {"目錄", "目录", "contents", "content"}
-    has_keyword = any(any(keyword in line.lower() for keyword in keywords) for line in lines[:6])
-    return has_keyword and toc_hits >= max(2, len(lines) // 3)
+    return features.has_toc_keyword and features.trailing_number_lines >= max(2, features.line_count // 3)
 
 
-def classify_page(page_number: int, text: str) -> ClassifiedPage:
-    stripped = text.strip()
+def classify_page(
+    page_number: int, text: Union[str, TextSpan], features: Optional[PageFeatures] = None
+) -> ClassifiedPage:
+    # TextSpan 來自 DocumentText，已經 strip 過，直接沿用 view
+    stripped = text.strip() if isinstance(text, str) else text
+    if features is None:
+        features = compute_page_features(stripped if isinstance(stripped, str) else stripped.text)
 
-    if _is_probably_toc(stripped):
+    if _is_probably_toc(features):
         return ClassifiedPage(
             page_number,
             stripped,
             "toc",
             "〈本頁跳過（目錄）〉本頁僅列出章節與頁碼參考，無實質內容可供摘要。",
+            features,
         )
 
-    if _is_probably_cover(stripped, page_number):
+    if _is_probably_cover(features, page_number):
         return ClassifiedPage(
             page_number,
             stripped,
             "cover",
             "〈本頁跳過（封面）〉僅顯示封面資訊或水印，無需抽取重點。",
+            features,
         )
 
-    if _is_probably_blank(stripped):
+    if _is_probably_blank(features):
         return ClassifiedPage(
             page_number,
             stripped,
             "blank",
             "〈本頁跳過（空白/水印）〉無可辨識文字或數據，略過本頁摘要。",
+            features,
         )
 
-    if _is_probably_pure_image(stripped):
+    if _is_probably_pure_image(features):
         return ClassifiedPage(
             page_number,
             stripped,
             "pure_image",
             "〈本頁跳過（純圖片）〉僅含圖片且無可辨識數據，暫不生成文字重點。",
+            features,
         )
 
-    return ClassifiedPage(page_number, stripped, "normal", None)
+    return ClassifiedPage(page_number, stripped, "normal", None, features)
@@ -0,0 +1,175 @@
+"""Single-pass per-page feature extraction shared by every pipeline stage."""
+
+from __future__ import annotations
+
+import hashlib
+from array import array
+from typing import Iterable, Optional
+
+# Script histogram buckets（索引固定，供 array 存取）
+SCRIPT_LATIN = 0
+SCRIPT_DIGIT = 1
+SCRIPT_CJK = 2
+SCRIPT_KANA = 3
+SCRIPT_HANGUL = 4
+SCRIPT_OTHER = 5
+SCRIPT_BUCKETS = 6
+
+TOC_KEYWORDS = ("目錄", "目录", "contents", "content")
+COVER_KEYWORDS = ("報告", "企畫", "簡報", "計畫", "Proposal", "Report")
+TOC_KEYWORD_LINES = 6
+
+
+def _script_of(code: int) -> int:
+    if 0x4E00 <= code <= 0x9FFF or 0x3400 <= code <= 0x4DBF:
+        return SCRIPT_CJK
+    if 0x3040 <= code <= 0x30FF:
+        return SCRIPT_KANA
+    if 0xAC00 <= code <= 0xD7A3 or 0x1100 <= code <= 0x11FF or 0x3130 <= code <= 0x318F:
+        return SCRIPT_HANGUL
+    return SCRIPT_OTHER
+
+
+def _has_trailing_number(line: str) -> bool:
+    """等同 `\\.{2,}\\s*\\d+$` 或 `\\s\\d+$`，但只從行尾往回掃。"""
+    end = len(line)
+    while end and line[end - 1].isdigit():
+        end -= 1
+    if end == len(line) or end == 0:
+        return False
+    head = line[:end]
+    return head[-1].isspace() or head.rstrip().endswith("..")
+
+
+class PageFeatures:
+    """Compact, immutable-by-convention summary of one page's text."""
+
+    __slots__ = (
+        "line_count",
+        "char_count",
+        "alnum_count",
+        "trailing_number_lines",
+        "scripts",
+        "has_toc_keyword",
+        "has_cover_keyword",
+        "text_hash",
+    )
+
+    def __init__(
+        self,
+        line_count: int,
+        char_count: int,
+        alnum_count: int,
+        trailing_number_lines: int,
+        scripts: array,
+        has_toc_keyword: bool,
+        has_cover_keyword: bool,
+        text_hash: str,
+    ):
+        self.line_count = line_count
+        self.char_count = char_count
+        self.alnum_count = alnum_count
+        self.trailing_number_lines = trailing_number_lines
+        self.scripts = scripts
+        self.has_toc_keyword = has_toc_keyword
+        self.has_cover_keyword = has_cover_keyword
+        self.text_hash = text_hash
+
+    @property
+    def trailing_number_ratio(self) -> float:
+        if not self.line_count:
+            return 0.0
+        return self.trailing_number_lines / self.line_count
+
+    @property
+    def latin_count(self) -> int:
+        return self.scripts[SCRIPT_LATIN]
+
+    @property
+    def digit_count(self) -> int:
+        return self.scripts[SCRIPT_DIGIT]
+
+    @property
+    def cjk_count(self) -> int:
+        return self.scripts[SCRIPT_CJK]
+
+    @property
+    def hangul_count(self) -> int:
+        return self.scripts[SCRIPT_HANGUL]
+
+    def __repr__(self) -> str:
+        return (
+            f"PageFeatures(lines={self.line_count}, chars={self.char_count}, "
+            f"alnum={self.alnum_count}, scripts={list(self.scripts)}, hash={self.text_hash[:8]})"
+        )
+
+
+def compute_page_features(text: str) -> PageFeatures:
+    """Scan the stripped page text exactly once and collect every heuristic input."""
+    stripped = (text or "").strip()
+    scripts = array("I", [0] * SCRIPT_BUCKETS)
+    line_count = 0
+    alnum_count = 0
+    trailing_hits = 0
+    has_toc_keyword = False
+    has_cover_keyword = False
+
+    for raw_line in stripped.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+        if line_count == 0:
+            has_cover_keyword = any(keyword in line for keyword in COVER_KEYWORDS)
+        if line_count < TOC_KEYWORD_LINES and not has_toc_keyword:
+            lowered = line.lower()
+            has_toc_keyword = any(keyword in lowered for keyword in TOC_KEYWORDS)
+        line_count += 1
+        if line[-1].isdigit() and _has_trailing_number(line):
+            trailing_hits += 1
+
+        for ch in line:
+            if not ch.isalnum():
+                continue
+            alnum_count += 1
+            code = ord(ch)
+            if code < 128:
+                scripts[SCRIPT_LATIN if ch.isalpha() else SCRIPT_DIGIT] += 1
+            else:
+                scripts[_script_of(code)] += 1
+
+    text_hash = hashlib.blake2b(stripped.encode("utf-8"), digest_size=16).hexdigest()
+    return PageFeatures(
+        line_count=line_count,
+        char_count=len(stripped),
+        alnum_count=alnum_count,
+        trailing_number_lines=trailing_hits,
+        scripts=scripts,
+        has_toc_keyword=has_toc_keyword,
+        has_cover_keyword=has_cover_keyword,
+        text_hash=text_hash,
+    )
+
+
+def script_histogram(text: str) -> array:
+    """單獨計算一段文字的 script histogram（與 compute_page_features 的分桶相同）。"""
+    scripts = array("I", [0] * SCRIPT_BUCKETS)
+    for ch in text:
+        if not ch.isalnum():
+            continue
+        code = ord(ch)
+        if code < 128:
+            scripts[SCRIPT_LATIN if ch.isalpha() else SCRIPT_DIGIT] += 1
+        else:
+            scripts[_script_of(code)] += 1
+    return scripts
+
+
+def merge_script_histograms(features: Iterable[Optional[PageFeatures]]) -> array:
+    """把多頁的 script histogram 相加，供文件層級的語言判定使用。"""
+    total = array("I", [0] * SCRIPT_BUCKETS)
+    for item in features:
+        if item is None:
+            continue
+        for idx in range(SCRIPT_BUCKETS):
+            total[idx] += item.scripts[idx]
+    return total
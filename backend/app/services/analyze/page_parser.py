@@ -3,8 +3,11 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List
+from typing import Iterator, List
 
+from backend.app.models.document import DocumentText
+from backend.app.services.parsing.ooxml import extract_docx_paragraphs, extract_pptx_slides
+from backend.app.services.parsing.pdf_backends import extract_pdf_pages
 from backend.app.utils.text_clean import normalize_text
 
 
@@ -14,89 +17,77 @@ class PageContent:
     text: str
 
 
-def _parse_pdf(path: str) -> List[PageContent]:
-    from pypdf import PdfReader
+def _iter_pdf(path: str) -> Iterator[str]:
+    for text in extract_pdf_pages(path):
+        yield normalize_text(text)
 
-    reader = PdfReader(path)
-    pages: List[PageContent] = []
-    for idx, page in enumerate(reader.pages, start=1):
-        try:
-            text = page.extract_text() or ""
-        except Exception:
-            text = ""
-        pages.append(PageContent(page_number=idx, text=normalize_text(text)))
-    return pages
 
+def _iter_pptx(path: str) -> Iterator[str]:
+    for texts in extract_pptx_slides(path):
+        yield normalize_text("\n".join(texts))
 
-def _parse_pptx(path: str) -> List[PageContent]:
-    from pptx import Presentation
 
-    prs = Presentation(path)
-    pages: List[PageContent] = []
-    for idx, slide in enumerate(prs.slides, start=1):
-        texts = []
-        for shape in slide.shapes:
-            if hasattr(shape, "text"):
-                text = (shape.text or "").strip()
-                if text:
-                    texts.append(text)
-        pages.append(PageContent(page_number=idx, text=normalize_text("\n".join(texts))))
-    return pages
-
-
-def _parse_docx(path: str) -> List[PageContent]:
-    from docx import Document
-
-    doc = Document(path)
+def _iter_docx(path: str) -> Iterator[str]:
     buffer: List[str] = []
-    pages: List[PageContent] = []
     char_budget = 0
-    page_number = 1
-    for para in doc.paragraphs:
-        text = normalize_text(para.text.strip())
+    emitted = False
+    for para in extract_docx_paragraphs(path):
+        text = normalize_text(para.strip())
         if not text:
             continue
         buffer.append(text)
         char_budget += len(text)
         if char_budget >= 1200:
-            pages.append(PageContent(page_number=page_number, text="\n".join(buffer)))
-            page_number += 1
+            yield "\n".join(buffer)
+            emitted = True
             buffer = []
             char_budget = 0
     if buffer:
-        pages.append(PageContent(page_number=page_number, text="\n".join(buffer)))
-    return pages or [PageContent(page_number=1, text="")]
+        yield "\n".join(buffer)
+    elif not emitted:
+        yield ""
 
 
-def _parse_plain_text(path: str) -> List[PageContent]:
+def _iter_plain_text(path: str) -> Iterator[str]:
     with open(path, "r", encoding="utf-8", errors="ignore") as handle:
         content = normalize_text(handle.read())
-    chunks: List[PageContent] = []
-    words = content.splitlines()
     buffer: List[str] = []
-    page_number = 1
-    for line in words:
-        if len("\n".join(buffer)) > 1500:
-            chunks.append(PageContent(page_number=page_number, text="\n".join(buffer)))
-            page_number += 1
+    size = -1
+    for line in content.splitlines():
+        # size 等同 len("\n".join(buffer))，逐行累加，不必每行重新 join 整頁
+        if size > 1500:
+            yield "\n".join(buffer)
             buffer = []
+            size = -1
         buffer.append(line)
-    if buffer:
-        chunks.append(PageContent(page_number=page_number, text="\n".join(buffer)))
-    return chunks or [PageContent(page_number=1, text="")]
+        size += len(line) + 1
+    yield "\n".join(buffer)
 
 
-def parse_pages(path: str, extension: str) -> List[PageContent]:
+# 上傳 / 批次掃描時接受的副檔名（.ppt / .doc 舊格式只在明確指定時嘗試）
+SUPPORTED_EXTENSIONS = (".pdf", ".pptx", ".docx", ".md", ".txt")
+
+
+def _page_texts(path: str, extension: str) -> Iterator[str]:
     ext = extension.lower()
     if ext == ".pdf":
-        pages = _parse_pdf(path)
-    elif ext in {".ppt", ".pptx"}:
-        pages = _parse_pptx(path)
-    elif ext in {".doc", ".docx"}:
-        pages = _parse_docx(path)
-    elif ext in {".md", ".txt"}:
-        pages = _parse_plain_text(path)
-    else:
-        raise ValueError(f"不支援的副檔名: {ext}")
-
-    return pages
+        return _iter_pdf(path)
+    if ext in {".ppt", ".pptx"}:
+        return _iter_pptx(path)
+    if ext in {".doc", ".docx"}:
+        return _iter_docx(path)
+    if ext in {".md", ".txt"}:
+        return _iter_plain_text(path)
+    raise ValueError(f"不支援的副檔名: {ext}")
+
+
+def parse_pages(path: str, extension: str) -> List[PageContent]:
+    return [
+        PageContent(page_number=idx, text=text)
+        for idx, text in enumerate(_page_texts(path, extension), start=1)
+    ]
+
+
+def parse_document(path: str, extension: str) -> DocumentText:
+    """與 parse_pages 相同的分頁，但整份文件只保留一份 strip 後的文字，頁面以 offset view 存取。"""
+    return DocumentText.from_pages(_page_texts(path, extension))
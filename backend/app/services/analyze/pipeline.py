@@ -0,0 +1,389 @@
+"""Stage-selectable analysis pipeline shared by the HTTP routes."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from backend.app.core.config import CASCADE_ESCALATE, DEADLINE_OPTIONAL_MIN_S, LLM_FAST_MODEL
+from backend.app.core.metrics import StageTimings
+from backend.app.core.usage import UsageTracker, key_fingerprint, track_usage, write_ledger
+from backend.app.models.document import DocumentText, TextSpan
+from backend.app.models.schemas import (
+    AnalyzeResponse,
+    LLMSettings,
+    MindmapResult,
+    PageSummary,
+)
+from backend.app.services.analyze.deadline import Deadline
+from backend.app.services.analyze.page_classifier import SKIP_CLASS_LABELS, classify_page
+from backend.app.services.analyze.page_features import compute_page_features, merge_script_histograms
+from backend.app.services.analyze.page_parser import parse_document
+from backend.app.services.analyze.summary_engine import SUMMARY_MODES, SYSTEM_PROMPT, LLMPool, SummaryEngine
+from backend.app.services.mindmap.mindmap_gen import generate_mindmap, infer_doc_title
+from backend.app.services.mindmap.render_service import RENDER_FORMATS
+from backend.app.services.nlp.keyword_extractor import extract_keywords_by_paragraph
+from backend.app.services.nlp.language_detect import detect_lang, determine_visual_language
+from backend.app.services.queue.backends import remote_execution_enabled
+from backend.app.services.queue.credentials import credentials_transportable
+from backend.app.services.queue.tasks import RemoteExecutor, extract_keywords_remote, remote_page_runner
+from backend.app.services.storage import make_public_url
+from backend.app.services.wordcloud.wordcloud_gen import (
+    prepare_wordcloud,
+    register_wordcloud,
+    render_wordcloud,
+)
+
+STAGES = ("summary", "keywords", "wordcloud", "mindmap")
+DEFAULT_STAGES = frozenset({"summary", "keywords", "wordcloud"})
+# 這些 stage 需要段落關鍵字，會自動觸發關鍵字抽取（但只有要求 keywords 才回填到各頁）
+KEYWORD_CONSUMERS = frozenset({"keywords", "wordcloud", "mindmap"})
+# 趕 deadline 時可以略過的 stage
+OPTIONAL_STAGES = frozenset({"wordcloud", "mindmap"})
+
+EventSink = Callable[[dict], Awaitable[None]]
+
+
+class PipelineInputError(ValueError):
+    """使用者輸入造成的錯誤（副檔名不支援、缺少 API key 等），訊息可直接回給前端。"""
+
+
+def parse_stages(raw: Optional[str]) -> FrozenSet[str]:
+    """解析 `summary,keywords,...`；空值代表預設組合。"""
+    if not raw or not raw.strip():
+        return DEFAULT_STAGES
+    requested = {item.strip().lower() for item in raw.split(",") if item.strip()}
+    unknown = requested - set(STAGES)
+    if unknown:
+        raise PipelineInputError(f"不支援的 stages：{', '.join(sorted(unknown))}（可用：{', '.join(STAGES)}）")
+    return frozenset(requested)
+
+
+@dataclass
+class PipelineOptions:
+    stages: FrozenSet[str] = DEFAULT_STAGES
+    wordcloud_mode: str = "lazy"
+    mindmap_image_format: str = "png"
+    mindmap_render_mode: str = "async"
+    concurrency: int = 4
+    summary_mode: str = "llm"
+    deadline_ms: Optional[int] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "stages": sorted(self.stages),
+            "summary_mode": self.summary_mode,
+            "deadline_ms": self.deadline_ms,
+            "wordcloud_mode": self.wordcloud_mode,
+            "mindmap_image_format": self.mindmap_image_format,
+            "mindmap_render_mode": self.mindmap_render_mode,
+            "concurrency": self.concurrency,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PipelineOptions":
+        values = dict(data)
+        values["stages"] = frozenset(values.get("stages") or DEFAULT_STAGES)
+        return cls(**values)
+
+
+def build_pipeline_request(
+    llm_api_key: Optional[str],
+    llm_base_url: Optional[str],
+    llm_model: str,
+    wordcloud_mode: str = "lazy",
+    stages: Optional[str] = None,
+    mindmap_image_format: str = "png",
+    mindmap_render_mode: str = "async",
+    summary_mode: str = "llm",
+    llm_fast_model: Optional[str] = None,
+    deadline_ms: Optional[int] = None,
+) -> Tuple[Optional[LLMSettings], PipelineOptions]:
+    """驗證表單參數並組出 (LLMSettings, PipelineOptions)；不合法時拋出 PipelineInputError。"""
+    if wordcloud_mode not in {"lazy", "inline"}:
+        raise PipelineInputError(f"wordcloud_mode 僅支援 lazy / inline：{wordcloud_mode}")
+    if mindmap_image_format not in RENDER_FORMATS:
+        raise PipelineInputError(f"不支援的心智圖圖片格式: {mindmap_image_format}")
+    if mindmap_render_mode not in {"sync", "async"}:
+        raise PipelineInputError(f"mindmap_render_mode 僅支援 sync / async：{mindmap_render_mode}")
+    if summary_mode not in SUMMARY_MODES:
+        raise PipelineInputError(f"summary_mode 僅支援 {' / '.join(SUMMARY_MODES)}：{summary_mode}")
+    if deadline_ms is not None and deadline_ms <= 0:
+        raise PipelineInputError(f"deadline_ms 必須為正整數：{deadline_ms}")
+    selected_stages = parse_stages(stages)
+    if "summary" in selected_stages and summary_mode != "local" and not llm_api_key:
+        raise PipelineInputError("summary stage 需要提供 llm_api_key（或改用 summary_mode=local）。")
+
+    settings = (
+        LLMSettings(
+            api_key=llm_api_key,
+            base_url=llm_base_url,
+            model=llm_model,
+            fast_model=llm_fast_model or LLM_FAST_MODEL or None,
+            escalate=CASCADE_ESCALATE,
+        )
+        if llm_api_key
+        else None
+    )
+    options = PipelineOptions(
+        stages=selected_stages,
+        wordcloud_mode=wordcloud_mode,
+        mindmap_image_format=mindmap_image_format,
+        mindmap_render_mode=mindmap_render_mode,
+        summary_mode=summary_mode,
+        deadline_ms=deadline_ms,
+    )
+    return settings, options
+
+
+async def _extract_keywords(
+    executor: Optional[RemoteExecutor],
+    paragraphs: List[TextSpan],
+    lang: str,
+) -> List[Dict]:
+    if executor is not None:
+        return await extract_keywords_remote(executor, paragraphs, lang)
+    return extract_keywords_by_paragraph(paragraphs, lang)
+
+
+async def run_analysis(
+    saved_path: str,
+    filename: str,
+    settings: Optional[LLMSettings],
+    options: PipelineOptions,
+    push_event: EventSink,
+    timings: Optional[StageTimings] = None,
+    deadline: Optional[Deadline] = None,
+    document: Optional[DocumentText] = None,
+    llm_pool: Optional[LLMPool] = None,
+) -> AnalyzeResponse:
+    """
+    解析一次檔案，依 options.stages 執行摘要 / 關鍵字 / 文字雲 / 心智圖。
+    各階段耗時寫入 timings（同時更新 /metrics 的 histogram）。
+    有 deadline 時（由呼叫端在收到請求時建立，或依 options.deadline_ms 從現在起算）：
+    內容多的頁面優先呼叫 LLM，來不及的頁面與全局摘要改用本地摘要，時間不足時略過文字雲與心智圖，
+    並一律改用不需等待圖片的 lazy / async 輸出。
+    批次呼叫端可傳入已解析的 document（例如在 process pool 解析）與多份文件共用的 llm_pool。
+    """
+    stages = options.stages
+    timings = timings or StageTimings("analyze")
+    deadline = deadline or Deadline.from_ms(options.deadline_ms)
+    wordcloud_mode = options.wordcloud_mode
+    mindmap_render_mode = options.mindmap_render_mode
+    if deadline is not None:
+        wordcloud_mode = "lazy"
+        mindmap_render_mode = "async"
+    skipped_stages: List[str] = []
+    if "summary" in stages and options.summary_mode != "local" and settings is None:
+        raise PipelineInputError("summary stage 需要提供 llm_api_key（或改用 summary_mode=local）。")
+
+    if document is None:
+        _, ext = os.path.splitext(saved_path)
+        try:
+            with timings.stage("parse"):
+                document = parse_document(saved_path, ext)
+        except ValueError as exc:
+            raise PipelineInputError(str(exc)) from exc
+
+    await push_event(
+        {
+            "type": "progress",
+            "progress": 28,
+            "message": f"完成文字解析，共 {len(document)} 頁",
+        }
+    )
+
+    with timings.stage("classify"):
+        # 整份文件只有 document.text 一份字串，頁面 / 段落都是指向它的 offset view
+        features = [compute_page_features(document.page_text(idx)) for idx in range(len(document))]
+        classified = [classify_page(idx + 1, document.page(idx), feature) for idx, feature in enumerate(features)]
+    await push_event(
+        {
+            "type": "progress",
+            "progress": 35,
+            "message": "頁面判定完成",
+        }
+    )
+
+    total_pages = len(classified)
+    page_results = None
+    global_summary = None
+
+    # TASK_QUEUE_BACKEND 不是 local 時，頁面摘要與關鍵字抽取交給 worker 行程
+    executor = RemoteExecutor() if remote_execution_enabled() else None
+
+    usage = UsageTracker()
+    if "summary" in stages:
+        # 頁面摘要（含衍生的 task 與 worker 回傳）的 token 用量都記入 usage
+        with track_usage(usage):
+            engine = SummaryEngine(
+                settings=settings,
+                concurrency=options.concurrency,
+                # 無法安全傳送 API key 時（未設定 TASK_QUEUE_SECRET），頁面摘要留在本行程
+                page_runner=(
+                    remote_page_runner(executor, settings)
+                    if executor and settings and credentials_transportable()
+                    else None
+                ),
+                mode=options.summary_mode,
+                deadline=deadline,
+                pool=llm_pool,
+            )
+            completed_pages = 0
+
+            async def page_progress(_: int):
+                nonlocal completed_pages
+                completed_pages += 1
+                base = 35
+                span = 50
+                percent = base + int(span * completed_pages / max(1, total_pages))
+                await push_event(
+                    {
+                        "type": "progress",
+                        "progress": min(percent, 90),
+                        "message": f"完成第 {completed_pages}/{total_pages} 頁摘要",
+                    }
+                )
+
+            with timings.stage("summary_pages"):
+                page_results = await engine.summarize_pages(classified, progress_callback=page_progress)
+
+            await push_event(
+                {
+                    "type": "progress",
+                    "progress": 92,
+                    "message": "彙整全局摘要",
+                }
+            )
+
+            with timings.stage("summary_global"):
+                global_summary = await engine.summarize_global(page_results)
+
+    joined_text = document.text
+    histogram = merge_script_histograms(features)
+    with timings.stage("language"):
+        language = detect_lang(joined_text, histogram)
+
+    if deadline is not None and deadline.remaining() < DEADLINE_OPTIONAL_MIN_S:
+        skipped_stages = [stage for stage in STAGES if stage in stages & OPTIONAL_STAGES]
+        if skipped_stages:
+            stages = stages - OPTIONAL_STAGES
+            await push_event(
+                {
+                    "type": "progress",
+                    "progress": 94,
+                    "message": f"接近截止時間，略過 {', '.join(skipped_stages)}",
+                }
+            )
+
+    keyword_lookup = {}
+    wordcloud_url = None
+    mindmap = None
+    if stages & KEYWORD_CONSUMERS:
+        visual_language = determine_visual_language(joined_text, language, histogram)
+        paragraph_objs = document.pages()
+        with timings.stage("keywords"):
+            paragraph_keywords = await _extract_keywords(executor, paragraph_objs, language)
+            # 文字雲與心智圖共用同一份視覺語言關鍵字
+            visual_keywords = (
+                paragraph_keywords
+                if visual_language == language
+                else await _extract_keywords(executor, paragraph_objs, visual_language)
+            )
+        if "keywords" in stages:
+            keyword_lookup = {item["paragraph_index"]: item["keywords"] for item in paragraph_keywords}
+
+        if "wordcloud" in stages:
+            try:
+                with timings.stage("wordcloud"):
+                    wc_spec = prepare_wordcloud(visual_keywords, visual_language, joined_text)
+                    if wordcloud_mode == "inline":
+                        wordcloud_url = make_public_url(await render_wordcloud(wc_spec))
+                    else:
+                        wordcloud_url = f"/analyze/wordcloud/{register_wordcloud(wc_spec)}"
+            except Exception as exc:  # pylint: disable=broad-except
+                reason = "文字雲生成失敗"
+                if isinstance(exc, RuntimeError) and "不足" in str(exc):
+                    reason = "文字雲素材不足"
+                await push_event(
+                    {
+                        "type": "progress",
+                        "progress": 95,
+                        "message": f"{reason}：{exc}",
+                    }
+                )
+
+        if "mindmap" in stages:
+            await push_event({"type": "progress", "progress": 96, "message": "生成心智圖"})
+            doc_title = infer_doc_title(paragraph_objs, filename or "Document")
+            mindmap = MindmapResult(
+                **await generate_mindmap(
+                    visual_keywords,
+                    doc_title,
+                    options.mindmap_image_format,
+                    mindmap_render_mode,
+                    timings=timings,
+                )
+            )
+
+    # 原本要走 LLM 卻改用本地摘要的頁面標記為 degraded（summary_mode=local 是使用者選擇，不算降級）
+    llm_expected = options.summary_mode != "local"
+    if page_results is not None:
+        page_summaries = [
+            PageSummary(
+                page_number=result.page_number,
+                classification=result.classification,
+                bullets=result.bullets,
+                keywords=keyword_lookup.get(result.page_number - 1, []),
+                skipped=result.skipped,
+                skip_reason=result.skip_reason,
+                summary_source=result.source,
+                model=result.model,
+                degraded=llm_expected and result.source == "local",
+            )
+            for result in page_results
+        ]
+    else:
+        page_summaries = [
+            PageSummary(
+                page_number=page.page_number,
+                classification=page.classification,
+                bullets=[],
+                keywords=keyword_lookup.get(page.page_number - 1, []),
+                skipped=page.classification in SKIP_CLASS_LABELS,
+                skip_reason=page.skip_reason,
+            )
+            for page in classified
+        ]
+
+    usage_payload = usage.as_dict() if "summary" in stages else None
+    if usage_payload and usage_payload["calls"]:
+        await asyncio.to_thread(
+            write_ledger,
+            {
+                "filename": filename,
+                "key_id": key_fingerprint(settings.api_key if settings else None),
+                "pages": total_pages,
+                "stages": sorted(stages),
+                **usage_payload,
+            },
+        )
+
+    return AnalyzeResponse(
+        language=language,
+        total_pages=total_pages,
+        page_summaries=page_summaries,
+        global_summary=global_summary,
+        system_prompt=SYSTEM_PROMPT if "summary" in stages else None,
+        wordcloud_image_url=wordcloud_url,
+        stages=[stage for stage in STAGES if stage in stages],
+        mindmap=mindmap,
+        usage=usage_payload,
+        deadline_ms=options.deadline_ms,
+        degraded=bool(skipped_stages)
+        or any(page.degraded for page in page_summaries)
+        or (llm_expected and global_summary is not None and global_summary.source == "local"),
+        skipped_stages=skipped_stages,
+    )
@@ -4,12 +4,31 @@ from __future__ import annotations
 
 import asyncio
 import json
+import random
+import re
+import time
 from dataclasses import dataclass
-from typing import Awaitable, Callable, List
-
-from openai import AsyncOpenAI
-
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from backend.app.core.config import LLM_MAX_RETRIES, LLM_RETRY_BACKOFF, SUMMARY_QUEUE_BUDGET_S
+from backend.app.core.hedging import Hedger, get_hedger
+from backend.app.core.llm_client import create_async_client
+from backend.app.core.metrics import (
+    INFLIGHT,
+    LLM_CASCADE,
+    LLM_ERRORS,
+    LLM_HEDGES,
+    LLM_REQUEST_SECONDS,
+    LLM_REQUESTS,
+    LLM_RETRIES,
+    LOCAL_SUMMARIES,
+    model_label,
+)
+from backend.app.core.usage import record_usage
 from backend.app.models.schemas import GlobalSummary, GlobalSummaryExpansions, LLMSettings, PageSummary
+from backend.app.services.nlp.textrank import extract_summary, rank_sentences
+from .deadline import Deadline
+from .model_router import TIER_FAST, route_page
 from .page_classifier import ClassifiedPage, SKIP_CLASS_LABELS
 
 
@@ -26,15 +45,21 @@ PAGE_PROMPT_TEMPLATE = """
 """
 
 PAGE_INSTRUCTIONS = """
-請將上列內容整理成 4 條要點（若內容極少可減至 3 條）：
+請將上列內容整理成 {bullet_rule}：
 - 每條至少 55 個全形字，最多 110 字。
 - 僅保留單一資訊重點：結論、佐證數據、風險或待辦。
 - 有數據須保留數值、單位、時間與對比方向。
 - 語句需完整，可直接閱讀，不可使用條列符號或頁碼字樣。
-請以 JSON 輸出：{"bullets": ["要點一", "要點二", ...]}
+請以 JSON 輸出：{{"bullets": ["要點一", "要點二", ...]}}
 禁止回傳多餘欄位。
 """
 
+DEFAULT_BULLET_RULE = "4 條要點（若內容極少可減至 3 條）"
+LIGHT_BULLET_RULE = "3 條要點"
+# 可辨識字元少於此值的頁面直接要求 3 條要點，避免模型硬湊內容
+LIGHT_PAGE_ALNUM = 160
+PAGE_TEXT_LIMIT = 4000
+
 GLOBAL_PROMPT_TEMPLATE = """
 依據下列逐頁重點彙整全局摘要：
 {page_points}
@@ -54,6 +79,18 @@ GLOBAL_PROMPT_TEMPLATE = """
 - 強調結論與可行動事項，語氣務必明確，不得敷衍。
 """
 
+# llm：全部呼叫 LLM；local：只用本地 TextRank（不需 API key、零成本）；
+# auto：呼叫 LLM，但排隊超過 SUMMARY_QUEUE_BUDGET_S 或呼叫失敗時改用本地摘要
+SUMMARY_MODES = ("llm", "local", "auto")
+LOCAL_PAGE_SENTENCES = 4
+# 本地全局摘要最多對這麼多條頁面要點做 TextRank（相似度為 n² 的圖），超過時每頁依序輪流取
+LOCAL_GLOBAL_MAX_POINTS = 1000
+_BULLET_PREFIX = re.compile(r"^〔p\.\d+〕•\s*")
+# _ensure_min_length 補上的提示語，彙整全局摘要時去掉
+_PADDING = re.compile(r"（補充：內容僅 \d+ 字，建議檢視原文補強。）|請參考原頁面取得完整上下文。")
+_DIGIT = re.compile(r"\d")
+_RISK_HINT = re.compile(r"風險|挑戰|下滑|衰退|不足|延遲|改善|建議|需要|必須|應|risk|challenge|decline|delay|should|must|need", re.I)
+
 
 @dataclass
 class PageSummaryResult:
@@ -62,52 +99,208 @@ class PageSummaryResult:
     bullets: List[str]
     skipped: bool
     skip_reason: str | None
+    source: str = "llm"  # llm / local / skip
+    model: str | None = None
+
+
+PageRunner = Callable[[ClassifiedPage], Awaitable[PageSummaryResult]]
+
+
+class LLMPool:
+    """
+    多份文件共用的 LLM 名額與連線（批次 / 離線分析用）。
+    所有文件的頁面摘要在同一個 semaphore 排隊，總並行數不超過 concurrency，
+    也只建立一個 client（連線池），供應商的速率限制以整體計算。
+    """
+
+    def __init__(self, settings: Optional[LLMSettings], concurrency: int = 8):
+        self.settings = settings
+        self.concurrency = max(1, concurrency)
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self._client = None
+
+    def client(self):
+        if self._client is None and self.settings is not None:
+            self._client = create_async_client(
+                api_key=self.settings.api_key, base_url=self.settings.base_url, max_retries=0
+            )
+        return self._client
 
 
 class SummaryEngine:
-    def __init__(self, settings: LLMSettings, concurrency: int = 4):
-        self._client = AsyncOpenAI(api_key=settings.api_key, base_url=settings.base_url)
-        self._model = settings.model
+    def __init__(
+        self,
+        settings: Optional[LLMSettings],
+        concurrency: int = 4,
+        page_runner: PageRunner | None = None,
+        mode: str = "llm",
+        queue_budget: float = SUMMARY_QUEUE_BUDGET_S,
+        hedger: Hedger | None = None,
+        deadline: Deadline | None = None,
+        pool: LLMPool | None = None,
+    ):
+        if mode not in SUMMARY_MODES:
+            raise ValueError(f"summary_mode 僅支援 {' / '.join(SUMMARY_MODES)}：{mode}")
+        if mode != "local" and settings is None:
+            raise ValueError(f"summary_mode={mode} 需要 LLM 設定")
+        self._mode = mode
+        self._queue_budget = queue_budget
+        # 有 deadline 時：逐頁 LLM 摘要到 deadline.pages_until 為止，全局摘要到 deadline.global_until
+        self._deadline = deadline
+        # 有頁面因排隊逾時或 deadline 改用本地摘要時記下原因，全局摘要也不再等 LLM
+        self._degraded_reason: str | None = None
+        self._client = None
+        self._model = settings.model if settings else "local"
+        self._fast_model = settings.fast_model if settings else None
+        self._escalate = settings.escalate if settings else False
+        self._base_url = settings.base_url if settings else None
+        self._retryable: Tuple[type, ...] = ()
+        if mode != "local":
+            import openai
+
+            # 重試改由 _create_with_retry 處理，才能把每次重試計入 metrics
+            if pool is not None and pool.settings is not None:
+                self._client = pool.client()
+            else:
+                self._client = create_async_client(
+                    api_key=settings.api_key, base_url=settings.base_url, max_retries=0
+                )
+            self._retryable = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+        self._hedger = hedger or get_hedger()
         self._concurrency = max(1, concurrency)
-
-    async def _chat_json(self, system_prompt: str, user_prompt: str) -> dict:
-        response = await self._client.chat.completions.create(  # type: ignore[attr-defined]
-            model=self._model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            response_format={"type": "json_object"},
+        # 有共用 pool 時，名額由 pool 控制，concurrency 參數不再使用
+        self._pool = pool
+        # 可替換單頁摘要的執行方式（例如交給 worker 行程），預設在本行程呼叫 LLM
+        self._page_runner = page_runner or self.summarize_page
+
+    @property
+    def mode(self) -> str:
+        return self._mode
+
+    @property
+    def degraded(self) -> bool:
+        return self._degraded_reason is not None
+
+    async def _chat_json(
+        self, system_prompt: str, user_prompt: str, kind: str = "page", model: str | None = None
+    ) -> dict:
+        model = model or self._model
+        started = time.perf_counter()
+        outcome = "error"
+        # 只有頁面摘要會對沖：全局摘要只有一次呼叫，重送的成本與單頁延遲的影響不成比例
+        create = self._create_hedged if kind == "page" else self._create_with_retry
+        try:
+            response = await create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt},
+                ],
+                response_format={"type": "json_object"},
+            )
+            record_usage(model, self._base_url, getattr(response, "usage", None))
+            content = response.choices[0].message.content or "{}"
+            try:
+                data = json.loads(content)
+            except json.JSONDecodeError:
+                outcome = "invalid_json"
+                raise
+            outcome = "ok"
+            return data
+        finally:
+            LLM_REQUEST_SECONDS.labels(model=model_label(model), kind=kind).observe(time.perf_counter() - started)
+            LLM_REQUESTS.labels(model=model_label(model), kind=kind, outcome=outcome).inc()
+
+    async def _create_hedged(self, **request):
+        """主請求超過門檻仍未返回時送出相同的對沖請求，採用先成功者並取消另一個。"""
+        model = request["model"]
+        hedger = self._hedger
+        delay = hedger.delay(model)
+        hedger.credit()
+        started = time.perf_counter()
+        primary = asyncio.ensure_future(self._create_with_retry(**request))
+        pending = {primary}
+        try:
+            if delay is not None:
+                await asyncio.wait(pending, timeout=delay)
+            if primary.done() or delay is None:
+                response = await primary
+                hedger.observe(model, time.perf_counter() - started)
+                return response
+            if not hedger.try_acquire():
+                LLM_HEDGES.labels(model=model_label(model), result="skipped_budget").inc()
+                response = await primary
+                hedger.observe(model, time.perf_counter() - started)
+                return response
+
+            hedge_started = time.perf_counter()
+            hedge = asyncio.ensure_future(self._create_with_retry(**request))
+            pending.add(hedge)
+            error: BaseException | None = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    won = task is hedge
+                    LLM_HEDGES.labels(model=model_label(model), result="won" if won else "lost").inc()
+                    hedger.observe(model, time.perf_counter() - (hedge_started if won else started))
+                    return task.result()
+            raise error  # type: ignore[misc]
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _create_with_retry(self, **request):
+        attempt = 0
+        while True:
+            try:
+                return await self._client.chat.completions.create(**request)  # type: ignore[attr-defined]
+            except Exception as exc:
+                LLM_ERRORS.labels(model=model_label(request["model"]), error=type(exc).__name__).inc()
+                if attempt >= LLM_MAX_RETRIES or not isinstance(exc, self._retryable):
+                    raise
+            attempt += 1
+            LLM_RETRIES.labels(model=model_label(request["model"])).inc()
+            await asyncio.sleep(LLM_RETRY_BACKOFF * (2 ** (attempt - 1)) * (0.5 + random.random()))
+
+    def _skipped_result(self, page: ClassifiedPage) -> PageSummaryResult:
+        reason = self._ensure_min_length(
+            page.skip_reason or "〈本頁跳過〉內容不足以生成摘要。",
+            55,
+        )
+        return PageSummaryResult(
+            page_number=page.page_number,
+            classification=page.classification,
+            bullets=[self._prefix_bullet(page.page_number, reason)],
+            skipped=True,
+            skip_reason=page.skip_reason,
+            source="skip",
         )
-        content = response.choices[0].message.content or "{}"
-        return json.loads(content)
 
     async def summarize_page(self, page: ClassifiedPage) -> PageSummaryResult:
         if page.classification in SKIP_CLASS_LABELS and page.classification != "normal":
-            reason = self._ensure_min_length(
-                page.skip_reason or "〈本頁跳過〉內容不足以生成摘要。",
-                55,
-            )
-            return PageSummaryResult(
-                page_number=page.page_number,
-                classification=page.classification,
-                bullets=[self._prefix_bullet(page.page_number, reason)],
-                skipped=True,
-                skip_reason=page.skip_reason,
-            )
-
-        text = page.text[:4000]
-        prompt = PAGE_PROMPT_TEMPLATE.format(page_no=page.page_number, page_class=page.classification)
-        user_prompt = f"{prompt}\n{text}\n\n{PAGE_INSTRUCTIONS}".strip()
-        data = await self._chat_json(SYSTEM_PROMPT, user_prompt)
-        raw_bullets = [line.strip() for line in data.get("bullets", []) if line and line.strip()]
-        bullets: List[str] = []
-        for bullet in raw_bullets[:5]:
-            enriched = self._ensure_min_length(bullet, 55)
-            bullets.append(self._prefix_bullet(page.page_number, enriched))
-
+            return self._skipped_result(page)
+
+        prompt = self._plan_page_prompt(page)
+        decision = route_page(page, self._model, self._fast_model)
+        model = decision.model
+        escalate = decision.tier == TIER_FAST and self._escalate
+        bullets = await self._request_bullets(page, prompt, model, tolerate_invalid=escalate)
+        if escalate and len(bullets) < 3:
+            # fast model 輸出不合格：改用主模型重跑同一頁
+            LLM_CASCADE.labels(tier=decision.tier, outcome="escalated").inc()
+            model = self._model
+            bullets = await self._request_bullets(page, prompt, model)
+        else:
+            LLM_CASCADE.labels(tier=decision.tier, outcome="ok").inc()
+
+        source = "llm"
         if len(bullets) < 3:
+            LOCAL_SUMMARIES.labels(kind="page", reason="short_output").inc()
             bullets = self._fallback_bullets(page)
+            source = "local"
 
         return PageSummaryResult(
             page_number=page.page_number,
@@ -115,34 +308,221 @@ class SummaryEngine:
             bullets=bullets[:5],
             skipped=False,
             skip_reason=None,
+            source=source,
+            model=model if source == "llm" else None,
+        )
+
+    async def _request_bullets(
+        self, page: ClassifiedPage, prompt: str, model: str, tolerate_invalid: bool = False
+    ) -> List[str]:
+        try:
+            data = await self._chat_json(SYSTEM_PROMPT, prompt, model=model)
+        except json.JSONDecodeError:
+            if not tolerate_invalid:
+                raise
+            return []
+        raw_bullets = [line.strip() for line in data.get("bullets", []) if line and line.strip()]
+        return [
+            self._prefix_bullet(page.page_number, self._ensure_min_length(bullet, 55))
+            for bullet in raw_bullets[:5]
+        ]
+
+    def summarize_page_local(self, page: ClassifiedPage) -> PageSummaryResult:
+        """本地 TextRank 摘要：挑出頁內最具代表性的句子作為要點，不呼叫 LLM。"""
+        if page.classification in SKIP_CLASS_LABELS and page.classification != "normal":
+            return self._skipped_result(page)
+        return PageSummaryResult(
+            page_number=page.page_number,
+            classification=page.classification,
+            bullets=self._fallback_bullets(page),
+            skipped=False,
+            skip_reason=None,
+            source="local",
         )
 
+    async def _summarize_page_local(self, page: ClassifiedPage, reason: str) -> PageSummaryResult:
+        LOCAL_SUMMARIES.labels(kind="page", reason=reason).inc()
+        return await asyncio.to_thread(self.summarize_page_local, page)
+
+    @staticmethod
+    def _plan_page_prompt(page: ClassifiedPage) -> str:
+        features = page.features
+        light = features is not None and features.alnum_count < LIGHT_PAGE_ALNUM
+        instructions = PAGE_INSTRUCTIONS.format(
+            bullet_rule=LIGHT_BULLET_RULE if light else DEFAULT_BULLET_RULE
+        )
+        prompt = PAGE_PROMPT_TEMPLATE.format(page_no=page.page_number, page_class=page.classification)
+        text = page.text[:PAGE_TEXT_LIMIT]
+        return f"{prompt}\n{text}\n\n{instructions}".strip()
+
     async def summarize_pages(
         self,
         pages: List[ClassifiedPage],
         progress_callback: Callable[[int], Awaitable[None]] | None = None,
     ) -> List[PageSummaryResult]:
-        semaphore = asyncio.Semaphore(self._concurrency)
+        semaphore = self._pool.semaphore if self._pool is not None else asyncio.Semaphore(self._concurrency)
         results: List[PageSummaryResult | None] = [None] * len(pages)
+        # 內容完全相同的頁面（重複投影片、頁首頁尾模板）只呼叫一次 LLM
+        inflight: Dict[str, asyncio.Future] = {}
+        # 等 LLM 名額的時限：auto 模式的排隊預算與請求 deadline 取較早者（時間皆為 monotonic）
+        limits: List[Tuple[float, str]] = []
+        if self._mode == "auto" and self._queue_budget > 0:
+            limits.append((time.monotonic() + self._queue_budget, "queue_budget"))
+        pages_until = self._deadline.pages_until if self._deadline else None
+        if pages_until is not None:
+            limits.append((pages_until, "deadline"))
+        wait_limit = min(limits) if limits else None
+
+        async def _degrade(page: ClassifiedPage, reason: str) -> PageSummaryResult:
+            self._degraded_reason = self._degraded_reason or reason
+            return await self._summarize_page_local(page, reason)
+
+        async def _limited(page: ClassifiedPage) -> PageSummaryResult:
+            if page.classification in SKIP_CLASS_LABELS:
+                return self._skipped_result(page)
+            if self._mode == "local":
+                return await self._summarize_page_local(page, "mode")
+            if wait_limit is None:
+                await semaphore.acquire()
+            else:
+                try:
+                    await asyncio.wait_for(semaphore.acquire(), max(0.0, wait_limit[0] - time.monotonic()))
+                except asyncio.TimeoutError:
+                    return await _degrade(page, wait_limit[1])
+            try:
+                with INFLIGHT.labels(resource="llm_pages").track_inprogress():
+                    if pages_until is None:
+                        return await self._page_runner(page)
+                    # 已在呼叫中的頁面到期也直接改用本地摘要，不拖累整份文件
+                    return await asyncio.wait_for(self._page_runner(page), max(0.0, pages_until - time.monotonic()))
+            except asyncio.TimeoutError:
+                if pages_until is not None:
+                    return await _degrade(page, "deadline")
+                # 沒有 deadline 時的逾時來自 page runner 本身（例如遠端工作等不到結果），視同 LLM 失敗
+                if self._mode != "auto":
+                    raise
+                return await self._summarize_page_local(page, "llm_error")
+            except Exception:
+                if self._mode != "auto":
+                    raise
+                return await self._summarize_page_local(page, "llm_error")
+            finally:
+                semaphore.release()
+
+        async def _summarize(page: ClassifiedPage) -> PageSummaryResult:
+            features = page.features
+            if features is None or page.classification in SKIP_CLASS_LABELS:
+                return await _limited(page)
+            shared = inflight.get(features.text_hash)
+            if shared is None:
+                shared = asyncio.ensure_future(_limited(page))
+                inflight[features.text_hash] = shared
+                return await shared
+            original = await asyncio.shield(shared)
+            return self._rebind_page(original, page.page_number)
 
         async def _worker(idx: int, page: ClassifiedPage):
-            async with semaphore:
-                summary = await self.summarize_page(page)
+            summary = await _summarize(page)
             results[idx] = summary
             if progress_callback:
                 await progress_callback(idx + 1)
 
-        await asyncio.gather(*(_worker(idx, page) for idx, page in enumerate(pages)))
+        order = list(range(len(pages)))
+        if pages_until is not None:
+            # 有 deadline 時內容多的頁面先取得 LLM 名額（semaphore 依等待順序喚醒），短頁較可能被降級
+            order.sort(key=lambda idx: -(pages[idx].features.alnum_count if pages[idx].features else 0))
+        await asyncio.gather(*(_worker(idx, pages[idx]) for idx in order))
         return [r for r in results if r is not None]
 
     async def summarize_global(self, page_results: List[PageSummaryResult]) -> GlobalSummary:
+        if self._mode == "local":
+            return await self._summarize_global_local(page_results, "mode")
+        reason = self._degraded_reason
+        if reason is not None and (self._mode == "auto" or reason == "deadline"):
+            return await self._summarize_global_local(page_results, reason)
+        try:
+            if self._deadline is None:
+                return await self._summarize_global_llm(page_results)
+            timeout = self._deadline.global_until - time.monotonic()
+            if timeout <= 0:
+                return await self._summarize_global_local(page_results, "deadline")
+            return await asyncio.wait_for(self._summarize_global_llm(page_results), timeout)
+        except asyncio.TimeoutError:
+            if self._deadline is None:
+                raise
+            self._degraded_reason = self._degraded_reason or "deadline"
+            return await self._summarize_global_local(page_results, "deadline")
+        except Exception:
+            if self._mode != "auto":
+                raise
+            return await self._summarize_global_local(page_results, "llm_error")
+
+    async def _summarize_global_local(self, page_results: List[PageSummaryResult], reason: str) -> GlobalSummary:
+        LOCAL_SUMMARIES.labels(kind="global", reason=reason).inc()
+        return await asyncio.to_thread(self.summarize_global_local, page_results)
+
+    def summarize_global_local(self, page_results: List[PageSummaryResult]) -> GlobalSummary:
+        """以 TextRank 對所有頁面要點排序：前幾名作為 overview，再依數據 / 風險線索組成三段擴充。"""
+        candidates = [result for result in page_results if not result.skipped] or page_results
+        points = self._cap_points(
+            [
+                (result.page_number, rank, _PADDING.sub("", _BULLET_PREFIX.sub("", bullet)))
+                for result in candidates
+                for rank, bullet in enumerate(result.bullets)
+            ]
+        )
+        order = rank_sentences([text for _, text in points])
+
+        overview = [self._trim_to_limit(self._ensure_min_length(points[i][1], 60), 120) for i in order[:7]]
+        if len(overview) < 5:
+            overview.extend(["（待補要點）"] * (5 - len(overview)))
+
+        used: set = set()
+
+        def _pick(pattern: re.Pattern | None) -> List[int]:
+            # 三段擴充優先使用尚未出現過的句子，符合線索的排前面
+            fresh = [i for i in order if i not in used] or order
+            matched = [i for i in fresh if pattern is None or pattern.search(points[i][1])]
+            return matched + [i for i in fresh if i not in matched]
+
+        expansions = {}
+        for field, pattern in (("key_conclusions", None), ("core_data", _DIGIT), ("risks_and_actions", _RISK_HINT)):
+            expansions[field] = self._compose_paragraph(points, _pick(pattern), used)
+        expansions = GlobalSummaryExpansions(**expansions)
+        return GlobalSummary(bullets=overview[:7], expansions=expansions, source="local")
+
+    @staticmethod
+    def _cap_points(points: List[Tuple[int, int, str]]) -> List[Tuple[int, str]]:
+        """
+        (頁碼, 頁內順位, 要點) 超過 LOCAL_GLOBAL_MAX_POINTS 時，先取每頁第 1 條、再取第 2 條……，
+        讓長文件的每一頁都有代表句；保留原文順序。
+        """
+        if len(points) > LOCAL_GLOBAL_MAX_POINTS:
+            keep = sorted(range(len(points)), key=lambda index: points[index][1])[:LOCAL_GLOBAL_MAX_POINTS]
+            points = [points[index] for index in sorted(keep)]
+        return [(page_number, text) for page_number, _, text in points]
+
+    def _compose_paragraph(self, points: Sequence[Tuple[int, str]], ranked: Sequence[int], used: set) -> str:
+        parts: List[str] = []
+        length = 0
+        for index in ranked:
+            page_number, text = points[index]
+            part = f"{text.rstrip('。．.')}〔p.{page_number}〕。"
+            parts.append(part)
+            used.add(index)
+            length += len(part)
+            if length >= 130:
+                break
+        return self._trim_to_limit(self._ensure_min_length("".join(parts), 130), 180)
+
+    async def _summarize_global_llm(self, page_results: List[PageSummaryResult]) -> GlobalSummary:
         page_points = []
         for page in page_results:
             for bullet in page.bullets:
                 page_points.append(f"{bullet}")
 
         payload = "\n".join(page_points[:160]) or "暫無要點"
-        data = await self._chat_json(SYSTEM_PROMPT, GLOBAL_PROMPT_TEMPLATE.format(page_points=payload))
+        data = await self._chat_json(SYSTEM_PROMPT, GLOBAL_PROMPT_TEMPLATE.format(page_points=payload), kind="global")
 
         overview = [self._ensure_min_length(item.strip(), 60) for item in data.get("overview", []) if item and item.strip()]
         expansions_raw = data.get("expansions", {})
@@ -166,7 +546,7 @@ class SummaryEngine:
         if len(overview) < 5:
             overview.extend(["（待補要點）"] * (5 - len(overview)))
 
-        return GlobalSummary(bullets=overview[:7], expansions=expansions)
+        return GlobalSummary(bullets=overview[:7], expansions=expansions, source="llm")
 
     @staticmethod
     def _trim_to_limit(text: str, limit: int) -> str:
@@ -175,6 +555,24 @@ class SummaryEngine:
             return stripped
         return stripped[: limit - 1].rstrip() + "。"
 
+    @staticmethod
+    def _rebind_page(result: PageSummaryResult, page_number: int) -> PageSummaryResult:
+        old_prefix = f"〔p.{result.page_number}〕"
+        new_prefix = f"〔p.{page_number}〕"
+        bullets = [
+            new_prefix + bullet[len(old_prefix):] if bullet.startswith(old_prefix) else bullet
+            for bullet in result.bullets
+        ]
+        return PageSummaryResult(
+            page_number=page_number,
+            classification=result.classification,
+            bullets=bullets,
+            skipped=result.skipped,
+            skip_reason=result.skip_reason,
+            source=result.source,
+            model=result.model,
+        )
+
     @staticmethod
     def _prefix_bullet(page_number: int, bullet: str) -> str:
         core = bullet.replace("..", "").replace("…", "").strip()
@@ -182,22 +580,16 @@ class SummaryEngine:
 
     @staticmethod
     def _fallback_bullets(page: ClassifiedPage) -> List[str]:
-        lines = [line for line in page.text.splitlines() if line.strip()]
-        bullets: List[str] = []
-        chunk: List[str] = []
-        for line in lines:
-            chunk.append(line.strip())
-            candidate = "".join(chunk)
-            if len(candidate) >= 70:
-                bullets.append(f"〔p.{page.page_number}〕• {candidate[:110]}")
-                chunk = []
-            if len(bullets) == 4:
-                break
-        if chunk and len(bullets) < 4:
-            remaining = "".join(chunk)
-            bullets.append(f"〔p.{page.page_number}〕• {remaining[:110]}")
+        short_notice = f"〔p.{page.page_number}〕• 本頁內容過短，僅偵測到零散文字，建議人工檢視。"
+        if page.features is not None and not page.features.line_count:
+            return [SummaryEngine._ensure_min_length_static(short_notice, 55)]
+        sentences = extract_summary(page.text[:PAGE_TEXT_LIMIT], max_sentences=LOCAL_PAGE_SENTENCES, min_chars=55)
+        bullets = [
+            SummaryEngine._prefix_bullet(page.page_number, SummaryEngine._trim_to_limit(sentence, 110))
+            for sentence in sentences
+        ]
         if not bullets:
-            bullets.append(f"〔p.{page.page_number}〕• 本頁內容過短，僅偵測到零散文字，建議人工檢視。")
+            bullets.append(short_notice)
         bullets = [SummaryEngine._ensure_min_length_static(b, 55) for b in bullets]
         return bullets
 
@@ -0,0 +1,208 @@
+"""In-process worker pool that runs persisted analysis jobs."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import uuid
+from typing import Dict, List, Optional
+
+from backend.app.core.admission import estimate_file_cost, get_admission_controller
+from backend.app.core.config import JOB_LEASE_S, JOB_WORKERS
+from backend.app.core.metrics import INFLIGHT, QUEUE_DEPTH, StageTimings
+from backend.app.models.schemas import LLMSettings
+from backend.app.services.analyze.pipeline import PipelineInputError, PipelineOptions, run_analysis
+from backend.app.services.jobs.store import (
+    JOB_FAILED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    JOB_SUCCEEDED,
+    JobStore,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class JobManager:
+    """
+    POST /jobs 只負責排隊；實際分析由固定數量的 worker task 執行。
+    事件與結果全部寫入 JobStore，客戶端斷線不影響已付費的 LLM 工作。
+    LLM API key 只存在記憶體，不落地到 SQLite。
+    """
+
+    def __init__(self, store: Optional[JobStore] = None, workers: int = JOB_WORKERS):
+        self._store = store or JobStore()
+        self._workers = max(1, workers)
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+        self._settings: Dict[str, Optional[LLMSettings]] = {}
+        self._changed: Dict[str, asyncio.Event] = {}
+        self._tasks: List[asyncio.Task] = []
+        # 租約持有者：pid 可能被重用，加上隨機字串區分
+        self._owner = ""
+
+    @property
+    def store(self) -> JobStore:
+        return self._store
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._owner = f"{os.getpid()}:{uuid.uuid4().hex}"
+        await self._recover()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self._workers)]
+        self._tasks.append(asyncio.create_task(self._keep_leases()))
+        QUEUE_DEPTH.labels(queue="jobs").set_function(self._queue.qsize)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._owner:
+            await asyncio.to_thread(self._store.release_leases, self._owner)
+
+    async def _keep_leases(self) -> None:
+        """續約自己的工作，並接手租約過期的工作（pre-fork 下其他 worker 當掉或被重新 spawn）。"""
+        while True:
+            await asyncio.sleep(JOB_LEASE_S / 3)
+            try:
+                await asyncio.to_thread(self._store.renew_leases, self._owner, JOB_LEASE_S)
+                await self._recover()
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("工作租約續約失敗")
+
+    async def _recover(self) -> None:
+        """
+        接手租約過期的工作：不需 LLM 的工作（含 summary_mode=local）重新排隊；
+        需要 API key 的工作標記失敗，請客戶端重送。仍在其他行程執行中的工作租約有效，不會被碰到。
+        """
+        for job_id in await asyncio.to_thread(self._store.claim_expired, self._owner, JOB_LEASE_S):
+            record = await asyncio.to_thread(self._store.get_job, job_id)
+            if record is None:
+                continue
+            options = PipelineOptions.from_dict(record.options)
+            if "summary" in options.stages and options.summary_mode != "local":
+                await self._fail(job_id, "服務重啟導致工作中斷，請重新提交。")
+                continue
+            self._settings[job_id] = None
+            await asyncio.to_thread(self._store.set_status, job_id, JOB_QUEUED)
+            self._queue.put_nowait(job_id)
+
+    async def submit(
+        self,
+        filename: str,
+        saved_path: str,
+        settings: Optional[LLMSettings],
+        options: PipelineOptions,
+    ) -> str:
+        job_id = await asyncio.to_thread(
+            self._store.create_job, filename, saved_path, options.to_dict(), self._owner, JOB_LEASE_S
+        )
+        self._settings[job_id] = settings
+        await self.publish(job_id, {"type": "progress", "progress": 12, "message": "檔案儲存完成，排隊中"})
+        self._queue.put_nowait(job_id)
+        return job_id
+
+    async def publish(self, job_id: str, payload: dict) -> int:
+        seq = await asyncio.to_thread(self._store.append_event, job_id, payload)
+        self._notify(job_id)
+        return seq
+
+    def _notify(self, job_id: str) -> None:
+        event = self._changed.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    async def wait_for_update(self, job_id: str, timeout: float) -> None:
+        """等待新事件；逾時也會返回，讓呼叫端重新查詢（涵蓋其他行程寫入的事件）。"""
+        event = self._changed.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        record = await asyncio.to_thread(self._store.get_job, job_id)
+        if record is None:
+            return
+        settings = self._settings.pop(job_id, None)
+        options = PipelineOptions.from_dict(record.options)
+        await asyncio.to_thread(self._store.set_status, job_id, JOB_RUNNING)
+
+        async def push_event(payload: dict):
+            await self.publish(job_id, payload)
+
+        async def queue_progress(position: int, queued: int):
+            await push_event(
+                {
+                    "type": "progress",
+                    "progress": 12,
+                    "message": f"等待系統資源（第 {position}/{queued} 位）",
+                    "queue_position": position,
+                    "queue_length": queued,
+                }
+            )
+
+        timings = StageTimings("analyze")
+        try:
+            cost = await asyncio.to_thread(estimate_file_cost, record.saved_path)
+            # 背景工作與 /analyze 共用同一份預算，但不設等待上限也不計入排隊上限
+            async with get_admission_controller().admit(
+                cost, on_position=queue_progress, max_wait=None, enforce_queue_limit=False
+            ):
+                with INFLIGHT.labels(resource="jobs").track_inprogress():
+                    response = await run_analysis(
+                        record.saved_path, record.filename, settings, options, push_event, timings
+                    )
+        except PipelineInputError as exc:
+            await self._fail(job_id, str(exc))
+            return
+        except Exception as exc:  # pylint: disable=broad-except
+            await self._fail(job_id, f"分析失敗：{exc}")
+            return
+
+        data = response.model_dump(mode="json")
+        # 先寫最後事件再切換狀態：看到終止狀態的讀者一定讀得到 result 事件
+        await self.publish(
+            job_id,
+            {
+                "type": "result",
+                "progress": 100,
+                "message": "分析完成",
+                "data": data,
+                "timings": timings.as_dict(),
+            },
+        )
+        await asyncio.to_thread(self._store.set_status, job_id, JOB_SUCCEEDED, data)
+        self._notify(job_id)
+
+    async def _fail(self, job_id: str, message: str) -> None:
+        await self.publish(
+            job_id,
+            {
+                "type": "error",
+                "progress": 100,
+                "message": message,
+            },
+        )
+        await asyncio.to_thread(self._store.set_status, job_id, JOB_FAILED, None, message)
+        self._notify(job_id)
+
+
+_manager: Optional[JobManager] = None
+
+
+def get_job_manager() -> JobManager:
+    global _manager
+    if _manager is None:
+        _manager = JobManager()
+    return _manager
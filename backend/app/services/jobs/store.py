@@ -0,0 +1,201 @@
+"""SQLite persistence for analysis jobs and their NDJSON event logs."""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from backend.app.core.config import JOBS_DB_PATH
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+TERMINAL_STATES = {JOB_SUCCEEDED, JOB_FAILED}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    saved_path TEXT NOT NULL,
+    options TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    owner TEXT,
+    lease_until REAL
+);
+CREATE TABLE IF NOT EXISTS job_events (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+"""
+
+
+@dataclass
+class JobRecord:
+    id: str
+    status: str
+    filename: str
+    saved_path: str
+    options: dict
+    result: Optional[dict]
+    error: Optional[str]
+    created_at: float
+    updated_at: float
+
+    @property
+    def finished(self) -> bool:
+        return self.status in TERMINAL_STATES
+
+
+class JobStore:
+    """
+    單一 SQLite 檔案保存工作狀態與事件。
+    事件以 (job_id, seq) 為主鍵遞增編號，斷線後可用 after=seq 從任意位置續傳。
+    """
+
+    def __init__(self, path: str = JOBS_DB_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        # 舊版資料庫沒有租約欄位：補上後既有的未完成工作視為租約已過期
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("owner", "TEXT"), ("lease_until", "REAL")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._lock = threading.Lock()
+
+    def create_job(
+        self, filename: str, saved_path: str, options: dict, owner: Optional[str] = None, lease_s: float = 0.0
+    ) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, filename, saved_path, options, created_at, updated_at, owner, lease_until) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, JOB_QUEUED, filename, saved_path, json.dumps(options), now, now, owner, now + lease_s),
+            )
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[JobRecord]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, filename, saved_path, options, result, error, created_at, updated_at "
+                "FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return JobRecord(
+            id=row[0],
+            status=row[1],
+            filename=row[2],
+            saved_path=row[3],
+            options=json.loads(row[4]),
+            result=json.loads(row[5]) if row[5] else None,
+            error=row[6],
+            created_at=row[7],
+            updated_at=row[8],
+        )
+
+    def set_status(self, job_id: str, status: str, result: Optional[dict] = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = COALESCE(?, result), error = COALESCE(?, error), "
+                "updated_at = ? WHERE id = ?",
+                (
+                    status,
+                    json.dumps(result, ensure_ascii=False) if result is not None else None,
+                    error,
+                    time.time(),
+                    job_id,
+                ),
+            )
+
+    def append_event(self, job_id: str, payload: dict) -> int:
+        """寫入事件並回傳其序號（從 1 開始）。"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                (last,) = self._conn.execute(
+                    "SELECT COALESCE(MAX(seq), 0) FROM job_events WHERE job_id = ?",
+                    (job_id,),
+                ).fetchone()
+                seq = last + 1
+                self._conn.execute(
+                    "INSERT INTO job_events (job_id, seq, payload) VALUES (?, ?, ?)",
+                    (job_id, seq, json.dumps(payload, ensure_ascii=False)),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return seq
+
+    def events_after(self, job_id: str, after: int = 0, limit: int = 500) -> List[Tuple[int, dict]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, payload FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                (job_id, after, limit),
+            ).fetchall()
+        return [(seq, json.loads(payload)) for seq, payload in rows]
+
+    def renew_leases(self, owner: str, lease_s: float) -> None:
+        """延長 owner 名下所有未完成工作的租約。"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE owner = ? AND status IN (?, ?)",
+                (time.time() + lease_s, owner, JOB_QUEUED, JOB_RUNNING),
+            )
+
+    def release_leases(self, owner: str) -> None:
+        """正常關閉時讓出租約，其他行程不必等到過期即可接手。"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET lease_until = 0 WHERE owner = ? AND status IN (?, ?)",
+                (owner, JOB_QUEUED, JOB_RUNNING),
+            )
+
+    def claim_expired(self, owner: str, lease_s: float) -> List[str]:
+        """
+        接手租約已過期（負責的行程已結束）的未完成工作，回傳 job id。
+        在同一個寫入交易內查詢並改寫 owner，多個行程同時恢復時每個工作只會被一個行程取得。
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id FROM jobs WHERE status IN (?, ?) AND COALESCE(lease_until, 0) < ? ORDER BY created_at",
+                    (JOB_QUEUED, JOB_RUNNING, now),
+                ).fetchall()
+                job_ids = [row[0] for row in rows]
+                self._conn.executemany(
+                    "UPDATE jobs SET owner = ?, lease_until = ? WHERE id = ?",
+                    [(owner, now + lease_s, job_id) for job_id in job_ids],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return job_ids
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
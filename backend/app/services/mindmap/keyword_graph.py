@@ -0,0 +1,84 @@
+"""Per-document keyword index shared by the Mermaid and Graphviz mind map builders."""
+
+from __future__ import annotations
+
+from array import array
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+
+
+class KeywordGraph:
+    """
+    一次掃描 paragraph_keywords 建立：
+    - keyword -> 段落 postings（inverted index）
+    - 稀疏共現矩陣（dict-of-Counter，只存非零格）
+    關鍵字一律以小寫比對，標籤保留第一次出現的寫法。
+    """
+
+    def __init__(self, paragraph_keywords: Sequence[Dict]):
+        self._ids: Dict[str, int] = {}
+        self._labels: List[str] = []
+        self._postings: List[array] = []
+        self._cooccurrence: List[Counter] = []
+        self._frequency: List[int] = []
+        self._ranked: Optional[List[int]] = None
+
+        for position, item in enumerate(paragraph_keywords):
+            paragraph_index = item.get("paragraph_index", position)
+            seen: List[int] = []
+            for raw in item.get("keywords", []):
+                if not raw or not raw.strip():
+                    continue
+                kw_id = self._intern(raw.strip())
+                self._frequency[kw_id] += 1
+                if kw_id in seen:
+                    continue
+                seen.append(kw_id)
+                self._postings[kw_id].append(paragraph_index)
+
+            for i, left in enumerate(seen):
+                row = self._cooccurrence[left]
+                for right in seen[i + 1:]:
+                    row[right] += 1
+                    self._cooccurrence[right][left] += 1
+
+    def _intern(self, keyword: str) -> int:
+        key = keyword.lower()
+        kw_id = self._ids.get(key)
+        if kw_id is None:
+            kw_id = len(self._labels)
+            self._ids[key] = kw_id
+            self._labels.append(keyword)
+            self._postings.append(array("I"))
+            self._cooccurrence.append(Counter())
+            self._frequency.append(0)
+        return kw_id
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def __contains__(self, keyword: str) -> bool:
+        return (keyword or "").strip().lower() in self._ids
+
+    def label(self, keyword: str) -> Optional[str]:
+        kw_id = self._ids.get((keyword or "").strip().lower())
+        return None if kw_id is None else self._labels[kw_id]
+
+    def paragraphs_for(self, keyword: str) -> List[int]:
+        kw_id = self._ids.get((keyword or "").strip().lower())
+        return [] if kw_id is None else list(self._postings[kw_id])
+
+    def top_keywords(self, top_k: int = 8) -> List[str]:
+        """依出現次數排序；同分時保留首次出現順序（與 Counter.most_common 一致）。"""
+        if self._ranked is None:
+            self._ranked = sorted(range(len(self._labels)), key=lambda i: (-self._frequency[i], i))
+        return [self._labels[i] for i in self._ranked[:top_k]]
+
+    def related(self, keyword: str, max_items: int) -> List[str]:
+        """回傳與 keyword 同段落出現的關鍵字，依共現次數由高到低排序。"""
+        kw_id = self._ids.get((keyword or "").strip().lower())
+        if kw_id is None or max_items <= 0:
+            return []
+        row = self._cooccurrence[kw_id]
+        ranked = sorted(row, key=lambda other: (-row[other], other))
+        return [self._labels[other] for other in ranked[:max_items]]
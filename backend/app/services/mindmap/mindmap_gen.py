@@ -1,11 +1,14 @@
 import os
 import re
 import unicodedata
-from collections import Counter
 from datetime import datetime
-from typing import Dict, List, Sequence, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 
 from backend.app.core.config import MINDMAP_DIR
+from backend.app.core.metrics import StageTimings
+from backend.app.services.mindmap.keyword_graph import KeywordGraph
+from backend.app.services.mindmap.render_service import render_graph
+from backend.app.services.storage import make_public_url
 
 try:  # pragma: no cover - 若外部提供工具則直接沿用
     from backend.app.services.wordcloud.annotator import safe_slug  # type: ignore
@@ -44,40 +47,6 @@ def infer_doc_title(paragraphs: Sequence, fallback: str = "Document", limit: int
     return _sanitize_label(fallback, limit)
 
 
-def _top_keywords(paragraph_keywords: List[Dict], top_k: int = 8) -> List[str]:
-    bag = Counter()
-    for item in paragraph_keywords:
-        for kw in item.get("keywords", []):
-            if not kw:
-                continue
-            bag[kw.strip()] += 1
-    return [w for w, _ in bag.most_common(top_k)]
-
-
-def _related_keywords(
-    focus_kw: str,
-    paragraph_keywords: List[Dict],
-    max_items: int,
-) -> List[str]:
-    """找出與主關鍵字同段落出現的其它關鍵字（去重）。"""
-    related: List[str] = []
-    seen = set()
-    focus_lower = focus_kw.lower()
-    for item in paragraph_keywords:
-        kws = [w.strip() for w in item.get("keywords", []) if w and w.strip()]
-        if not any(w.lower() == focus_lower for w in kws):
-            continue
-        for cand in kws:
-            cand_lower = cand.lower()
-            if cand_lower == focus_lower or cand_lower in seen:
-                continue
-            seen.add(cand_lower)
-            related.append(cand)
-            if len(related) >= max_items:
-                return related
-    return related
-
-
 def _primary_token(text: str) -> str | None:
     tokens = re.findall(r"[A-Za-z0-9][A-Za-z0-9\-_/]*", text or "")
     for token in tokens:
@@ -86,19 +55,22 @@ def _primary_token(text: str) -> str | None:
     return None
 
 
-def select_root_label(paragraph_keywords: List[Dict], fallback: str = "Document") -> str:
+def select_root_label(
+    paragraph_keywords: List[Dict],
+    fallback: str = "Document",
+    keyword_graph: Optional[KeywordGraph] = None,
+) -> str:
     """根據關鍵字頻率挑選心智圖根節點標籤，優先使用 fallback 中的主要關鍵字。"""
+    graph = keyword_graph or KeywordGraph(paragraph_keywords)
     fallback_token = _primary_token(fallback)
     if fallback_token:
         fallback_token = _sanitize_label(fallback_token, limit=40)
-        lower = fallback_token.lower()
-        for item in paragraph_keywords:
-            for kw in item.get("keywords", []):
-                if kw and kw.lower() == lower:
-                    return _sanitize_label(kw, limit=40)
+        matched = graph.label(fallback_token)
+        if matched:
+            return _sanitize_label(matched, limit=40)
         return fallback_token
 
-    top = _top_keywords(paragraph_keywords, top_k=1)
+    top = graph.top_keywords(top_k=1)
     if top:
         return _sanitize_label(top[0], limit=40)
     return _sanitize_label(fallback, limit=40)
@@ -109,6 +81,7 @@ def build_mermaid_mindmap(
     paragraph_keywords: List[Dict],
     top_k: int = 8,
     max_refs_per_kw: int = 5,
+    keyword_graph: Optional[KeywordGraph] = None,
 ) -> str:
     """
     產生 Mermaid mindmap 文字：
@@ -119,34 +92,42 @@ def build_mermaid_mindmap(
           Related kw2
         Keyword B
           ...
+    相關關鍵字依共現次數排序；可傳入既有 keyword_graph 以免重建索引。
     """
-    root_label = select_root_label(paragraph_keywords, doc_title or "Document")
-    keywords = _top_keywords(paragraph_keywords, top_k=top_k)
+    graph = keyword_graph or KeywordGraph(paragraph_keywords)
+    root_label = select_root_label(paragraph_keywords, doc_title or "Document", graph)
+    keywords = graph.top_keywords(top_k=top_k)
 
     lines = ["mindmap", f"  root){root_label}("]
     for idx, kw in enumerate(keywords):
         side_prefix = "::left:: " if idx % 2 else "::right:: "
         kw_label = _sanitize_label(kw, limit=40)
         lines.append(f"    {side_prefix}{kw_label}")
-        related = _related_keywords(kw, paragraph_keywords, max_refs_per_kw)
+        related = graph.related(kw, max_refs_per_kw)
         for rel in related:
             lines.append(f"      {_sanitize_label(rel, limit=40)}")
     return "\n".join(lines)
 
 
+_GRAPH_DPI = {"png": "220", "svg": "72"}
+
+
 def build_graphviz_mindmap(
     doc_title: str,
     paragraph_keywords: List[Dict],
     top_k: int = 8,
     max_refs_per_kw: int = 5,
+    keyword_graph: Optional[KeywordGraph] = None,
+    image_format: str = "png",
 ):
     try:
         from graphviz import Digraph
     except ImportError:  # pragma: no cover - optional dependency
         return None
 
-    root_label = select_root_label(paragraph_keywords, doc_title)
-    keywords = _top_keywords(paragraph_keywords, top_k=top_k)
+    keyword_graph = keyword_graph or KeywordGraph(paragraph_keywords)
+    root_label = select_root_label(paragraph_keywords, doc_title, keyword_graph)
+    keywords = keyword_graph.top_keywords(top_k=top_k)
 
     graph = Digraph(
         "mindmap",
@@ -158,7 +139,8 @@ def build_graphviz_mindmap(
             "size": "8,8!",
             "ratio": "fill",
             "pad": "0.6",
-            "dpi": "220",
+            # 圖內的 dpi 會覆蓋命令列的 -Gdpi；SVG 是向量，用 72 以免 width/height 被放大
+            "dpi": _GRAPH_DPI.get(image_format, _GRAPH_DPI["png"]),
         },
         node_attr={"fontname": "Helvetica", "fontsize": "13"},
         edge_attr={"arrowsize": "0.6"},
@@ -192,7 +174,7 @@ def build_graphviz_mindmap(
         else:
             graph.edge(kw_id, "root")
 
-        related = _related_keywords(kw, paragraph_keywords, max_refs_per_kw)
+        related = keyword_graph.related(kw, max_refs_per_kw)
         for ridx, rel in enumerate(related):
             rel_id = f"{kw_id}_{ridx}"
             graph.node(
@@ -212,23 +194,6 @@ def build_graphviz_mindmap(
     return graph
 
 
-def save_graphviz_png(graph, name_hint: str = "mindmap") -> Tuple[str | None, str | None]:
-    if graph is None:
-        return None, None
-
-    os.makedirs(MINDMAP_DIR, exist_ok=True)
-    ts = datetime.utcnow().strftime("%Y%m%d%H%M%S%f")
-    slug = safe_slug(name_hint) if callable(safe_slug) else None
-    slug = slug or _fallback_slug(name_hint) or "mindmap"
-    filename = f"{slug}_{ts}"
-    output_path = os.path.join(MINDMAP_DIR, filename)
-    try:
-        rendered = graph.render(output_path, format="png", cleanup=True)
-    except Exception as exc:  # pragma: no cover - graphviz runtime failure
-        raise RuntimeError(f"Graphviz render failed: {exc}") from exc
-    return rendered, os.path.basename(rendered)
-
-
 def save_mermaid(mmd_text: str, name_hint: str = "mindmap") -> Tuple[str, str]:
     """
     將 .mmd 存到 storage/mindmaps，回傳 (abs_path, filename)
@@ -242,3 +207,52 @@ def save_mermaid(mmd_text: str, name_hint: str = "mindmap") -> Tuple[str, str]:
     with open(abs_path, "w", encoding="utf-8") as f:
         f.write(mmd_text)
     return abs_path, fname
+
+
+async def generate_mindmap(
+    paragraph_keywords: List[Dict],
+    doc_title: str,
+    image_format: str = "png",
+    render_mode: str = "sync",
+    top_k: int = 8,
+    max_refs_per_kw: int = 5,
+    timings: Optional[StageTimings] = None,
+) -> Dict:
+    """
+    由段落關鍵字產生完整心智圖輸出（Mermaid 文字、.mmd 檔與 Graphviz 圖片），
+    /mindmap 與 /analyze 的 mindmap stage 共用。
+    """
+    timings = timings or StageTimings("mindmap")
+    with timings.stage("mindmap_build"):
+        # 關鍵字索引與共現矩陣只建一次，兩種輸出共用
+        keyword_graph = KeywordGraph(paragraph_keywords)
+        root_title = select_root_label(paragraph_keywords, doc_title, keyword_graph)
+        mmd_text = build_mermaid_mindmap(
+            root_title, paragraph_keywords, top_k=top_k, max_refs_per_kw=max_refs_per_kw, keyword_graph=keyword_graph
+        )
+        mmd_abs, _ = save_mermaid(mmd_text, name_hint=root_title)
+
+        graph = build_graphviz_mindmap(
+            root_title,
+            paragraph_keywords,
+            top_k=top_k,
+            max_refs_per_kw=max_refs_per_kw,
+            keyword_graph=keyword_graph,
+            image_format=image_format,
+        )
+    # async 模式且未命中快取時只計入排程時間；實際 dot 耗時見 graphviz_dot stage
+    with timings.stage("graphviz_render"):
+        image_abs, image_status, image_error, render_key = await render_graph(graph, image_format, render_mode)
+
+    return {
+        "doc_title": root_title,
+        "mindmap_mermaid": mmd_text,
+        "mindmap_file_url": make_public_url(mmd_abs),           # e.g. /static/mindmaps/xxx.mmd
+        "mindmap_image_url": make_public_url(image_abs) if image_abs else None,
+        "mindmap_image_file": os.path.basename(image_abs) if image_abs else None,
+        "mindmap_image_status": image_status,
+        "mindmap_image_error": image_error,
+        "mindmap_image_status_url": (
+            f"/mindmap/render/{render_key}?fmt={image_format}" if render_key else None
+        ),
+    }
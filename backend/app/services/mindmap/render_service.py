@@ -0,0 +1,188 @@
+"""Content-addressed, bounded Graphviz rendering shared by every mind map request."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from backend.app.core.config import (
+    GRAPHVIZ_RENDER_TIMEOUT,
+    GRAPHVIZ_RENDER_WORKERS,
+    MINDMAP_RENDER_DIR,
+)
+from backend.app.core.metrics import INFLIGHT, QUEUE_DEPTH, STAGE_SECONDS
+
+RENDER_FORMATS = ("png", "svg")
+
+# 只保留最近的失敗原因供 status 查詢，避免不斷失敗的 key 讓字典無限成長
+MAX_TRACKED_ERRORS = 256
+
+
+class GraphvizRenderService:
+    """
+    以 DOT 原始碼的雜湊作為快取鍵：
+    - 相同圖形直接回傳既有檔案（storage/mindmaps/rendered/<key>.<fmt>）
+    - 同一個 key 正在渲染時共用同一個 Future，不重複呼叫 dot
+    - 渲染在固定大小的 worker pool 執行，並套用逾時
+    """
+
+    def __init__(
+        self,
+        output_dir: str = MINDMAP_RENDER_DIR,
+        max_workers: int = GRAPHVIZ_RENDER_WORKERS,
+        timeout: float = GRAPHVIZ_RENDER_TIMEOUT,
+        engine: str = "dot",
+    ):
+        self._output_dir = output_dir
+        self._timeout = timeout
+        self._engine = engine
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="graphviz")
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Future] = {}
+        self._errors: "OrderedDict[str, str]" = OrderedDict()
+
+    @property
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    @staticmethod
+    def cache_key(source: str, fmt: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(fmt.encode("ascii"))
+        digest.update(b"\0")
+        digest.update(source.encode("utf-8"))
+        return digest.hexdigest()[:32]
+
+    def artifact_path(self, key: str, fmt: str) -> str:
+        return os.path.join(self._output_dir, f"{key}.{fmt}")
+
+    def lookup(self, key: str, fmt: str) -> Optional[str]:
+        path = self.artifact_path(key, fmt)
+        return path if os.path.exists(path) else None
+
+    def status(self, key: str, fmt: str) -> Tuple[str, Optional[str]]:
+        """回傳 (status, error)；status 為 ready / pending / failed / missing。"""
+        if self.lookup(key, fmt):
+            return "ready", None
+        with self._lock:
+            if key in self._pending:
+                return "pending", None
+            if key in self._errors:
+                return "failed", self._errors[key]
+        return "missing", None
+
+    def submit(self, source: str, fmt: str = "png") -> Tuple[str, Future]:
+        """排入背景渲染並立即回傳 (key, Future)；快取命中時 Future 已完成。"""
+        if fmt not in RENDER_FORMATS:
+            raise ValueError(f"不支援的心智圖圖片格式: {fmt}")
+        key = self.cache_key(source, fmt)
+        cached = self.lookup(key, fmt)
+        if cached:
+            done: Future = Future()
+            done.set_result(cached)
+            return key, done
+
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is not None:
+                return key, pending
+            self._errors.pop(key, None)
+            future = self._executor.submit(self._render, source, fmt, key)
+            self._pending[key] = future
+        future.add_done_callback(lambda fut, k=key: self._finish(k, fut))
+        return key, future
+
+    async def render(self, source: str, fmt: str = "png") -> str:
+        """在 worker pool 渲染並等待結果，不阻塞 event loop。"""
+        _, future = self.submit(source, fmt)
+        return await asyncio.wrap_future(future)
+
+    def _finish(self, key: str, future: Future) -> None:
+        with self._lock:
+            self._pending.pop(key, None)
+            # 關閉時取消的工作沒有結果也不算失敗；cancelled future 呼叫 exception() 會丟出 CancelledError
+            if future.cancelled():
+                return
+            exc = future.exception()
+            if exc is not None:
+                self._errors[key] = str(exc)
+                self._errors.move_to_end(key)
+                while len(self._errors) > MAX_TRACKED_ERRORS:
+                    self._errors.popitem(last=False)
+
+    def _render(self, source: str, fmt: str, key: str) -> str:
+        os.makedirs(self._output_dir, exist_ok=True)
+        final_path = self.artifact_path(key, fmt)
+        tmp_path = f"{final_path}.{threading.get_ident()}.tmp"
+        cmd = [self._engine, f"-T{fmt}", "-o", tmp_path]
+        started = time.perf_counter()
+        try:
+            with INFLIGHT.labels(resource="graphviz").track_inprogress():
+                subprocess.run(
+                    cmd,
+                    input=source.encode("utf-8"),
+                    capture_output=True,
+                    timeout=self._timeout,
+                    check=True,
+                )
+            if not os.path.exists(tmp_path) or not os.path.getsize(tmp_path):
+                raise RuntimeError("Graphviz render produced no output")
+            # 以 rename 原子性地發布快取檔，避免讀到寫一半的圖片
+            os.replace(tmp_path, final_path)
+        except FileNotFoundError as exc:
+            raise RuntimeError("找不到 Graphviz 執行檔（dot），請先安裝 graphviz。") from exc
+        except subprocess.TimeoutExpired as exc:
+            raise RuntimeError(f"Graphviz render timed out after {self._timeout:.0f}s") from exc
+        except subprocess.CalledProcessError as exc:
+            stderr = (exc.stderr or b"").decode("utf-8", "ignore").strip()
+            raise RuntimeError(f"Graphviz render failed: {stderr or exc}") from exc
+        finally:
+            STAGE_SECONDS.labels(pipeline="mindmap", stage="graphviz_dot").observe(time.perf_counter() - started)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return final_path
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_service: Optional[GraphvizRenderService] = None
+_service_lock = threading.Lock()
+
+
+def get_render_service() -> GraphvizRenderService:
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = GraphvizRenderService()
+            QUEUE_DEPTH.labels(queue="graphviz").set_function(lambda: _service.pending_count)
+        return _service
+
+
+async def render_graph(graph, fmt: str = "png", mode: str = "sync") -> Tuple[Optional[str], Optional[str], Optional[str], Optional[str]]:
+    """
+    渲染 graphviz.Digraph，回傳 (image_abs, status, error, render_key)。
+    mode=async 且快取未命中時不等待，直接回傳最終路徑與 pending 狀態。
+    """
+    if graph is None:
+        return None, None, None, None
+
+    service = get_render_service()
+    key, future = service.submit(graph.source, fmt)
+    if mode == "async" and not future.done():
+        # 檔名由 DOT 雜湊決定，可先回傳最終路徑，由前端輪詢狀態
+        return service.artifact_path(key, fmt), "pending", None, key
+
+    try:
+        image_abs = await asyncio.wrap_future(future)
+    except Exception as exc:  # pylint: disable=broad-except
+        return None, "failed", str(exc), key
+    return image_abs, "ready", None, key
@@ -1,18 +1,11 @@
+from functools import lru_cache
 from typing import List
 from collections import Counter
 from backend.app.models.schemas import Paragraph
 import re
 
-# 中文分詞
-import jieba
-# 英文停用詞
-from nltk.corpus import stopwords
-
-EN_STOP = set()
-try:
-    EN_STOP = set(stopwords.words('english'))
-except Exception:
-    EN_STOP = {
+# jieba（中文分詞）與 nltk（英文停用詞）載入成本高，延後到第一次用到時才 import
+_FALLBACK_EN_STOP = {
     # 基本冠詞/代名詞/助動詞/連接詞/介系詞
     "the","a","an","of","to","in","and","is","are","for","on","with","as","by","this","that",
     "be","or","it","from","at","than","into","about","can","will","not","no","yes","we","you",
@@ -36,6 +29,15 @@ except Exception:
     "s","t","ll","re","ve","d","m","o","u","rt","nt",
 }
 
+@lru_cache(maxsize=1)
+def en_stopwords() -> frozenset:
+    try:
+        from nltk.corpus import stopwords
+
+        return frozenset(stopwords.words('english'))
+    except Exception:
+        return frozenset(_FALLBACK_EN_STOP)
+
 ZH_STOP = {
     # 常見虛詞/助詞/語氣詞
     "的","了","在","是","和","及","與","並","也","就","還","而","被","把","於","對","由","等","或","及其",
@@ -62,12 +64,14 @@ def _is_zh(lang: str) -> bool:
 
 def _tokenize(text: str, lang: str):
     if _is_zh(lang):
+        import jieba
+
         return [w.strip() for w in jieba.cut(text) if w.strip()]
     return re.findall(r"[A-Za-z][A-Za-z\-']{1,}", text.lower())
 
 def extract_keywords_by_paragraph(paragraphs: List[Paragraph], lang: str, topk: int = 8):
     results = []
-    stop = ZH_STOP if _is_zh(lang) else EN_STOP
+    stop = ZH_STOP if _is_zh(lang) else en_stopwords()
     for p in paragraphs:
         tokens = [t for t in _tokenize(p.text, lang) if t not in stop and len(t) > 1]
         freq = Counter(tokens)
@@ -2,10 +2,19 @@ from __future__ import annotations
 
 import unicodedata
 import re
-from typing import Iterable, Tuple
+from typing import Iterable, Optional, Sequence, Tuple
 
-from langdetect import detect, detect_langs  # type: ignore
-from langdetect.lang_detect_exception import LangDetectException
+from backend.app.services.analyze.page_features import (
+    SCRIPT_CJK,
+    SCRIPT_HANGUL,
+    SCRIPT_KANA,
+    SCRIPT_LATIN,
+    script_histogram,
+)
+
+# langdetect 與視覺語言判定各自只看文件開頭的這麼多字元
+DETECT_SAMPLE_CHARS = 5000
+VISUAL_SAMPLE_CHARS = 8000
 
 
 def _count_chars(text: str, ranges: Iterable[Tuple[int, int]]) -> int:
@@ -38,11 +47,43 @@ def _count_ascii_letters(text: str) -> int:
     return sum(1 for char in text if char.isascii() and char.isalpha())
 
 
-def detect_lang(text: str) -> str:
-    sample = _strip_control(text[:5000])
+def _confident_zh(histogram: Sequence[int]) -> bool:
+    """CJK 明顯主導且無假名/諺文時可直接判為中文，省下 langdetect 的機率計算。"""
+    cjk = histogram[SCRIPT_CJK]
+    return (
+        cjk >= 50
+        and histogram[SCRIPT_KANA] == 0
+        and histogram[SCRIPT_HANGUL] == 0
+        and cjk >= histogram[SCRIPT_LATIN] * 2
+    )
+
+
+def _sample_histogram(
+    text: str, sample: str, limit: int, histogram: Optional[Sequence[int]]
+) -> Optional[Sequence[int]]:
+    """
+    傳入的 histogram 是整份文件的統計；文件比取樣長時改以取樣重算，
+    否則門檻（為固定長度的取樣調校）會因後面的頁面而改變判定結果。
+    """
+    if histogram is None:
+        return None
+    if len(text) <= limit:
+        return histogram
+    return script_histogram(sample)
+
+
+def detect_lang(text: str, histogram: Optional[Sequence[int]] = None) -> str:
+    sample = _strip_control(text[:DETECT_SAMPLE_CHARS])
+    histogram = _sample_histogram(text, sample, DETECT_SAMPLE_CHARS, histogram)
+    if histogram is not None and _confident_zh(histogram):
+        return "zh"
+
     if not sample:
         return "en"
 
+    from langdetect import detect, detect_langs  # type: ignore
+    from langdetect.lang_detect_exception import LangDetectException
+
     try:
         # Use probability list so we can reason about confidence levels.
         lang_probs = detect_langs(sample)
@@ -79,21 +120,32 @@ def detect_lang(text: str) -> str:
 
     return primary
 
-def determine_visual_language(text: str, detected_lang: str) -> str:
+def determine_visual_language(
+    text: str,
+    detected_lang: str,
+    histogram: Optional[Sequence[int]] = None,
+) -> str:
     base = (detected_lang or "en").lower()
     if base.startswith("en"):
         return "en"
 
-    sample = _strip_control((text or "")[:8000])
+    sample = _strip_control((text or "")[:VISUAL_SAMPLE_CHARS])
     if not sample:
         return detected_lang
+    histogram = _sample_histogram(text or "", sample, VISUAL_SAMPLE_CHARS, histogram)
 
-    english_letters = _count_ascii_letters(sample)
+    if histogram is not None:
+        english_letters = histogram[SCRIPT_LATIN]
+    else:
+        english_letters = _count_ascii_letters(sample)
     if english_letters == 0:
         return detected_lang
 
     english_words = {word.lower() for word in EN_WORD_RE.findall(sample)}
-    cjk_count, _ = _cjk_hangul_counts(sample)
+    if histogram is not None:
+        cjk_count = histogram[SCRIPT_CJK]
+    else:
+        cjk_count, _ = _cjk_hangul_counts(sample)
 
     if not english_words:
         return detected_lang
@@ -0,0 +1,131 @@
+"""Extractive summarisation with TextRank over sentence-similarity matrices."""
+
+from __future__ import annotations
+
+import re
+from typing import Dict, List, Sequence
+
+# 句子切分：中英文句末標點、分號與換行
+_SENTENCE_SPLIT = re.compile(r"(?<=[。！？!?；;])\s*|(?<=\.)\s+(?=[A-Z0-9\"'(])|\n+")
+_CJK_RUN = re.compile(r"[㐀-鿿豈-﫿]+")
+_WORD = re.compile(r"[A-Za-z][A-Za-z0-9\-']+|\d+(?:\.\d+)?%?")
+MIN_SENTENCE_CHARS = 8
+DAMPING = 0.85
+
+
+def split_sentences(text: str) -> List[str]:
+    sentences = []
+    for raw in _SENTENCE_SPLIT.split(text or ""):
+        sentence = " ".join(raw.split())
+        if len(sentence) >= MIN_SENTENCE_CHARS:
+            sentences.append(sentence)
+    return sentences
+
+
+def _tokens(sentence: str) -> List[str]:
+    from backend.app.services.nlp.keyword_extractor import en_stopwords
+
+    stop = en_stopwords()
+    tokens = [word.lower() for word in _WORD.findall(sentence) if word.lower() not in stop]
+    # 中文不分詞（避免載入 jieba），以相鄰字元 bigram 表示
+    for run in _CJK_RUN.findall(sentence):
+        if len(run) == 1:
+            tokens.append(run)
+        tokens.extend(run[i : i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def similarity_matrix(sentences: Sequence[str]):
+    """
+    句子 × 詞彙的對數 TF 稀疏矩陣（scipy.sparse），列正規化後以矩陣乘法求 cosine 相似度。
+    dense 的句子 × 詞彙矩陣在整份長文件上可達數百 MB，稀疏表示只存實際出現的詞。
+    """
+    import numpy as np
+    from scipy import sparse
+
+    vocab: Dict[str, int] = {}
+    rows: List[int] = []
+    cols: List[int] = []
+    for row, sentence in enumerate(sentences):
+        for token in _tokens(sentence):
+            rows.append(row)
+            cols.append(vocab.setdefault(token, len(vocab)))
+
+    # 重複的 (row, col) 在轉成 CSR 時相加，即詞頻
+    counts = sparse.coo_matrix(
+        (np.ones(len(rows), dtype=np.float32), (np.asarray(rows, dtype=np.intp), np.asarray(cols, dtype=np.intp))),
+        shape=(len(sentences), max(1, len(vocab))),
+    ).tocsr()
+    counts.sum_duplicates()
+    weights = counts.log1p()
+    norms = np.sqrt(np.asarray(weights.multiply(weights).sum(axis=1)).ravel())
+    weights = sparse.diags(1.0 / np.where(norms == 0, 1.0, norms)).astype(np.float32) @ weights
+    similarity = (weights @ weights.T).tocsr()
+    similarity.setdiag(0.0)
+    similarity.eliminate_zeros()
+    return similarity
+
+
+def textrank_scores(similarity, damping: float = DAMPING, max_iter: int = 100, tol: float = 1e-6):
+    """
+    以 power iteration 求 PageRank；沒有任何相似邊的句子視為均勻連到全部句子。
+    similarity 可為 numpy 陣列或 scipy.sparse 矩陣；轉移矩陣不另外建立，每輪以列和縮放分數後相乘。
+    """
+    import numpy as np
+
+    n = similarity.shape[0]
+    if n == 0:
+        return np.zeros(0, dtype=np.float32)
+    row_sums = np.asarray(similarity.sum(axis=1), dtype=np.float64).ravel()
+    linked = row_sums > 0
+    inverse = np.where(linked, 1.0 / np.where(linked, row_sums, 1.0), 0.0)
+    scores = np.full(n, 1.0 / n, dtype=np.float64)
+    teleport = (1.0 - damping) / n
+    for _ in range(max_iter):
+        # 沒有邊的句子把分數平均分給所有句子
+        dangling = scores[~linked].sum() / n
+        updated = teleport + damping * (np.asarray(similarity.T @ (scores * inverse)).ravel() + dangling)
+        if np.abs(updated - scores).sum() < tol:
+            return updated
+        scores = updated
+    return scores
+
+
+def rank_sentences(sentences: Sequence[str]) -> List[int]:
+    """回傳依 TextRank 分數由高到低的句子索引（同分時保留原順序）。"""
+    if len(sentences) <= 1:
+        return list(range(len(sentences)))
+    import numpy as np
+
+    scores = textrank_scores(similarity_matrix(sentences))
+    return [int(i) for i in np.argsort(-scores, kind="stable")]
+
+
+def extract_summary(text: str, max_sentences: int = 4, min_chars: int = 0) -> List[str]:
+    """
+    選出 TextRank 前 max_sentences 句，依原文順序回傳。
+    min_chars > 0 時，過短的句子會併入原文中緊接的句子（被併入的入選句不再單獨成條），讓每條摘要資訊量足夠。
+    """
+    sentences = split_sentences(text)
+    if not sentences:
+        return []
+    picked = sorted(rank_sentences(sentences)[: max(1, max_sentences)])
+    summary: List[str] = []
+    consumed = -1
+    for index in picked:
+        if index <= consumed:
+            continue
+        sentence = sentences[index]
+        consumed = index
+        while min_chars and len(sentence) < min_chars and consumed + 1 < len(sentences):
+            consumed += 1
+            joiner = "" if _CJK_RUN.search(sentence[-1:]) or sentence[-1:] in "。！？；" else " "
+            sentence = f"{sentence}{joiner}{sentences[consumed]}"
+        summary.append(sentence)
+    return summary
+
+
+def top_sentences(sentences: Sequence[str], limit: int) -> List[int]:
+    """對既有句子清單排序後取前 limit 句，依原順序回傳索引。"""
+    return sorted(rank_sentences(sentences)[: max(0, limit)])
+
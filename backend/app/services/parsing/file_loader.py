@@ -1,5 +1,5 @@
 from typing import Tuple, List
-from backend.app.models.schemas import Paragraph
+from backend.app.models.document import TextSpan
 from .parse_pdf import parse_pdf
 from .parse_docx import parse_docx
 from .parse_pptx import parse_pptx
@@ -14,7 +14,7 @@ PARSERS = {
     ".txt": parse_txt,
 }
 
-def load_file_as_text_and_paragraphs(path: str) -> Tuple[str, List[Paragraph]]:
+def load_file_as_text_and_paragraphs(path: str) -> Tuple[str, List[TextSpan]]:
     import os
     ext = os.path.splitext(path)[1].lower()
     if ext not in PARSERS:
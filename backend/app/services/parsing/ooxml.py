@@ -0,0 +1,258 @@
+"""Streaming text extraction for PPTX / DOCX straight from the OOXML zip parts."""
+
+from __future__ import annotations
+
+import posixpath
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Iterator, List, Optional
+
+from backend.app.core.config import OOXML_FAST_PATH, OOXML_WORKERS
+from backend.app.core.metrics import OOXML_EXTRACTIONS
+
+_P = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+_A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_OFFICE_DOCUMENT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+# 投影片數少於此值時逐張處理，不值得開執行緒
+PARALLEL_MIN_SLIDES = 8
+
+
+class OOXMLUnsupported(Exception):
+    """檔案結構不在快速路徑的處理範圍（Strict OOXML、缺少部件等），呼叫端應改用 python-pptx / python-docx。"""
+
+
+@lru_cache(maxsize=1)
+def _lxml():
+    # lxml 在解析時會釋放 GIL，投影片可以真正平行；沒有 lxml 時退回標準庫
+    try:
+        from lxml import etree
+    except ImportError:  # pragma: no cover - python-pptx / python-docx 都依賴 lxml
+        return None, None
+    # 上傳檔案不可信：不展開實體、不連網（與 python-docx / python-pptx 的設定相同）
+    return etree, etree.XMLParser(resolve_entities=False, no_network=True, remove_comments=True)
+
+
+def _fromstring(xml: bytes):
+    etree, parser = _lxml()
+    if etree is None:
+        import xml.etree.ElementTree as std
+
+        return std.fromstring(xml)
+    return etree.fromstring(xml, parser)
+
+
+def _iterparse(stream, events):
+    etree, _ = _lxml()
+    if etree is None:
+        import xml.etree.ElementTree as std
+
+        return std.iterparse(stream, events=events)
+    return etree.iterparse(stream, events=events, resolve_entities=False, no_network=True, remove_comments=True)
+
+
+def _rels_path(part: str) -> str:
+    folder, name = posixpath.split(part)
+    return posixpath.join(folder, "_rels", f"{name}.rels")
+
+
+def _relationships(archive: zipfile.ZipFile, part: str) -> dict:
+    """讀取 part 的 .rels，回傳 {rId: (type, 絕對 part 名稱)}。"""
+    root = _fromstring(archive.read(_rels_path(part)))
+    folder = posixpath.dirname(part)
+    rels = {}
+    for rel in root.iter(f"{_PKG}Relationship"):
+        if rel.get("TargetMode") == "External":
+            continue
+        target = rel.get("Target") or ""
+        resolved = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join(folder, target))
+        rels[rel.get("Id")] = (rel.get("Type"), resolved)
+    return rels
+
+
+def _main_part(archive: zipfile.ZipFile) -> str:
+    for rel_type, target in _relationships(archive, "").values():
+        if rel_type == _OFFICE_DOCUMENT:
+            return target
+    # Strict OOXML 的 relationship type 不同，交給函式庫處理
+    raise OOXMLUnsupported("找不到 officeDocument 關聯")
+
+
+def _require_namespace(tag: str, namespace: str) -> None:
+    if not tag.startswith(namespace):
+        raise OOXMLUnsupported(f"非預期的根元素：{tag}")
+
+
+# ===== PPTX =====
+
+def _paragraph_text(paragraph) -> str:
+    # 同 python-pptx：a:r / a:fld 取 a:t，a:br 以 \v 表示
+    parts = []
+    for child in paragraph:
+        tag = child.tag
+        if tag == f"{_A}r" or tag == f"{_A}fld":
+            node = child.find(f"{_A}t")
+            if node is not None and node.text:
+                parts.append(node.text)
+        elif tag == f"{_A}br":
+            parts.append("\v")
+    return "".join(parts)
+
+
+def slide_shape_texts(xml: bytes) -> List[str]:
+    """
+    一張投影片中各個文字框（spTree 下一層的 p:sp）的文字，strip 後去掉空白者。
+    與 python-pptx 的 `shape.text` 相同：表格、群組、圖片不含文字。
+    """
+    root = _fromstring(xml)
+    _require_namespace(root.tag, _P)
+    tree = root.find(f"{_P}cSld/{_P}spTree")
+    texts: List[str] = []
+    if tree is None:
+        return texts
+    for shape in tree:
+        if shape.tag != f"{_P}sp":
+            continue
+        body = shape.find(f"{_P}txBody")
+        if body is None:
+            continue
+        text = "\n".join(_paragraph_text(p) for p in body.findall(f"{_A}p")).strip()
+        if text:
+            texts.append(text)
+    return texts
+
+
+def _slide_parts(archive: zipfile.ZipFile, presentation: str) -> List[str]:
+    """依 presentation.xml 的 sldIdLst 順序（即播放順序，不一定是檔名順序）列出投影片 part。"""
+    root = _fromstring(archive.read(presentation))
+    _require_namespace(root.tag, _P)
+    rels = _relationships(archive, presentation)
+    parts = []
+    id_list = root.find(f"{_P}sldIdLst")
+    for slide_id in id_list if id_list is not None else ():
+        rel = rels.get(slide_id.get(f"{_R}id"))
+        if rel is None:
+            raise OOXMLUnsupported("投影片關聯不完整")
+        parts.append(rel[1])
+    return parts
+
+
+def pptx_slide_texts(path: str, workers: Optional[int] = None) -> List[List[str]]:
+    """每張投影片的文字框清單；投影片多時以執行緒平行解壓與解析。"""
+    workers = OOXML_WORKERS if workers is None else workers
+    with zipfile.ZipFile(path) as archive:
+        parts = _slide_parts(archive, _main_part(archive))
+
+        def _read(part: str) -> List[str]:
+            return slide_shape_texts(archive.read(part))
+
+        if workers <= 1 or len(parts) < PARALLEL_MIN_SLIDES:
+            return [_read(part) for part in parts]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(_read, parts))
+
+
+# ===== DOCX =====
+
+def _run_text(run) -> str:
+    # 同 python-docx 的 Run.text：w:t、w:tab / w:ptab → \t、w:br（換行型）/ w:cr → \n、w:noBreakHyphen → -
+    parts = []
+    for child in run:
+        tag = child.tag
+        if tag == f"{_W}t":
+            parts.append(child.text or "")
+        elif tag == f"{_W}tab" or tag == f"{_W}ptab":
+            parts.append("\t")
+        elif tag == f"{_W}br":
+            if child.get(f"{_W}type", "textWrapping") == "textWrapping":
+                parts.append("\n")
+        elif tag == f"{_W}cr":
+            parts.append("\n")
+        elif tag == f"{_W}noBreakHyphen":
+            parts.append("-")
+    return "".join(parts)
+
+
+def _docx_paragraph_text(paragraph) -> str:
+    parts = []
+    for child in paragraph:
+        if child.tag == f"{_W}r":
+            parts.append(_run_text(child))
+        elif child.tag == f"{_W}hyperlink":
+            parts.extend(_run_text(run) for run in child.findall(f"{_W}r"))
+    return "".join(parts)
+
+
+def iter_docx_paragraphs(path: str) -> Iterator[str]:
+    """
+    以 iterparse 逐段讀出 w:body 下一層段落的文字（同 python-docx 的 doc.paragraphs，不含表格內段落），
+    每段處理完即清掉元素，記憶體不隨文件長度成長。
+    """
+    with zipfile.ZipFile(path) as archive:
+        document = _main_part(archive)
+        with archive.open(document) as stream:
+            depth = 0
+            body_depth = None
+            for event, element in _iterparse(stream, ("start", "end")):
+                if event == "start":
+                    depth += 1
+                    if depth == 1:
+                        _require_namespace(element.tag, _W)
+                    elif depth == 2 and element.tag == f"{_W}body":
+                        body_depth = depth
+                    continue
+                if body_depth is not None and depth == body_depth + 1:
+                    if element.tag == f"{_W}p":
+                        yield _docx_paragraph_text(element)
+                    element.clear()
+                depth -= 1
+
+
+def with_fallback(fast: Callable[[], object], slow: Callable[[], object], fmt: str):
+    """先走快速路徑，結構不支援或解析失敗時改用函式庫的物件模型。"""
+    if OOXML_FAST_PATH:
+        try:
+            result = fast()
+        except Exception:  # pylint: disable=broad-except
+            OOXML_EXTRACTIONS.labels(format=fmt, path="fallback").inc()
+        else:
+            OOXML_EXTRACTIONS.labels(format=fmt, path="fast").inc()
+            return result
+    return slow()
+
+
+# ===== 函式庫路徑（fallback）與對外介面 =====
+
+def _pptx_slide_texts_library(path: str) -> List[List[str]]:
+    from pptx import Presentation
+
+    slides = []
+    for slide in Presentation(path).slides:
+        texts = []
+        for shape in slide.shapes:
+            if hasattr(shape, "text"):
+                text = (shape.text or "").strip()
+                if text:
+                    texts.append(text)
+        slides.append(texts)
+    return slides
+
+
+def _docx_paragraphs_library(path: str) -> List[str]:
+    from docx import Document
+
+    return [para.text for para in Document(path).paragraphs]
+
+
+def extract_pptx_slides(path: str) -> List[List[str]]:
+    """每張投影片非空白文字框的文字（已 strip），依播放順序。"""
+    return with_fallback(lambda: pptx_slide_texts(path), lambda: _pptx_slide_texts_library(path), "pptx")
+
+
+def extract_docx_paragraphs(path: str) -> List[str]:
+    """本文各段落的原始文字（未 strip，可能為空字串），依文件順序。"""
+    # 快速路徑先完整讀完再回傳，解析到一半失敗時才能整份改走 fallback
+    return with_fallback(lambda: list(iter_docx_paragraphs(path)), lambda: _docx_paragraphs_library(path), "docx")
@@ -1,30 +1,9 @@
 from typing import Tuple, List
-from pptx import Presentation
-from backend.app.models.schemas import Paragraph
+from backend.app.models.document import TextSpan, join_spans
 from backend.app.utils.text_clean import normalize_text
+from .ooxml import extract_pptx_slides
 
-def parse_pptx(path: str) -> Tuple[str, List[Paragraph]]:
-    prs = Presentation(path)
-    items = []
-    for slide in prs.slides:
-        texts = []
-        for shape in slide.shapes:
-            if hasattr(shape, "text"):
-                t = (shape.text or "").strip()
-                if t:
-                    texts.append(t)
-        if texts:
-            items.append("\n".join(texts))
-    full_text = normalize_text("\n\n".join(items))
-
-    paragraphs: List[Paragraph] = []
-    cursor = 0
-    for i, t in enumerate(items):
-        t_norm = normalize_text(t)
-        start = full_text.find(t_norm, cursor)
-        if start < 0:
-            start = full_text.find(t_norm)
-        end = start + len(t_norm) if start >= 0 else cursor
-        paragraphs.append(Paragraph(index=i, text=t_norm, start_char=max(0,start), end_char=max(end,start)))
-        cursor = end
-    return full_text, paragraphs
+def parse_pptx(path: str) -> Tuple[str, List[TextSpan]]:
+    # 每張有文字的投影片為一段；空白投影片不產生段落
+    items = ["\n".join(texts) for texts in extract_pptx_slides(path) if texts]
+    return join_spans((normalize_text(t) for t in items), "\n\n")
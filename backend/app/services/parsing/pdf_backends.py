@@ -0,0 +1,171 @@
+"""Pluggable PDF text extraction engines behind a single `extract_pdf_pages` interface."""
+
+from __future__ import annotations
+
+import importlib.util
+import logging
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List, Optional
+
+from backend.app.core.config import PDF_BACKEND, PDF_BACKEND_PREFERENCE
+from backend.app.core.metrics import PDF_EXTRACTIONS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = "pypdf"
+AUTO = "auto"
+
+
+@dataclass(frozen=True)
+class PdfBackend:
+    name: str
+    # 檢查是否安裝用的頂層模組（不 import，避免拖慢冷啟動）
+    module: str
+    # 逐頁產生原始文字（未 normalize）；單頁失敗時產生空字串，無法開檔時丟出例外
+    pages: Callable[[str], Iterator[str]]
+    page_count: Callable[[str], int]
+
+    def available(self) -> bool:
+        return importlib.util.find_spec(self.module) is not None
+
+
+# ===== pypdf =====
+
+def _pypdf_pages(path: str) -> Iterator[str]:
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    for page in reader.pages:
+        try:
+            yield page.extract_text() or ""
+        except Exception:  # pylint: disable=broad-except
+            yield ""  # 有些頁可能取不出來
+
+
+def _pypdf_page_count(path: str) -> int:
+    from pypdf import PdfReader
+
+    return len(PdfReader(path).pages)
+
+
+# ===== pypdfium2 =====
+
+# PDFium 不是 thread-safe（即使是不同文件也一樣），同一行程內的呼叫必須序列化
+_PDFIUM_LOCK = threading.Lock()
+
+
+def _pdfium_pages(path: str) -> Iterator[str]:
+    import pypdfium2 as pdfium
+
+    # 在鎖內一次抽完再逐頁產生，避免呼叫端消化頁面時佔住鎖
+    texts: List[str] = []
+    with _PDFIUM_LOCK:
+        document = pdfium.PdfDocument(path)
+        try:
+            for index in range(len(document)):
+                page = document[index]
+                try:
+                    textpage = page.get_textpage()
+                    try:
+                        texts.append(textpage.get_text_range() or "")
+                    finally:
+                        textpage.close()
+                except Exception:  # pylint: disable=broad-except
+                    texts.append("")
+                finally:
+                    page.close()
+        finally:
+            document.close()
+    yield from texts
+
+
+def _pdfium_page_count(path: str) -> int:
+    import pypdfium2 as pdfium
+
+    with _PDFIUM_LOCK:
+        document = pdfium.PdfDocument(path)
+        try:
+            return len(document)
+        finally:
+            document.close()
+
+
+# ===== pdfminer.six =====
+
+def _pdfminer_pages(path: str) -> Iterator[str]:
+    from pdfminer.converter import PDFPageAggregator
+    from pdfminer.layout import LAParams, LTTextContainer
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.pdfpage import PDFPage
+
+    # 不用 extract_pages：它是 generator，某頁丟出例外後整份文件就中止了
+    with open(path, "rb") as handle:
+        manager = PDFResourceManager()
+        device = PDFPageAggregator(manager, laparams=LAParams())
+        interpreter = PDFPageInterpreter(manager, device)
+        for page in PDFPage.get_pages(handle):
+            try:
+                interpreter.process_page(page)
+                layout = device.get_result()
+                text = "".join(element.get_text() for element in layout if isinstance(element, LTTextContainer))
+            except Exception:  # pylint: disable=broad-except
+                text = ""  # 有些頁可能取不出來
+            yield text
+
+
+def _pdfminer_page_count(path: str) -> int:
+    from pdfminer.pdfpage import PDFPage
+
+    with open(path, "rb") as handle:
+        return sum(1 for _ in PDFPage.get_pages(handle))
+
+
+BACKENDS: Dict[str, PdfBackend] = {
+    backend.name: backend
+    for backend in (
+        PdfBackend("pypdf", "pypdf", _pypdf_pages, _pypdf_page_count),
+        PdfBackend("pypdfium2", "pypdfium2", _pdfium_pages, _pdfium_page_count),
+        PdfBackend("pdfminer", "pdfminer", _pdfminer_pages, _pdfminer_page_count),
+    )
+}
+
+
+def available_backends() -> List[str]:
+    return [name for name, backend in BACKENDS.items() if backend.available()]
+
+
+@lru_cache(maxsize=None)
+def resolve_backend(name: Optional[str] = None) -> PdfBackend:
+    """
+    依名稱取得引擎；None 表示使用 PDF_BACKEND。
+    auto 依 PDF_BACKEND_PREFERENCE 取第一個已安裝的引擎；指定的引擎不存在或未安裝時退回 pypdf。
+    """
+    name = (name or PDF_BACKEND).strip().lower()
+    if name == AUTO:
+        for candidate in PDF_BACKEND_PREFERENCE:
+            backend = BACKENDS.get(candidate)
+            if backend is not None and backend.available():
+                return backend
+        return BACKENDS[DEFAULT_BACKEND]
+    backend = BACKENDS.get(name)
+    if backend is None:
+        # 設定錯誤不應讓上傳的文件被當成無效輸入
+        logger.warning("未知的 PDF 引擎 %s（可用：%s, %s），改用 %s", name, ", ".join(BACKENDS), AUTO, DEFAULT_BACKEND)
+        return BACKENDS[DEFAULT_BACKEND]
+    if not backend.available() and name != DEFAULT_BACKEND:
+        logger.warning("PDF 引擎 %s 未安裝，改用 %s", name, DEFAULT_BACKEND)
+        return BACKENDS[DEFAULT_BACKEND]
+    return backend
+
+
+def extract_pdf_pages(path: str, backend: Optional[str] = None) -> Iterator[str]:
+    """逐頁產生 PDF 的原始文字（未 normalize），頁數與文件相同；取不出文字的頁面為空字串。"""
+    engine = resolve_backend(backend)
+    PDF_EXTRACTIONS.labels(backend=engine.name).inc()
+    return engine.pages(path)
+
+
+def pdf_page_count(path: str, backend: Optional[str] = None) -> int:
+    return resolve_backend(backend).page_count(path)
@@ -0,0 +1 @@
+__all__ = []
\ No newline at end of file
@@ -0,0 +1,199 @@
+"""Task queue backends: in-memory, SQLite (single host) and Redis-compatible (multi node)."""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Optional
+
+from backend.app.core.config import TASK_QUEUE_BACKEND, TASK_QUEUE_URL
+
+
+class TaskQueue:
+    """
+    最小佇列介面：具名 FIFO 的 push / pop。
+    工作與回覆都走同一組原語，回覆佇列名稱由發送端決定（reply_to）。
+    方法皆為同步，async 端以 asyncio.to_thread 呼叫。
+    """
+
+    def push(self, name: str, message: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def pop(self, name: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """取出最舊的一筆；timeout 秒內沒有資料回傳 None。"""
+        raise NotImplementedError
+
+    def size(self, name: str) -> int:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class InMemoryTaskQueue(TaskQueue):
+    """同一行程內的佇列（測試或單機 in-process worker 使用）。"""
+
+    def __init__(self):
+        self._queues: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self._cond = threading.Condition()
+
+    def push(self, name: str, message: Dict[str, Any]) -> None:
+        with self._cond:
+            self._queues[name].append(message)
+            self._cond.notify_all()
+
+    def pop(self, name: str, timeout: float) -> Optional[Dict[str, Any]]:
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while not self._queues[name]:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            return self._queues[name].popleft()
+
+    def size(self, name: str) -> int:
+        with self._cond:
+            return len(self._queues[name])
+
+
+class SQLiteTaskQueue(TaskQueue):
+    """以 SQLite 檔案作為同一台主機上多個行程共用的佇列。"""
+
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS task_queue ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, payload TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS task_queue_name ON task_queue (name, id)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def push(self, name: str, message: Dict[str, Any]) -> None:
+        self._conn().execute(
+            "INSERT INTO task_queue (name, payload) VALUES (?, ?)",
+            (name, json.dumps(message, ensure_ascii=False)),
+        )
+
+    def _try_pop(self, name: str) -> Optional[Dict[str, Any]]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id, payload FROM task_queue WHERE name = ? ORDER BY id LIMIT 1",
+                (name,),
+            ).fetchone()
+            if row is not None:
+                conn.execute("DELETE FROM task_queue WHERE id = ?", (row[0],))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return json.loads(row[1]) if row is not None else None
+
+    def pop(self, name: str, timeout: float) -> Optional[Dict[str, Any]]:
+        deadline = time.monotonic() + timeout
+        while True:
+            message = self._try_pop(name)
+            if message is not None:
+                return message
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(self.POLL_INTERVAL)
+
+    def size(self, name: str) -> int:
+        (count,) = self._conn().execute("SELECT COUNT(*) FROM task_queue WHERE name = ?", (name,)).fetchone()
+        return count
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class RedisTaskQueue(TaskQueue):
+    """
+    Redis 相容佇列（LPUSH / BRPOP）。可傳入任何實作同名方法的 client，
+    例如 redis.Redis、fakeredis.FakeRedis 或其他相容服務（KeyDB、Valkey）。
+    """
+
+    def __init__(self, client: Any = None, url: Optional[str] = None, prefix: str = "autonote:"):
+        if client is None:
+            try:
+                import redis  # type: ignore
+            except ImportError as exc:  # pragma: no cover - optional dependency
+                raise RuntimeError("TASK_QUEUE_BACKEND=redis 需要安裝 redis 套件（pip install redis）。") from exc
+            client = redis.Redis.from_url(url or "redis://localhost:6379/0")
+        self._client = client
+        self._prefix = prefix
+
+    def _key(self, name: str) -> str:
+        return f"{self._prefix}{name}"
+
+    def push(self, name: str, message: Dict[str, Any]) -> None:
+        self._client.lpush(self._key(name), json.dumps(message, ensure_ascii=False))
+
+    def pop(self, name: str, timeout: float) -> Optional[Dict[str, Any]]:
+        # BRPOP 的 timeout 以整數秒計；0 代表永久等待，因此至少給 1 秒
+        item = self._client.brpop([self._key(name)], timeout=max(1, int(round(timeout))))
+        if item is None:
+            return None
+        _, raw = item
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8")
+        return json.loads(raw)
+
+    def size(self, name: str) -> int:
+        return int(self._client.llen(self._key(name)))
+
+    def close(self) -> None:
+        close = getattr(self._client, "close", None)
+        if callable(close):
+            close()
+
+
+_queue: Optional[TaskQueue] = None
+_queue_lock = threading.Lock()
+
+
+def create_task_queue(backend: str = TASK_QUEUE_BACKEND, url: str = TASK_QUEUE_URL) -> TaskQueue:
+    if backend == "memory":
+        return InMemoryTaskQueue()
+    if backend == "sqlite":
+        return SQLiteTaskQueue(url)
+    if backend == "redis":
+        return RedisTaskQueue(url=url if url.startswith(("redis://", "rediss://", "unix://")) else None)
+    raise ValueError(f"不支援的 TASK_QUEUE_BACKEND: {backend}")
+
+
+def remote_execution_enabled() -> bool:
+    return TASK_QUEUE_BACKEND != "local"
+
+
+def get_task_queue() -> TaskQueue:
+    """依 TASK_QUEUE_BACKEND 建立行程內共用的佇列實例。"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = create_task_queue()
+        return _queue
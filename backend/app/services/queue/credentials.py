@@ -0,0 +1,54 @@
+"""Seal user LLM API keys before they are put on a task queue."""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import os
+from functools import lru_cache
+
+from backend.app.core.config import TASK_QUEUE_BACKEND, TASK_QUEUE_SECRET, TASK_RESULT_TIMEOUT
+
+
+class CredentialError(RuntimeError):
+    """佇列訊息中的 API key 無法解密（密鑰不符）或已超過有效期。"""
+
+
+@lru_cache(maxsize=1)
+def _fernet():
+    if TASK_QUEUE_SECRET:
+        secret = TASK_QUEUE_SECRET.encode("utf-8")
+    elif TASK_QUEUE_BACKEND == "memory":
+        # worker 與發送端在同一個行程，用行程內隨機密鑰即可
+        secret = os.urandom(32)
+    else:
+        return None
+    from cryptography.fernet import Fernet
+
+    # 任意字串都可當作密鑰：以 SHA-256 導出 Fernet 需要的 32 bytes
+    return Fernet(base64.urlsafe_b64encode(hashlib.sha256(secret).digest()))
+
+
+def credentials_transportable() -> bool:
+    """目前的佇列後端能否安全地把 API key 交給 worker。"""
+    return TASK_QUEUE_BACKEND == "memory" or bool(TASK_QUEUE_SECRET)
+
+
+def seal_api_key(api_key: str) -> str:
+    fernet = _fernet()
+    if fernet is None:
+        raise CredentialError("未設定 TASK_QUEUE_SECRET，不能把 API key 放進共用佇列")
+    return fernet.encrypt(api_key.encode("utf-8")).decode("ascii")
+
+
+def open_api_key(token: str, ttl: float = TASK_RESULT_TIMEOUT) -> str:
+    from cryptography.fernet import InvalidToken
+
+    fernet = _fernet()
+    if fernet is None:
+        raise CredentialError("worker 未設定 TASK_QUEUE_SECRET，無法解開 API key")
+    try:
+        # 超過結果等待時間的訊息，發送端早已放棄，不再使用其中的金鑰
+        return fernet.decrypt(token.encode("ascii"), ttl=max(1, int(ttl))).decode("utf-8")
+    except InvalidToken as exc:
+        raise CredentialError("API key 無法解密或已過期") from exc
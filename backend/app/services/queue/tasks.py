@@ -0,0 +1,227 @@
+"""Remote task protocol: request-side executor and the `python -m backend worker` loop."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from dataclasses import asdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from backend.app.core.config import TASK_RESULT_TIMEOUT, TASK_WORKER_CONCURRENCY
+from backend.app.core.metrics import QUEUE_DEPTH
+from backend.app.core.usage import current_usage, process_origin, track_usage
+from backend.app.models.document import TextSpan
+from backend.app.models.schemas import LLMSettings, Paragraph
+from backend.app.services.analyze.page_classifier import ClassifiedPage
+from backend.app.services.analyze.page_features import compute_page_features
+from backend.app.services.analyze.summary_engine import PageSummaryResult, SummaryEngine
+from backend.app.services.nlp.keyword_extractor import extract_keywords_by_paragraph
+from backend.app.services.queue.backends import TaskQueue, get_task_queue, remote_execution_enabled
+from backend.app.services.queue.credentials import open_api_key, seal_api_key
+
+logger = logging.getLogger(__name__)
+
+TASK_QUEUE_NAME = "tasks"
+POP_TIMEOUT = 1.0
+
+if remote_execution_enabled():
+    QUEUE_DEPTH.labels(queue="tasks").set_function(lambda: get_task_queue().size(TASK_QUEUE_NAME))
+
+
+class RemoteTaskError(RuntimeError):
+    """worker 執行工作失敗時，於發送端重新拋出。"""
+
+
+class RemoteExecutor:
+    """
+    發送端：把工作推進共用佇列，並在專屬回覆佇列收集結果。
+    單一 collector task 依工作 id 分派回覆給對應的 Future。
+    """
+
+    def __init__(self, queue: Optional[TaskQueue] = None, timeout: float = TASK_RESULT_TIMEOUT):
+        self._queue = queue or get_task_queue()
+        self._timeout = timeout
+        self._reply_to = f"replies:{uuid.uuid4().hex}"
+        self._futures: Dict[str, asyncio.Future] = {}
+        self._collector: Optional[asyncio.Task] = None
+
+    async def call(self, kind: str, payload: Dict[str, Any]) -> Any:
+        task_id = uuid.uuid4().hex
+        future = asyncio.get_running_loop().create_future()
+        self._futures[task_id] = future
+        try:
+            await asyncio.to_thread(
+                self._queue.push,
+                TASK_QUEUE_NAME,
+                {"id": task_id, "kind": kind, "reply_to": self._reply_to, "payload": payload},
+            )
+            self._ensure_collector()
+            return await asyncio.wait_for(future, self._timeout)
+        finally:
+            self._futures.pop(task_id, None)
+
+    def _ensure_collector(self) -> None:
+        if self._collector is None or self._collector.done():
+            self._collector = asyncio.create_task(self._collect())
+
+    async def _collect(self) -> None:
+        while self._futures:
+            message = await asyncio.to_thread(self._queue.pop, self._reply_to, POP_TIMEOUT)
+            if message is None:
+                continue
+            future = self._futures.get(message.get("id"))
+            if future is None or future.done():
+                continue
+            if message.get("ok"):
+                future.set_result(message.get("result"))
+            else:
+                future.set_exception(RemoteTaskError(message.get("error") or "remote task failed"))
+
+
+# ===== 序列化 =====
+
+def _settings_payload(settings: LLMSettings) -> Dict[str, Any]:
+    # API key 不以明文進佇列（sqlite 檔、redis 都會落地）
+    payload = settings.model_dump(exclude={"api_key"})
+    payload["api_key_token"] = seal_api_key(settings.api_key)
+    return payload
+
+
+def _settings_from_payload(payload: Dict[str, Any]) -> LLMSettings:
+    data = dict(payload)
+    data["api_key"] = open_api_key(data.pop("api_key_token"))
+    return LLMSettings(**data)
+
+
+def _page_payload(page: ClassifiedPage) -> Dict[str, Any]:
+    return {
+        "page_number": page.page_number,
+        "text": page.text,
+        "classification": page.classification,
+        "skip_reason": page.skip_reason,
+    }
+
+
+def _page_from_payload(data: Dict[str, Any]) -> ClassifiedPage:
+    return ClassifiedPage(
+        page_number=data["page_number"],
+        text=data["text"],
+        classification=data["classification"],
+        skip_reason=data.get("skip_reason"),
+        features=compute_page_features(data["text"]),
+    )
+
+
+# ===== 發送端 helper =====
+
+def remote_page_runner(
+    executor: RemoteExecutor,
+    settings: LLMSettings,
+) -> Callable[[ClassifiedPage], Awaitable[PageSummaryResult]]:
+    """給 SummaryEngine 使用的 page_runner：把單頁摘要交給 worker。"""
+    settings_payload = _settings_payload(settings)
+
+    async def _run(page: ClassifiedPage) -> PageSummaryResult:
+        result = await executor.call(
+            "summarize_page",
+            {"settings": settings_payload, "page": _page_payload(page)},
+        )
+        # worker 端的 token 用量隨回覆帶回，記入本請求的帳本
+        usage = result.pop("usage", None)
+        tracker = current_usage()
+        if usage and tracker is not None:
+            tracker.merge(usage)
+        return PageSummaryResult(**result)
+
+    return _run
+
+
+async def extract_keywords_remote(
+    executor: RemoteExecutor,
+    paragraphs: Sequence[Union[Paragraph, TextSpan]],
+    lang: str,
+) -> List[Dict]:
+    payload = [
+        {"index": p.index, "text": p.text, "start_char": p.start_char, "end_char": p.end_char} for p in paragraphs
+    ]
+    return await executor.call("extract_keywords", {"paragraphs": payload, "lang": lang})
+
+
+# ===== worker 端 =====
+
+class _EngineCache:
+    """同一組 LLM 設定共用一個 SummaryEngine（連線池），避免每頁重建 client。"""
+
+    def __init__(self, limit: int = 32):
+        self._limit = limit
+        self._engines: Dict[Tuple, SummaryEngine] = {}
+
+    def get(self, settings: LLMSettings) -> SummaryEngine:
+        key = (settings.api_key, settings.base_url, settings.model, settings.fast_model, settings.escalate)
+        engine = self._engines.get(key)
+        if engine is None:
+            if len(self._engines) >= self._limit:
+                self._engines.pop(next(iter(self._engines)))
+            engine = SummaryEngine(settings=settings, concurrency=1)
+            self._engines[key] = engine
+        return engine
+
+
+async def _handle_summarize_page(payload: Dict[str, Any], engines: _EngineCache) -> Dict[str, Any]:
+    engine = engines.get(_settings_from_payload(payload["settings"]))
+    with track_usage() as usage:
+        result = await engine.summarize_page(_page_from_payload(payload["page"]))
+    return {**asdict(result), "usage": {**usage.as_dict(), "origin": process_origin()}}
+
+
+async def _handle_extract_keywords(payload: Dict[str, Any], _: _EngineCache) -> List[Dict]:
+    paragraphs = [Paragraph(**item) for item in payload["paragraphs"]]
+    # jieba 斷詞是 CPU 工作，丟到 thread 以免卡住同一 worker 上的 LLM 呼叫
+    return await asyncio.to_thread(extract_keywords_by_paragraph, paragraphs, payload["lang"])
+
+
+TASK_HANDLERS: Dict[str, Callable[[Dict[str, Any], _EngineCache], Awaitable[Any]]] = {
+    "summarize_page": _handle_summarize_page,
+    "extract_keywords": _handle_extract_keywords,
+}
+
+
+async def run_worker(
+    queue: Optional[TaskQueue] = None,
+    concurrency: int = TASK_WORKER_CONCURRENCY,
+    stop_event: Optional[asyncio.Event] = None,
+) -> None:
+    """持續從佇列取工作執行，最多同時處理 concurrency 筆；stop_event 設定後收尾結束。"""
+    queue = queue or get_task_queue()
+    engines = _EngineCache()
+    slots = asyncio.Semaphore(max(1, concurrency))
+    running: set[asyncio.Task] = set()
+
+    async def _process(message: Dict[str, Any]) -> None:
+        reply: Dict[str, Any] = {"id": message.get("id")}
+        try:
+            handler = TASK_HANDLERS.get(message.get("kind", ""))
+            if handler is None:
+                raise ValueError(f"unknown task kind: {message.get('kind')}")
+            reply.update(ok=True, result=await handler(message.get("payload") or {}, engines))
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.exception("task %s failed", message.get("id"))
+            reply.update(ok=False, error=str(exc))
+        finally:
+            slots.release()
+        if message.get("reply_to"):
+            await asyncio.to_thread(queue.push, message["reply_to"], reply)
+
+    while stop_event is None or not stop_event.is_set():
+        await slots.acquire()
+        message = await asyncio.to_thread(queue.pop, TASK_QUEUE_NAME, POP_TIMEOUT)
+        if message is None:
+            slots.release()
+            continue
+        task = asyncio.create_task(_process(message))
+        running.add(task)
+        task.add_done_callback(running.discard)
+
+    if running:
+        await asyncio.gather(*running, return_exceptions=True)
@@ -1,21 +1,96 @@
 import os
+import shutil
+import uuid
+import zipfile
+import zlib
 from datetime import datetime, timezone
+from typing import BinaryIO, Iterable, List, Tuple
 
 from fastapi import UploadFile
 
 from backend.app.core.config import UPLOAD_DIR, STATIC_MOUNT
 
-def save_upload(file: UploadFile) -> str:
+# 上傳與解壓都以 1MB 為單位串流寫入，不把整個檔案讀進記憶體
+COPY_CHUNK = 1024 * 1024
+
+
+class ArchiveError(ValueError):
+    """zip 無法解開、超過檔案數或解壓大小上限。"""
+
+
+# 壓縮檔本身的問題：損毀、加密（RuntimeError）、不支援的壓縮法如 deflate64（NotImplementedError）
+_ARCHIVE_READ_ERRORS = (zipfile.BadZipFile, RuntimeError, NotImplementedError, EOFError, zlib.error)
+
+
+def _upload_path(ext: str) -> str:
     # ✅ 用到時才建
     os.makedirs(UPLOAD_DIR, exist_ok=True)
-
     ts = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S%f")
-    _, ext = os.path.splitext(file.filename)
-    path = os.path.join(UPLOAD_DIR, f"up_{ts}{ext}")
+    # 批次上傳會在同一微秒內存多個檔案，加上隨機後綴避免撞名
+    return os.path.join(UPLOAD_DIR, f"up_{ts}_{uuid.uuid4().hex[:6]}{ext}")
+
+
+def save_stream(source: BinaryIO, filename: str) -> str:
+    _, ext = os.path.splitext(filename)
+    path = _upload_path(ext.lower())
     with open(path, "wb") as f:
-        f.write(file.file.read())
+        shutil.copyfileobj(source, f, COPY_CHUNK)
     return path
 
+def save_upload(file: UploadFile) -> str:
+    return save_stream(file.file, file.filename)
+
+def extract_archive(
+    archive_path: str,
+    extensions: Iterable[str],
+    max_files: int,
+    max_bytes: int,
+) -> List[Tuple[str, str]]:
+    """
+    逐一把 zip 內支援的檔案串流解壓到 UPLOAD_DIR，回傳 [(zip 內名稱, 本機路徑)]。
+    本機檔名一律重新產生（不使用 zip 內路徑，避免 zip slip）；
+    以實際寫入的 bytes 計算大小上限，不信任 zip 標頭。
+    """
+    allowed = {ext.lower() for ext in extensions}
+    extracted: List[Tuple[str, str]] = []
+    written = 0
+    try:
+        with zipfile.ZipFile(archive_path) as archive:
+            for info in archive.infolist():
+                name = info.filename
+                base = os.path.basename(name)
+                if info.is_dir() or not base or base.startswith((".", "~$")) or name.startswith("__MACOSX/"):
+                    continue
+                if os.path.splitext(base)[1].lower() not in allowed:
+                    continue
+                if len(extracted) >= max_files:
+                    raise ArchiveError(f"壓縮檔內的文件超過 {max_files} 個")
+                path = _upload_path(os.path.splitext(base)[1].lower())
+                extracted.append((name, path))
+                with archive.open(info) as source, open(path, "wb") as target:
+                    while True:
+                        chunk = source.read(COPY_CHUNK)
+                        if not chunk:
+                            break
+                        written += len(chunk)
+                        if written > max_bytes:
+                            raise ArchiveError(f"壓縮檔解壓後超過 {max_bytes // (1024 * 1024)}MB 上限")
+                        target.write(chunk)
+    except BaseException as exc:
+        # 不論原因，已解出的檔案都要清掉
+        remove_files(path for _, path in extracted)
+        if isinstance(exc, _ARCHIVE_READ_ERRORS):
+            raise ArchiveError(f"無法解開壓縮檔：{exc}") from exc
+        raise
+    return extracted
+
+def remove_files(paths: Iterable[str]) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
 def make_public_url(abs_path: str) -> str:
     # e.g. storage/wordclouds/xxx.png -> /static/wordclouds/xxx.png
     rel = abs_path.replace("\\", "/").split("storage/")[-1]
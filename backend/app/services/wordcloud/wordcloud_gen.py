@@ -1,21 +1,52 @@
+import asyncio
+import hashlib
+import json
 import os
 import re
-from datetime import datetime
+import threading
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass
 from typing import Dict, List, Optional
 
-import jieba
-from wordcloud import WordCloud
-
-from backend.app.core.config import DEFAULT_EN_FONT, DEFAULT_ZH_FONT, WORDCLOUD_DIR
+from backend.app.core.config import DEFAULT_EN_FONT, WORDCLOUD_DIR, get_default_zh_font
+from backend.app.core.metrics import QUEUE_DEPTH
 
 EN_WORD_RE = re.compile(r"[A-Za-z][A-Za-z\-']{1,}")
 
+WORDCLOUD_WIDTH = 1200
+WORDCLOUD_HEIGHT = 600
+WORDCLOUD_MAX_WORDS = 1000
+WORDCLOUD_WORKERS = int(os.getenv("WORDCLOUD_WORKERS", "1"))
+
+
+@dataclass
+class WordcloudSpec:
+    """渲染文字雲所需的全部輸入；key 由詞頻、尺寸與字型決定。"""
+
+    key: str
+    frequencies: Dict[str, int]
+    font_path: Optional[str]
+    width: int = WORDCLOUD_WIDTH
+    height: int = WORDCLOUD_HEIGHT
+
+    @property
+    def image_path(self) -> str:
+        return os.path.join(WORDCLOUD_DIR, f"wc_{self.key}.png")
+
+    @property
+    def spec_path(self) -> str:
+        return os.path.join(WORDCLOUD_DIR, f"wc_{self.key}.json")
+
 
 def _tokenize_fallback(text: Optional[str], lang: str) -> List[str]:
     if not text:
         return []
     lowered = (lang or "").lower()
     if lowered.startswith("zh"):
+        import jieba
+
         return [token.strip() for token in jieba.cut(text) if token.strip()]
     if lowered.startswith("en"):
         return re.findall(r"[A-Za-z][A-Za-z\-']{1,}", text.lower())
@@ -23,10 +54,21 @@ def _tokenize_fallback(text: Optional[str], lang: str) -> List[str]:
     return [token.strip() for token in tokens if token.strip()]
 
 
-def build_wordcloud(paragraph_keywords: List[Dict], lang: str, fallback_text: Optional[str] = None) -> str:
-    # ✅ 用到時才建
-    os.makedirs(WORDCLOUD_DIR, exist_ok=True)
+def _frequency_key(frequencies: Dict[str, int], width: int, height: int, font_path: Optional[str]) -> str:
+    digest = hashlib.sha256()
+    digest.update(json.dumps(sorted(frequencies.items()), ensure_ascii=False).encode("utf-8"))
+    digest.update(f"|{width}x{height}|{font_path or 'default'}".encode("utf-8"))
+    return digest.hexdigest()[:32]
+
 
+def prepare_wordcloud(
+    paragraph_keywords: List[Dict],
+    lang: str,
+    fallback_text: Optional[str] = None,
+    width: int = WORDCLOUD_WIDTH,
+    height: int = WORDCLOUD_HEIGHT,
+) -> WordcloudSpec:
+    """整理詞頻與字型，回傳可快取的渲染規格；素材不足或缺字型時拋出 RuntimeError。"""
     collected: List[str] = []
     for item in paragraph_keywords:
         keywords = item.get("keywords") if isinstance(item, dict) else None
@@ -51,17 +93,137 @@ def build_wordcloud(paragraph_keywords: List[Dict], lang: str, fallback_text: Op
     if not collected:
         raise RuntimeError("文字內容不足，無法生成文字雲。")
 
-    text = " ".join(collected[:1000])
-
     is_zh = str(lang).lower().startswith("zh")
-    font_path = DEFAULT_ZH_FONT if is_zh else DEFAULT_EN_FONT
+    font_path = get_default_zh_font() if is_zh else DEFAULT_EN_FONT
     if is_zh and (not font_path or not os.path.exists(font_path)):
         raise RuntimeError(
             "找不到中文字型：請將 Noto Sans TC / Noto Sans CJK 放到 assets/fonts/，"
             "或用環境變數 FONT_ZH_PATH 指向字型檔。"
         )
 
-    wc = WordCloud(background_color="white", width=1200, height=600, font_path=font_path or None).generate(text)
-    out = os.path.join(WORDCLOUD_DIR, f"wc_{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}.png")
-    wc.to_file(out)
+    # 直接給詞頻，避免 WordCloud.generate 再把字串重新斷詞一次
+    frequencies = dict(Counter(collected[:WORDCLOUD_MAX_WORDS]))
+    key = _frequency_key(frequencies, width, height, font_path)
+    return WordcloudSpec(key=key, frequencies=frequencies, font_path=font_path, width=width, height=height)
+
+
+def register_wordcloud(spec: WordcloudSpec) -> str:
+    """把渲染規格寫入 storage，供 GET 端點稍後延遲渲染；回傳 key。"""
+    os.makedirs(WORDCLOUD_DIR, exist_ok=True)
+    if not os.path.exists(spec.spec_path):
+        tmp = f"{spec.spec_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as handle:
+            json.dump(asdict(spec), handle, ensure_ascii=False)
+        os.replace(tmp, spec.spec_path)
+    return spec.key
+
+
+def load_wordcloud_spec(key: str) -> Optional[WordcloudSpec]:
+    path = os.path.join(WORDCLOUD_DIR, f"wc_{key}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as handle:
+        return WordcloudSpec(**json.load(handle))
+
+
+# ===== 渲染（在 process pool 內執行）=====
+
+def _init_render_worker(font_path: Optional[str]) -> None:
+    """子行程啟動時先載入 wordcloud/PIL 與字型，之後每次渲染不必再付這些成本。"""
+    from PIL import ImageFont
+    import wordcloud  # noqa: F401
+
+    if font_path and os.path.exists(font_path):
+        ImageFont.truetype(font_path, 32)
+
+
+def _render_to_file(frequencies: Dict[str, int], font_path: Optional[str], width: int, height: int, out: str) -> str:
+    from wordcloud import WordCloud
+
+    wc = WordCloud(background_color="white", width=width, height=height, font_path=font_path or None)
+    wc.generate_from_frequencies(frequencies)
+    tmp = f"{out}.{os.getpid()}.tmp.png"
+    wc.to_file(tmp)
+    os.replace(tmp, out)
     return out
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_pending: Dict[str, Future] = {}
+_lock = threading.Lock()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=max(1, WORDCLOUD_WORKERS),
+            initializer=_init_render_worker,
+            initargs=(get_default_zh_font(),),
+        )
+    return _executor
+
+
+def _drop_executor(broken: ProcessPoolExecutor) -> None:
+    """
+    子行程異常結束（OOM、segfault）後整個 pool 無法再用：丟掉它，下次呼叫重建。需持有 _lock。
+    壞掉的 pool 已由其管理執行緒終止子行程並清理，這裡不呼叫 shutdown（可能正在該執行緒的 callback 中）。
+    """
+    global _executor
+    if _executor is broken:
+        _executor = None
+
+
+def pending_wordclouds() -> int:
+    with _lock:
+        return len(_pending)
+
+
+QUEUE_DEPTH.labels(queue="wordcloud").set_function(pending_wordclouds)
+
+
+def submit_wordcloud(spec: WordcloudSpec) -> Future:
+    """快取命中時回傳已完成的 Future；同一 key 渲染中則共用同一個 Future。"""
+    if os.path.exists(spec.image_path):
+        done: Future = Future()
+        done.set_result(spec.image_path)
+        return done
+
+    os.makedirs(WORDCLOUD_DIR, exist_ok=True)
+    with _lock:
+        pending = _pending.get(spec.key)
+        if pending is not None:
+            return pending
+        args = (spec.frequencies, spec.font_path, spec.width, spec.height, spec.image_path)
+        executor = _get_executor()
+        try:
+            future = executor.submit(_render_to_file, *args)
+        except BrokenProcessPool:
+            # 先前的渲染弄壞了 pool：換一個新的 pool 重試一次
+            _drop_executor(executor)
+            executor = _get_executor()
+            future = executor.submit(_render_to_file, *args)
+        _pending[spec.key] = future
+
+    def _forget(done: Future, key: str = spec.key, owner: ProcessPoolExecutor = executor) -> None:
+        with _lock:
+            _pending.pop(key, None)
+            if not done.cancelled() and isinstance(done.exception(), BrokenProcessPool):
+                _drop_executor(owner)
+
+    future.add_done_callback(_forget)
+    return future
+
+
+async def render_wordcloud(spec: WordcloudSpec) -> str:
+    return await asyncio.wrap_future(submit_wordcloud(spec))
+
+
+def build_wordcloud(paragraph_keywords: List[Dict], lang: str, fallback_text: Optional[str] = None) -> str:
+    """同步版本：整理詞頻後在本行程渲染（有快取時直接回傳既有圖片）。"""
+    spec = prepare_wordcloud(paragraph_keywords, lang, fallback_text)
+    if os.path.exists(spec.image_path):
+        return spec.image_path
+    # ✅ 用到時才建
+    os.makedirs(WORDCLOUD_DIR, exist_ok=True)
+    return _render_to_file(spec.frequencies, spec.font_path, spec.width, spec.height, spec.image_path)
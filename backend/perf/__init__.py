@@ -0,0 +1 @@
+"""Performance tooling: import-time budget, load generators and benchmarks."""
@@ -0,0 +1,389 @@
+"""
+Micro-benchmarks for the CPU-bound pipeline pieces, with JSON baselines and regression thresholds.
+
+    python -m backend bench --pages 500 --langs zh --save-baseline      # 建立基準
+    python -m backend bench --pages 500 --langs zh                      # 與基準比較，退步時回傳 1
+
+每個 benchmark 先暖身一次，再執行 --repeat 次取中位數。與基準相比，中位數增加超過
+threshold（預設 25%，可在基準檔 `thresholds` 中逐項覆寫）且差距大於 1ms 即視為退步。
+缺少選用套件（pypdf、python-docx、graphviz…）的項目標記為 skipped，不影響其他項目。
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from backend.app.core.config import STORAGE_DIR
+from backend.perf.corpus import FORMATS, LANGS, CorpusSpec, generate_pages, write_document
+from backend.perf.stats import percentile
+
+DEFAULT_THRESHOLD = 0.25
+MIN_REGRESSION_S = 0.001
+# 以專案根目錄為準，不受執行時的工作目錄影響
+BENCH_DIR = os.path.join(STORAGE_DIR, "bench")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+
+class BenchContext:
+    """同一組 (pages, lang) 共用的輸入；解析結果與關鍵字等昂貴前置只算一次。"""
+
+    def __init__(self, spec: CorpusSpec, corpus_dir: str):
+        self.spec = spec
+        self.corpus_dir = corpus_dir
+        self._cache: Dict[str, object] = {}
+
+    def path(self, fmt: str) -> str:
+        return write_document(self.spec, fmt, self.corpus_dir)
+
+    def cached(self, key: str, factory: Callable[[], object]):
+        if key not in self._cache:
+            self._cache[key] = factory()
+        return self._cache[key]
+
+    @property
+    def page_texts(self) -> List[str]:
+        return self.cached("page_texts", lambda: ["\n".join(p) for p in generate_pages(self.spec)])
+
+    @property
+    def joined_text(self) -> str:
+        return self.cached("joined_text", lambda: "\n".join(self.page_texts))
+
+    @property
+    def paragraphs(self):
+        def build():
+            from backend.app.models.schemas import Paragraph
+
+            return [
+                Paragraph(index=i, text=text, start_char=0, end_char=len(text))
+                for i, text in enumerate(self.page_texts)
+            ]
+
+        return self.cached("paragraphs", build)
+
+    @property
+    def paragraph_keywords(self):
+        def build():
+            from backend.app.services.nlp.keyword_extractor import extract_keywords_by_paragraph
+
+            return extract_keywords_by_paragraph(self.paragraphs, self.spec_lang)
+
+        return self.cached("paragraph_keywords", build)
+
+    @property
+    def spec_lang(self) -> str:
+        return "en" if self.spec.lang == "en" else "zh"
+
+
+@dataclass
+class Benchmark:
+    name: str
+    prepare: Callable[[BenchContext], Callable[[], object]]
+
+
+# ===== benchmark 定義 =====
+
+def _parse_pages_bench(fmt: str):
+    def prepare(ctx: BenchContext):
+        from backend.app.services.analyze.page_parser import parse_pages
+
+        path = ctx.path(fmt)
+        return lambda: parse_pages(path, f".{fmt}")
+
+    return prepare
+
+
+def _parse_module_bench(fmt: str):
+    def prepare(ctx: BenchContext):
+        import importlib
+
+        module = importlib.import_module(f"backend.app.services.parsing.parse_{fmt}")
+        parse = getattr(module, f"parse_{fmt}")
+        path = ctx.path(fmt)
+        return lambda: parse(path)
+
+    return prepare
+
+
+_OOXML_EXTRACTORS = {
+    "pptx": ("pptx_slide_texts", "_pptx_slide_texts_library", "pptx"),
+    "docx": ("iter_docx_paragraphs", "_docx_paragraphs_library", "docx"),
+}
+
+
+def _ooxml_bench(fmt: str, variant: str):
+    """快速路徑（zip + iterparse）與函式庫物件模型分開量測，不經過 with_fallback。"""
+
+    def prepare(ctx: BenchContext):
+        import importlib
+
+        from backend.app.services.parsing import ooxml
+
+        fast_name, library_name, module = _OOXML_EXTRACTORS[fmt]
+        # 函式庫路徑需要 python-pptx / python-docx，缺少時標記 skipped
+        importlib.import_module(module)
+        path = ctx.path(fmt)
+        if variant == "fast":
+            extract = getattr(ooxml, fast_name)
+            return lambda: list(extract(path))
+        extract = getattr(ooxml, library_name)
+        return lambda: extract(path)
+
+    return prepare
+
+
+def _page_features(ctx: BenchContext):
+    from backend.app.services.analyze.page_features import compute_page_features
+
+    texts = ctx.page_texts
+    return lambda: [compute_page_features(text) for text in texts]
+
+
+def _classify(ctx: BenchContext):
+    from backend.app.services.analyze.page_classifier import classify_page
+    from backend.app.services.analyze.page_features import compute_page_features
+
+    texts = ctx.page_texts
+    features = [compute_page_features(text) for text in texts]
+    return lambda: [classify_page(i + 1, text, feature) for i, (text, feature) in enumerate(zip(texts, features))]
+
+
+def _local_summary(ctx: BenchContext):
+    from backend.app.services.analyze.page_classifier import classify_page
+    from backend.app.services.analyze.page_features import compute_page_features
+    from backend.app.services.analyze.summary_engine import SummaryEngine
+
+    pages = [classify_page(i + 1, text, compute_page_features(text)) for i, text in enumerate(ctx.page_texts)]
+    engine = SummaryEngine(None, mode="local")
+
+    def run():
+        results = [engine.summarize_page_local(page) for page in pages]
+        return engine.summarize_global_local(results)
+
+    return run
+
+
+def _detect_lang(ctx: BenchContext):
+    from backend.app.services.nlp.language_detect import detect_lang
+
+    text = ctx.joined_text
+    return lambda: detect_lang(text)
+
+
+def _visual_language(ctx: BenchContext):
+    from backend.app.services.nlp.language_detect import detect_lang, determine_visual_language
+
+    text = ctx.joined_text
+    lang = detect_lang(text)
+    return lambda: determine_visual_language(text, lang)
+
+
+def _keywords(ctx: BenchContext):
+    from backend.app.services.nlp.keyword_extractor import extract_keywords_by_paragraph
+
+    paragraphs = ctx.paragraphs
+    lang = ctx.spec_lang
+    extract_keywords_by_paragraph(paragraphs[:1], lang)  # 先載入 jieba 詞典，避免算進第一次
+    return lambda: extract_keywords_by_paragraph(paragraphs, lang)
+
+
+def _wordcloud_prepare(ctx: BenchContext):
+    from backend.app.services.wordcloud.wordcloud_gen import prepare_wordcloud
+
+    keywords = ctx.paragraph_keywords
+    lang = ctx.spec_lang
+    return lambda: prepare_wordcloud(keywords, lang, ctx.joined_text)
+
+
+def _wordcloud_render(ctx: BenchContext):
+    from backend.app.services.wordcloud.wordcloud_gen import _render_to_file, prepare_wordcloud
+
+    spec = prepare_wordcloud(ctx.paragraph_keywords, ctx.spec_lang, ctx.joined_text)
+    out = os.path.join(tempfile.gettempdir(), f"bench_wc_{os.getpid()}.png")
+    # 直接呼叫渲染函式，略過 storage 快取，每次都實際畫圖
+    return lambda: _render_to_file(spec.frequencies, spec.font_path, spec.width, spec.height, out)
+
+
+def _keyword_graph(ctx: BenchContext):
+    from backend.app.services.mindmap.keyword_graph import KeywordGraph
+
+    keywords = ctx.paragraph_keywords
+    return lambda: KeywordGraph(keywords)
+
+
+def _mermaid(ctx: BenchContext):
+    from backend.app.services.mindmap.keyword_graph import KeywordGraph
+    from backend.app.services.mindmap.mindmap_gen import build_mermaid_mindmap
+
+    keywords = ctx.paragraph_keywords
+    return lambda: build_mermaid_mindmap("Benchmark", keywords, keyword_graph=KeywordGraph(keywords))
+
+
+def _graphviz(ctx: BenchContext):
+    import graphviz  # noqa: F401  缺少時標記 skipped
+
+    from backend.app.services.mindmap.keyword_graph import KeywordGraph
+    from backend.app.services.mindmap.mindmap_gen import build_graphviz_mindmap
+
+    keywords = ctx.paragraph_keywords
+    return lambda: build_graphviz_mindmap("Benchmark", keywords, keyword_graph=KeywordGraph(keywords))
+
+
+BENCHMARKS: List[Benchmark] = [
+    *(Benchmark(f"parse_pages.{fmt}", _parse_pages_bench(fmt)) for fmt in FORMATS),
+    *(Benchmark(f"parsing.parse_{fmt}", _parse_module_bench(fmt)) for fmt in FORMATS),
+    *(
+        Benchmark(f"ooxml.{fmt}_{variant}", _ooxml_bench(fmt, variant))
+        for fmt in _OOXML_EXTRACTORS
+        for variant in ("fast", "library")
+    ),
+    Benchmark("page_features", _page_features),
+    Benchmark("classify_page", _classify),
+    Benchmark("summary.local_textrank", _local_summary),
+    Benchmark("detect_lang", _detect_lang),
+    Benchmark("determine_visual_language", _visual_language),
+    Benchmark("extract_keywords_by_paragraph", _keywords),
+    Benchmark("wordcloud.prepare", _wordcloud_prepare),
+    Benchmark("wordcloud.render", _wordcloud_render),
+    Benchmark("mindmap.keyword_graph", _keyword_graph),
+    Benchmark("mindmap.build_mermaid", _mermaid),
+    Benchmark("mindmap.build_graphviz", _graphviz),
+]
+
+
+# ===== 執行與比較 =====
+
+def _time_runs(fn: Callable[[], object], repeat: int) -> List[float]:
+    fn()  # 暖身
+    runs = []
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - started)
+    return runs
+
+
+def run_benchmarks(
+    page_counts: Sequence[int] = (50,),
+    langs: Sequence[str] = LANGS,
+    formats: Sequence[str] = FORMATS,
+    patterns: Sequence[str] = (),
+    repeat: int = 5,
+    corpus_dir: str = os.path.join(BENCH_DIR, "corpus"),
+    log: Callable[[str], None] = print,
+) -> Dict[str, Dict]:
+    results: Dict[str, Dict] = {}
+    for pages in page_counts:
+        for lang in langs:
+            ctx = BenchContext(CorpusSpec(pages=pages, lang=lang), corpus_dir)
+            for bench in BENCHMARKS:
+                fmt = bench.name.rsplit(".", 1)[-1].replace("parse_", "")
+                if bench.name.startswith("pars") and fmt not in formats:
+                    continue
+                key = f"{bench.name}[{lang},{pages}p]"
+                if patterns and not any(fnmatch.fnmatch(key, pattern) for pattern in patterns):
+                    continue
+                try:
+                    runs = _time_runs(bench.prepare(ctx), repeat)
+                except ImportError as exc:
+                    results[key] = {"skipped": f"missing dependency: {exc.name or exc}"}
+                    log(f"  {key:<55} skipped ({results[key]['skipped']})")
+                    continue
+                except Exception as exc:  # pylint: disable=broad-except
+                    results[key] = {"skipped": f"{type(exc).__name__}: {exc}"}
+                    log(f"  {key:<55} failed  ({results[key]['skipped']})")
+                    continue
+                ordered = sorted(runs)
+                results[key] = {
+                    "median_s": ordered[len(ordered) // 2],
+                    "min_s": ordered[0],
+                    "p95_s": percentile(ordered, 95),
+                    "runs": len(runs),
+                }
+                log(f"  {key:<55} {results[key]['median_s'] * 1000:10.2f} ms")
+    return results
+
+
+def load_baseline(path: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def save_baseline(path: str, results: Dict[str, Dict], previous: Optional[Dict] = None) -> None:
+    payload = {
+        "version": 1,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "default_threshold": (previous or {}).get("default_threshold", DEFAULT_THRESHOLD),
+        "thresholds": (previous or {}).get("thresholds", {}),
+        "results": {key: value for key, value in results.items() if "median_s" in value},
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as handle:
+        json.dump(payload, handle, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def compare(results: Dict[str, Dict], baseline: Dict, threshold: Optional[float] = None) -> List[str]:
+    """回傳退步項目的說明；threshold 未指定時使用基準檔設定。"""
+    default = threshold if threshold is not None else baseline.get("default_threshold", DEFAULT_THRESHOLD)
+    overrides = baseline.get("thresholds", {})
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get("results", {}).get(key)
+        if not base or "median_s" not in current:
+            continue
+        name = key.split("[", 1)[0]
+        limit = overrides.get(key, overrides.get(name, default))
+        delta = current["median_s"] - base["median_s"]
+        if delta > MIN_REGRESSION_S and current["median_s"] > base["median_s"] * (1 + limit):
+            regressions.append(
+                f"{key}: {base['median_s'] * 1000:.2f} ms -> {current['median_s'] * 1000:.2f} ms "
+                f"(+{delta / base['median_s'] * 100:.0f}%, limit {limit * 100:.0f}%)"
+            )
+    return regressions
+
+
+def main(
+    page_counts: Iterable[int],
+    langs: Iterable[str],
+    formats: Iterable[str],
+    patterns: Iterable[str],
+    repeat: int,
+    baseline_path: str = DEFAULT_BASELINE,
+    write_baseline: bool = False,
+    threshold: Optional[float] = None,
+    json_path: Optional[str] = None,
+) -> int:
+    results = run_benchmarks(list(page_counts), list(langs), list(formats), list(patterns), repeat)
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, ensure_ascii=False, indent=2, sort_keys=True)
+
+    baseline = load_baseline(baseline_path)
+    if write_baseline:
+        merged = dict((baseline or {}).get("results", {}))
+        merged.update(results)
+        save_baseline(baseline_path, merged, baseline)
+        print(f"[bench] baseline written to {baseline_path}")
+        return 0
+    if baseline is None:
+        print(f"[bench] no baseline at {baseline_path}; run with --save-baseline to create one")
+        return 0
+    regressions = compare(results, baseline, threshold)
+    for line in regressions:
+        print(f"[regression] {line}")
+    if not regressions:
+        print("[bench] no regressions against baseline")
+    return 1 if regressions else 0
@@ -0,0 +1,274 @@
+"""
+Synthetic document corpus for benchmarks.
+
+依 seed 產生可重現的 PDF / DOCX / PPTX / MD / TXT，支援 zh / en / mixed 語言與頁數、每頁段落數設定：
+
+    python -m backend corpus --pages 50,500 --langs zh,en,mixed
+
+PDF 直接以 Identity-H 編碼輸出文字並附只含用到字元的 ToUnicode 對照表（CID = Unicode code point），
+不需額外套件，pypdf 抽出的文字與原文一致；DOCX / PPTX 使用 python-docx / python-pptx。
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+FORMATS = ("pdf", "docx", "pptx", "md", "txt")
+LANGS = ("zh", "en", "mixed")
+
+_ZH_TERMS = [
+    "營收", "毛利率", "研發投入", "客戶留存", "供應鏈", "資料平台", "雲端服務", "營運效率",
+    "市場占有率", "產品路線圖", "資安治理", "人才培育", "碳排放", "海外布局", "現金流", "風險控管",
+]
+_ZH_LINKS = ["較去年同期成長", "預計在下季提升", "已連續三季維持", "需要在年底前改善", "主要受惠於", "仍面臨"]
+_EN_TERMS = [
+    "revenue", "gross margin", "research spending", "customer retention", "supply chain", "data platform",
+    "cloud services", "operating efficiency", "market share", "product roadmap", "security governance",
+    "talent development", "carbon emissions", "overseas expansion", "cash flow", "risk control",
+]
+_EN_LINKS = ["grew compared with", "is expected to improve alongside", "remained stable against",
+             "must be reduced before", "benefited from", "is still exposed to"]
+
+
+@dataclass
+class CorpusSpec:
+    pages: int = 20
+    lang: str = "zh"
+    paragraphs_per_page: int = 4
+    sentences_per_paragraph: int = 3
+    seed: int = 0
+
+    @property
+    def stem(self) -> str:
+        return f"synthetic_{self.lang}_{self.pages}p_{self.paragraphs_per_page}x{self.sentences_per_paragraph}_s{self.seed}"
+
+
+def _sentence(rng: random.Random, lang: str) -> str:
+    if lang == "mixed":
+        lang = rng.choice(("zh", "en"))
+    number = f"{rng.randint(2, 98)}%"
+    if lang == "zh":
+        a, b = rng.sample(_ZH_TERMS, 2)
+        return f"{a}{rng.choice(_ZH_LINKS)}{number}，{b}同步調整以支撐下一階段的成長目標。"
+    a, b = rng.sample(_EN_TERMS, 2)
+    return f"The {a} {rng.choice(_EN_LINKS)} {b} by {number} this quarter, according to the internal review."
+
+
+def generate_pages(spec: CorpusSpec) -> List[List[str]]:
+    """回傳每頁的段落清單；第一頁是標題頁，方便覆蓋 cover 判定。"""
+    rng = random.Random(f"{spec.seed}:{spec.lang}")
+    pages: List[List[str]] = []
+    title = "年度營運報告" if spec.lang == "zh" else "Annual Operating Review"
+    pages.append([title, "Confidential" if spec.lang != "zh" else "內部資料"])
+    for _ in range(max(0, spec.pages - 1)):
+        pages.append(
+            [
+                "".join(_sentence(rng, spec.lang) for _ in range(spec.sentences_per_paragraph))
+                if spec.lang == "zh"
+                else " ".join(_sentence(rng, spec.lang) for _ in range(spec.sentences_per_paragraph))
+                for _ in range(spec.paragraphs_per_page)
+            ]
+        )
+    return pages
+
+
+# ===== writers =====
+
+def _write_txt(pages: List[List[str]], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write("\n\n".join("\n\n".join(paragraphs) for paragraphs in pages))
+
+
+def _write_md(pages: List[List[str]], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write(f"# {pages[0][0]}\n\n")
+        for index, paragraphs in enumerate(pages[1:], start=2):
+            handle.write(f"## Section {index}\n\n")
+            handle.write("\n\n".join(paragraphs))
+            handle.write("\n\n")
+
+
+def _write_docx(pages: List[List[str]], path: str) -> None:
+    from docx import Document
+    from docx.enum.text import WD_BREAK
+
+    document = Document()
+    document.add_heading(pages[0][0], level=0)
+    for paragraphs in pages[1:]:
+        for text in paragraphs:
+            document.add_paragraph(text)
+        document.paragraphs[-1].add_run().add_break(WD_BREAK.PAGE)
+    document.save(path)
+
+
+def _write_pptx(pages: List[List[str]], path: str) -> None:
+    from pptx import Presentation
+
+    presentation = Presentation()
+    title_slide = presentation.slides.add_slide(presentation.slide_layouts[0])
+    title_slide.shapes.title.text = pages[0][0]
+    title_slide.placeholders[1].text = pages[0][1]
+    for index, paragraphs in enumerate(pages[1:], start=2):
+        slide = presentation.slides.add_slide(presentation.slide_layouts[1])
+        slide.shapes.title.text = f"Section {index}"
+        body = slide.placeholders[1].text_frame
+        body.text = paragraphs[0]
+        for text in paragraphs[1:]:
+            body.add_paragraph().text = text
+    presentation.save(path)
+
+
+def _wrap(text: str, width: int) -> List[str]:
+    lines: List[str] = []
+    current = ""
+    weight = 0.0
+    for char in text:
+        char_weight = 1.0 if ord(char) > 0x2E80 else 0.5
+        if weight + char_weight > width:
+            lines.append(current)
+            current, weight = "", 0.0
+        current += char
+        weight += char_weight
+    if current:
+        lines.append(current)
+    return lines
+
+
+def _pdf_tounicode(code_points: Iterable[int]) -> bytes:
+    """
+    CID 即 Unicode，只列出文件用到的字元：涵蓋整個 BMP 的對照表會讓 pypdf 每頁重新解析數萬筆對應，
+    量到的是 CMap 解析而不是文字抽取。連續的 code point 合併成 bfrange，其餘為 bfchar。
+    """
+    ranges: List[Tuple[int, int]] = []
+    for code in sorted(set(code_points)):
+        # bfrange 不可跨越低位元組邊界
+        if ranges and code == ranges[-1][1] + 1 and code & 0xFF:
+            ranges[-1] = (ranges[-1][0], code)
+        else:
+            ranges.append((code, code))
+    chars = [f"<{start:04X}> <{start:04X}>" for start, end in ranges if start == end]
+    spans = [f"<{start:04X}> <{end:04X}> <{start:04X}>" for start, end in ranges if start != end]
+    sections = []
+    # 每個 begin...end 區段最多 100 筆
+    for entries, keyword in ((chars, "bfchar"), (spans, "bfrange")):
+        for offset in range(0, len(entries), 100):
+            chunk = entries[offset : offset + 100]
+            sections.append(f"{len(chunk)} begin{keyword}\n" + "\n".join(chunk) + f"\nend{keyword}\n")
+    return (
+        "/CIDInit /ProcSet findresource begin\n12 dict begin\nbegincmap\n"
+        "/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def\n"
+        "/CMapName /Adobe-Identity-UCS def\n/CMapType 2 def\n"
+        "1 begincodespacerange\n<0000> <FFFF>\nendcodespacerange\n"
+        + "".join(sections)
+        + "endcmap\nCMapName currentdict /CMap defineresource pop\nend\nend\n"
+    ).encode("ascii")
+
+
+def _write_pdf(pages: List[List[str]], path: str) -> None:
+    objects: Dict[int, bytes] = {}
+
+    def stream(data: bytes, extra: str = "") -> bytes:
+        compressed = zlib.compress(data)
+        return (
+            f"<< /Length {len(compressed)} /Filter /FlateDecode {extra}>>\nstream\n".encode("ascii")
+            + compressed
+            + b"\nendstream"
+        )
+
+    # 1 catalog, 2 pages, 3 font, 4 descendant font, 5 font descriptor, 6 ToUnicode，其後為各頁
+    objects[3] = b"<< /Type /Font /Subtype /Type0 /BaseFont /SyntheticCJK /Encoding /Identity-H /DescendantFonts [4 0 R] /ToUnicode 6 0 R >>"
+    objects[4] = (
+        b"<< /Type /Font /Subtype /CIDFontType2 /BaseFont /SyntheticCJK "
+        b"/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> "
+        b"/FontDescriptor 5 0 R /DW 1000 /CIDToGIDMap /Identity >>"
+    )
+    objects[5] = (
+        b"<< /Type /FontDescriptor /FontName /SyntheticCJK /Flags 4 /FontBBox [0 -200 1000 900] "
+        b"/ItalicAngle 0 /Ascent 880 /Descent -120 /CapHeight 700 /StemV 80 >>"
+    )
+    objects[6] = stream(
+        _pdf_tounicode(ord(ch) for paragraphs in pages for text in paragraphs for ch in text if ord(ch) <= 0xFFFF)
+    )
+
+    kids = []
+    next_id = 7
+    for paragraphs in pages:
+        lines: List[str] = []
+        for text in paragraphs:
+            lines.extend(_wrap(text, 42))
+            lines.append("")
+        ops = ["BT", "/F1 11 Tf", "14 TL", "50 800 Td"]
+        for line in lines[:54]:
+            encoded = "".join(f"{ord(ch):04X}" for ch in line if ord(ch) <= 0xFFFF)
+            ops.append(f"<{encoded}> Tj T*")
+        ops.append("ET")
+        content_id, page_id = next_id, next_id + 1
+        next_id += 2
+        objects[content_id] = stream("\n".join(ops).encode("ascii"))
+        objects[page_id] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        ).encode("ascii")
+        kids.append(f"{page_id} 0 R")
+
+    objects[1] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode("ascii")
+
+    with open(path, "wb") as handle:
+        handle.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+        offsets: Dict[int, int] = {}
+        for obj_id in sorted(objects):
+            offsets[obj_id] = handle.tell()
+            handle.write(f"{obj_id} 0 obj\n".encode("ascii") + objects[obj_id] + b"\nendobj\n")
+        xref = handle.tell()
+        size = max(objects) + 1
+        handle.write(f"xref\n0 {size}\n0000000000 65535 f \n".encode("ascii"))
+        for obj_id in range(1, size):
+            handle.write(f"{offsets[obj_id]:010d} 00000 n \n".encode("ascii"))
+        handle.write(f"trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("ascii"))
+
+
+# writer 輸出改變時遞增，避免沿用舊語料目錄中的檔案（v2：PDF 的 ToUnicode 只含用到的字元）
+_WRITER_REVISIONS = {"pdf": "_v2"}
+
+_WRITERS = {
+    "pdf": _write_pdf,
+    "docx": _write_docx,
+    "pptx": _write_pptx,
+    "md": _write_md,
+    "txt": _write_txt,
+}
+
+
+def write_document(spec: CorpusSpec, fmt: str, out_dir: str) -> str:
+    """寫出單一文件；同樣的 spec 已存在時直接沿用。"""
+    if fmt not in _WRITERS:
+        raise ValueError(f"不支援的格式：{fmt}（可用：{', '.join(FORMATS)}）")
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"{spec.stem}{_WRITER_REVISIONS.get(fmt, '')}.{fmt}")
+    if not os.path.exists(path):
+        tmp = f"{path}.tmp.{fmt}"
+        _WRITERS[fmt](generate_pages(spec), tmp)
+        os.replace(tmp, path)
+    return path
+
+
+def build_corpus(
+    out_dir: str,
+    page_counts: Sequence[int] = (20,),
+    langs: Sequence[str] = LANGS,
+    formats: Sequence[str] = FORMATS,
+    paragraphs_per_page: int = 4,
+    seed: int = 0,
+) -> List[str]:
+    paths = []
+    for pages in page_counts:
+        for lang in langs:
+            spec = CorpusSpec(pages=pages, lang=lang, paragraphs_per_page=paragraphs_per_page, seed=seed)
+            for fmt in formats:
+                paths.append(write_document(spec, fmt, out_dir))
+    return paths
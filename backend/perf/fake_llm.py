@@ -0,0 +1,252 @@
+"""
+Deterministic OpenAI-compatible stand-in for offline load tests.
+
+只實作 SummaryEngine / LLMClient 會用到的 `POST /v1/chat/completions`（與 `GET /v1/models`）：
+- 頁面 prompt 回傳 `{"bullets": [...]}`，全局 prompt 回傳 overview / expansions JSON
+- 內容與延遲由請求內容的雜湊決定，相同輸入每次得到相同輸出
+- 可設定延遲分佈、5xx 錯誤率與 429 注入（錯誤序列由 seed 決定）
+
+    python -m backend fake-llm --port 9100 --latency-ms 800 --latency-dist lognormal --rate-limit-rate 0.05
+
+或在程式內：
+
+    with FakeLLMServer(FakeLLMConfig(latency_ms=50)) as server:
+        base_url = server.base_url   # http://127.0.0.1:<port>/v1
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+_SUBJECTS = ["本季營收", "研發團隊", "客戶留存率", "供應鏈成本", "新產品線", "海外市場", "營運效率", "資安風險"]
+_VERBS = ["較去年同期提升", "較上季下降", "維持穩定於", "預計在下半年達到", "已連續三季高於", "需在年底前改善至"]
+_FACTS = ["百分之十二", "三點四億元", "百分之八十五", "兩個百分點", "一點二倍", "四十五天"]
+_TAILS = [
+    "主要來自企業客戶續約與價格調整，建議持續追蹤大型專案的交付進度。",
+    "顯示流程自動化已發揮效果，下一步應把相同作法推廣到其他事業單位。",
+    "但原物料價格波動仍是主要風險，需建立避險機制並每月檢視採購條件。",
+    "管理層已核准額外預算，預期可在兩季內回收投入並改善整體毛利結構。",
+]
+
+
+@dataclass
+class FakeLLMConfig:
+    latency_ms: float = 200.0
+    latency_dist: str = "lognormal"  # fixed / uniform / lognormal
+    latency_sigma: float = 0.5       # lognormal 的 sigma；uniform 為 ±比例
+    error_rate: float = 0.0          # 回傳 500 的比例
+    rate_limit_rate: float = 0.0     # 回傳 429 的比例
+    retry_after: float = 1.0
+    cached_ratio: float = 0.0        # usage 中 prompt token 視為快取命中的比例
+    seed: int = 0
+
+
+def _digest(body: Dict) -> bytes:
+    canonical = json.dumps(body.get("messages", []), ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(f"{body.get('model')}|{canonical}".encode("utf-8")).digest()
+
+
+def _sentence(rng: random.Random) -> str:
+    return f"{rng.choice(_SUBJECTS)}{rng.choice(_VERBS)}{rng.choice(_FACTS)}，{rng.choice(_TAILS)}"
+
+
+def _is_global_prompt(messages: List[Dict]) -> bool:
+    user = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+    return "overview" in user and "expansions" in user
+
+
+def fake_completion_content(messages: List[Dict], rng: random.Random) -> str:
+    if _is_global_prompt(messages):
+        return json.dumps(
+            {
+                "overview": [_sentence(rng) + _sentence(rng) for _ in range(5)],
+                "expansions": {
+                    "key_conclusions": "".join(_sentence(rng) for _ in range(3)) + "〔p.1〕",
+                    "core_data": "".join(_sentence(rng) for _ in range(3)) + "〔p.2〕",
+                    "risks_and_actions": "".join(_sentence(rng) for _ in range(3)) + "〔p.3〕",
+                },
+            },
+            ensure_ascii=False,
+        )
+    return json.dumps({"bullets": [_sentence(rng) for _ in range(4)]}, ensure_ascii=False)
+
+
+def _approx_tokens(text: str) -> int:
+    # 粗估：CJK 約 1 字 1 token，其餘約 4 字元 1 token
+    cjk = sum(1 for ch in text if "一" <= ch <= "鿿")
+    return max(1, cjk + (len(text) - cjk) // 4)
+
+
+class _FakeState:
+    def __init__(self, config: FakeLLMConfig):
+        self.config = config
+        self._lock = threading.Lock()
+        self._fault_rng = random.Random(config.seed)
+        self.stats: Dict[str, int] = {"requests": 0, "ok": 0, "errors": 0, "rate_limited": 0}
+
+    def latency(self, digest: bytes) -> float:
+        cfg = self.config
+        rng = random.Random(digest)
+        base = cfg.latency_ms / 1000
+        if cfg.latency_dist == "fixed":
+            return base
+        if cfg.latency_dist == "uniform":
+            return max(0.0, base * (1 + rng.uniform(-cfg.latency_sigma, cfg.latency_sigma)))
+        # lognormal：latency_ms 為中位數
+        return base * math.exp(rng.gauss(0.0, cfg.latency_sigma))
+
+    def fault(self) -> Optional[int]:
+        with self._lock:
+            self.stats["requests"] += 1
+            roll = self._fault_rng.random()
+        if roll < self.config.rate_limit_rate:
+            return 429
+        if roll < self.config.rate_limit_rate + self.config.error_rate:
+            return 500
+        return None
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "ThreadingHTTPServer"
+
+    def log_message(self, *_args) -> None:  # 壓測時不輸出每筆請求
+        return
+
+    @property
+    def state(self) -> _FakeState:
+        return self.server.fake_state  # type: ignore[attr-defined]
+
+    def _send_json(self, status: int, payload: Dict, headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:  # noqa: N802
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "fake-model", "object": "model"}]})
+        elif self.path.rstrip("/").endswith("/_stats"):
+            self._send_json(200, dict(self.state.stats))
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self) -> None:  # noqa: N802
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b"{}"
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        try:
+            body = json.loads(raw)
+        except ValueError:
+            self._send_json(400, {"error": {"message": "invalid JSON body", "type": "invalid_request_error"}})
+            return
+
+        state = self.state
+        digest = _digest(body)
+        time.sleep(state.latency(digest))
+
+        fault = state.fault()
+        if fault == 429:
+            state.count("rate_limited")
+            self._send_json(
+                429,
+                {"error": {"message": "Rate limit reached (injected)", "type": "rate_limit_error"}},
+                {"Retry-After": f"{state.config.retry_after:g}"},
+            )
+            return
+        if fault == 500:
+            state.count("errors")
+            self._send_json(500, {"error": {"message": "Injected server error", "type": "server_error"}})
+            return
+
+        messages = body.get("messages") or []
+        content = fake_completion_content(messages, random.Random(digest))
+        prompt_tokens = sum(_approx_tokens(m.get("content") or "") for m in messages)
+        completion_tokens = _approx_tokens(content)
+        state.count("ok")
+        self._send_json(
+            200,
+            {
+                "id": f"chatcmpl-fake-{digest.hex()[:24]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model") or "fake-model",
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                    "prompt_tokens_details": {"cached_tokens": int(prompt_tokens * state.config.cached_ratio)},
+                    "completion_tokens_details": {"reasoning_tokens": 0},
+                },
+            },
+        )
+
+
+class FakeLLMServer:
+    """在背景 thread 執行的 fake server；port=0 時自動挑選可用 port。"""
+
+    def __init__(self, config: Optional[FakeLLMConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or FakeLLMConfig()
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake_state = _FakeState(self.config)  # type: ignore[attr-defined]
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        host, port = self._httpd.server_address[:2]
+        return str(host), int(port)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.address
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return dict(self._httpd.fake_state.stats)  # type: ignore[attr-defined]
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self._httpd.serve_forever()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, *_exc) -> None:
+        self.stop()
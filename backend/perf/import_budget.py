@@ -0,0 +1,92 @@
+"""
+Import-time budget check for `backend.app.main`.
+
+在乾淨的子行程內以 `python -X importtime` 匯入 FastAPI app，量測總耗時，
+並確認重量級套件沒有在啟動時被載入。超出預算或出現禁止的模組時回傳非 0。
+
+    python -m backend import-budget --budget-ms 1500
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+DEFAULT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+
+# 這些套件必須延遲到第一次使用時才載入
+HEAVY_MODULES = (
+    "openai",
+    "jieba",
+    "nltk",
+    "langdetect",
+    "wordcloud",
+    "matplotlib",
+    "numpy",
+    "PIL",
+    "graphviz",
+    "pypdf",
+    "pypdfium2",
+    "pdfminer",
+    "docx",
+    "pptx",
+)
+
+_PROBE = (
+    "import json, sys\n"
+    "import backend.app.main\n"
+    "heavy = {heavy!r}\n"
+    "print(json.dumps(sorted(m for m in heavy if m in sys.modules)))\n"
+)
+
+
+def _parse_importtime(stderr: str) -> List[Tuple[int, str]]:
+    """解析 `-X importtime` 輸出（`import time: self | cumulative | module`），回傳 (cumulative_us, module)。"""
+    rows: List[Tuple[int, str]] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        rows.append((int(parts[1].strip()), parts[2].strip()))
+    return rows
+
+
+def measure(cwd: str) -> Dict:
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE.format(heavy=HEAVY_MODULES)],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+    loaded_heavy = json.loads(proc.stdout.strip().splitlines()[-1])
+    slowest = sorted(_parse_importtime(proc.stderr), reverse=True)[:15]
+    return {"wall_ms": wall_ms, "heavy_loaded": loaded_heavy, "slowest": slowest}
+
+
+def run(budget_ms: float = DEFAULT_BUDGET_MS, cwd: str | None = None) -> int:
+    cwd = cwd or os.getcwd()
+    result = measure(cwd)
+    print(f"import backend.app.main: {result['wall_ms']:.0f} ms (budget {budget_ms:.0f} ms)")
+    for cumulative_us, name in result["slowest"]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    if result["heavy_loaded"]:
+        print("[fail] heavy modules imported at startup: " + ", ".join(result["heavy_loaded"]))
+        failed = True
+    if result["wall_ms"] > budget_ms:
+        print("[fail] import time exceeds budget")
+        failed = True
+    if not failed:
+        print("[ok] within budget")
+    return 1 if failed else 0
@@ -0,0 +1,145 @@
+"""
+End-to-end load generator for `/analyze` and `/mindmap`.
+
+以固定並行度對執行中的 API 送出上傳請求，統計延遲百分位數、req/s 與 tokens/s
+（token 數取自 result 事件的 `usage`）。搭配 fake LLM 可完全離線評估效能：
+
+    python -m backend serve --prod &
+    python -m backend loadtest docs/sample.pdf --fake-llm --concurrency 8 --requests 64
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import mimetypes
+import os
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+from backend.perf.stats import summarize
+
+ENDPOINTS = ("analyze", "mindmap")
+
+
+@dataclass
+class LoadConfig:
+    target: str = "http://127.0.0.1:8000"
+    endpoint: str = "analyze"
+    files: Sequence[str] = ()
+    concurrency: int = 4
+    requests: int = 20
+    timeout: float = 600.0
+    form: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class RequestResult:
+    ok: bool
+    latency: float
+    ttfb: float
+    tokens: int = 0
+    error: Optional[str] = None
+
+
+async def _analyze_once(client, config: LoadConfig, path: str) -> RequestResult:
+    started = time.perf_counter()
+    ttfb = 0.0
+    final: Optional[dict] = None
+    with open(path, "rb") as handle:
+        files = {"file": (os.path.basename(path), handle, mimetypes.guess_type(path)[0] or "application/octet-stream")}
+        async with client.stream("POST", f"{config.target}/analyze", data=config.form, files=files) as response:
+            if response.status_code != 200:
+                body = (await response.aread()).decode("utf-8", "ignore")
+                return RequestResult(False, time.perf_counter() - started, 0.0, error=f"HTTP {response.status_code}: {body[:120]}")
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                if not ttfb:
+                    ttfb = time.perf_counter() - started
+                event = json.loads(line)
+                if event.get("type") in {"result", "error"}:
+                    final = event
+    latency = time.perf_counter() - started
+    if final is None:
+        return RequestResult(False, latency, ttfb, error="stream ended without result")
+    if final["type"] == "error":
+        return RequestResult(False, latency, ttfb, error=str(final.get("message"))[:120])
+    usage = (final.get("data") or {}).get("usage") or {}
+    return RequestResult(True, latency, ttfb, tokens=int(usage.get("total_tokens") or 0))
+
+
+async def _mindmap_once(client, config: LoadConfig, path: str) -> RequestResult:
+    started = time.perf_counter()
+    with open(path, "rb") as handle:
+        files = {"file": (os.path.basename(path), handle, mimetypes.guess_type(path)[0] or "application/octet-stream")}
+        response = await client.post(f"{config.target}/mindmap", data=config.form, files=files)
+    latency = time.perf_counter() - started
+    if response.status_code != 200:
+        return RequestResult(False, latency, latency, error=f"HTTP {response.status_code}: {response.text[:120]}")
+    return RequestResult(True, latency, latency)
+
+
+async def run_load(config: LoadConfig) -> Dict:
+    import httpx
+
+    if config.endpoint not in ENDPOINTS:
+        raise ValueError(f"endpoint 僅支援 {', '.join(ENDPOINTS)}")
+    if not config.files:
+        raise ValueError("至少需要一個上傳檔案")
+    send = _analyze_once if config.endpoint == "analyze" else _mindmap_once
+
+    results: List[RequestResult] = []
+    next_index = 0
+    limits = httpx.Limits(max_connections=config.concurrency, max_keepalive_connections=config.concurrency)
+
+    async with httpx.AsyncClient(timeout=config.timeout, limits=limits) as client:
+
+        async def worker() -> None:
+            nonlocal next_index
+            while next_index < config.requests:
+                index = next_index
+                next_index += 1
+                path = config.files[index % len(config.files)]
+                try:
+                    results.append(await send(client, config, path))
+                except Exception as exc:  # pylint: disable=broad-except
+                    results.append(RequestResult(False, 0.0, 0.0, error=f"{type(exc).__name__}: {exc}"))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(max(1, config.concurrency))))
+        elapsed = time.perf_counter() - started
+
+    succeeded = [r for r in results if r.ok]
+    tokens = sum(r.tokens for r in succeeded)
+    return {
+        "endpoint": config.endpoint,
+        "concurrency": config.concurrency,
+        "requests": len(results),
+        "succeeded": len(succeeded),
+        "failed": len(results) - len(succeeded),
+        "elapsed_s": elapsed,
+        "requests_per_s": len(succeeded) / elapsed if elapsed else 0.0,
+        "tokens": tokens,
+        "tokens_per_s": tokens / elapsed if elapsed else 0.0,
+        "latency_s": summarize([r.latency for r in succeeded]),
+        "ttfb_s": summarize([r.ttfb for r in succeeded]),
+        "errors": dict(Counter(r.error for r in results if not r.ok).most_common(10)),
+    }
+
+
+def format_report(report: Dict) -> str:
+    latency = report["latency_s"]
+    ttfb = report["ttfb_s"]
+    lines = [
+        f"{report['endpoint']}: {report['succeeded']}/{report['requests']} ok "
+        f"in {report['elapsed_s']:.1f}s (concurrency {report['concurrency']})",
+        f"  throughput  {report['requests_per_s']:.2f} req/s, {report['tokens_per_s']:.0f} tokens/s",
+        f"  latency     p50 {latency['p50']:.2f}s  p95 {latency['p95']:.2f}s  p99 {latency['p99']:.2f}s  max {latency['max']:.2f}s",
+        f"  first byte  p50 {ttfb['p50']:.2f}s  p95 {ttfb['p95']:.2f}s",
+    ]
+    for message, count in report["errors"].items():
+        lines.append(f"  error x{count}: {message}")
+    return "\n".join(lines)
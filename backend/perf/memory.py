@@ -0,0 +1,182 @@
+"""
+Memory benchmark for the in-memory document representation.
+
+    python -m backend membench --pages 1000 --langs zh --formats txt,pdf
+
+每種表示法都在獨立子行程中建立（避免前一輪的 allocator 快取影響 RSS），回報：
+tracemalloc 尖峰 / 建立完成後仍持有的 bytes，以及 ru_maxrss 相對於 import 完成時的增量。
+
+- legacy：parse_pages 的 PageContent + strip 後的 ClassifiedPage 副本 + joined_text + pydantic Paragraph
+- compact：DocumentText 單一字串 + TextSpan offset view（目前 pipeline 的做法）
+"""
+
+from __future__ import annotations
+
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Optional, Sequence
+
+from backend.perf.corpus import CorpusSpec, write_document
+
+VARIANTS = ("legacy", "compact")
+DEFAULT_FORMATS = ("txt", "md", "pdf")
+
+
+def _build_legacy(path: str, ext: str):
+    from backend.app.models.schemas import Paragraph
+    from backend.app.services.analyze.page_classifier import classify_page
+    from backend.app.services.analyze.page_features import compute_page_features
+    from backend.app.services.analyze.page_parser import parse_pages
+
+    pages = parse_pages(path, ext)
+    features = [compute_page_features(page.text) for page in pages]
+    classified = [classify_page(page.page_number, page.text, feature) for page, feature in zip(pages, features)]
+    joined_text = "\n".join(page.text for page in pages)
+    paragraphs = [
+        Paragraph(index=idx, text=page.text or "", start_char=0, end_char=len(page.text or ""))
+        for idx, page in enumerate(pages)
+    ]
+    return pages, features, classified, joined_text, paragraphs
+
+
+def _build_compact(path: str, ext: str):
+    from backend.app.services.analyze.page_classifier import classify_page
+    from backend.app.services.analyze.page_features import compute_page_features
+    from backend.app.services.analyze.page_parser import parse_document
+
+    document = parse_document(path, ext)
+    features = [compute_page_features(document.page_text(idx)) for idx in range(len(document))]
+    classified = [classify_page(idx + 1, document.page(idx), feature) for idx, feature in enumerate(features)]
+    paragraphs = document.pages()
+    return document, features, classified, document.text, paragraphs
+
+
+_BUILDERS = {"legacy": _build_legacy, "compact": _build_compact}
+
+
+def _max_rss_bytes() -> int:
+    import resource
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 為單位，macOS 以 bytes 為單位
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def measure(path: str, variant: str) -> Dict[str, int]:
+    """在目前行程量測單一表示法；由 run_isolated 在子行程呼叫。"""
+    import tracemalloc
+
+    ext = os.path.splitext(path)[1].lower()
+    builder = _BUILDERS[variant]
+    # 先載入解析器相依套件，讓 RSS 基準不含 import 成本
+    _warm_imports(ext)
+    gc.collect()
+    rss_before = _max_rss_bytes()
+    tracemalloc.start()
+    result = builder(path, ext)
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = _max_rss_bytes()
+    pages = len(result[2])
+    del result
+    return {"pages": pages, "peak_bytes": peak, "retained_bytes": retained, "rss_delta_bytes": rss_after - rss_before}
+
+
+def _warm_imports(ext: str) -> None:
+    from backend.app.services.analyze import page_classifier, page_features, page_parser  # noqa: F401
+
+    try:
+        from backend.app.models import schemas  # noqa: F401
+    except ImportError:
+        pass
+    if ext == ".pdf":
+        import importlib
+
+        from backend.app.services.parsing.pdf_backends import resolve_backend
+
+        importlib.import_module(resolve_backend().module)
+    elif ext == ".docx":
+        import docx  # noqa: F401
+    elif ext == ".pptx":
+        import pptx  # noqa: F401
+
+
+def run_isolated(path: str, variant: str) -> Dict[str, object]:
+    proc = subprocess.run(
+        [sys.executable, "-m", "backend.perf.memory", variant, path],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if proc.returncode != 0:
+        lines = (proc.stderr or proc.stdout).strip().splitlines()
+        return {"skipped": lines[-1] if lines else f"exit {proc.returncode}"}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def _mb(value: int) -> str:
+    return f"{value / (1024 * 1024):8.1f}MB"
+
+
+def _ratio(legacy: Dict[str, object], compact: Dict[str, object], key: str) -> str:
+    before = legacy.get(key) or 0
+    after = compact.get(key) or 0
+    if not before:
+        return "     -"
+    return f"{(1 - after / before) * 100:5.0f}%"
+
+
+def main(
+    page_counts: Sequence[int] = (1000,),
+    langs: Sequence[str] = ("zh",),
+    formats: Sequence[str] = DEFAULT_FORMATS,
+    corpus_dir: Optional[str] = None,
+    json_path: Optional[str] = None,
+) -> int:
+    corpus_dir = corpus_dir or os.path.join(tempfile.gettempdir(), "autonote-membench")
+    rows: List[Dict[str, object]] = []
+    header = f"{'document':<34}{'variant':<9}{'peak':>11}{'retained':>11}{'rss Δ':>11}"
+    print(header)
+    print("-" * len(header))
+    for pages in page_counts:
+        for lang in langs:
+            spec = CorpusSpec(pages=pages, lang=lang)
+            for fmt in formats:
+                try:
+                    path = write_document(spec, fmt, corpus_dir)
+                except ImportError as exc:
+                    print(f"{spec.stem + '.' + fmt:<34}skipped（{exc}）")
+                    continue
+                results = {variant: run_isolated(path, variant) for variant in VARIANTS}
+                name = os.path.basename(path)
+                for variant in VARIANTS:
+                    result = results[variant]
+                    rows.append({"document": name, "variant": variant, **result})
+                    if "skipped" in result:
+                        print(f"{name:<34}{variant:<9}skipped（{result['skipped']}）")
+                        continue
+                    print(
+                        f"{name:<34}{variant:<9}{_mb(result['peak_bytes'])}"
+                        f"{_mb(result['retained_bytes'])}{_mb(result['rss_delta_bytes'])}"
+                    )
+                legacy, compact = results["legacy"], results["compact"]
+                if "skipped" not in legacy and "skipped" not in compact:
+                    print(
+                        f"{'':<34}{'saved':<9}{_ratio(legacy, compact, 'peak_bytes'):>11}"
+                        f"{_ratio(legacy, compact, 'retained_bytes'):>11}{_ratio(legacy, compact, 'rss_delta_bytes'):>11}"
+                    )
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as handle:
+            json.dump(rows, handle, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] not in VARIANTS:
+        raise SystemExit(f"usage: python -m backend.perf.memory {{{','.join(VARIANTS)}}} <path>")
+    print(json.dumps(measure(sys.argv[2], sys.argv[1])))
@@ -0,0 +1,153 @@
+"""
+Compare PDF text extraction backends on speed and character yield.
+
+    python -m backend pdfbench --pages 50,500 --langs zh,en,mixed
+    python -m backend pdfbench reports/*.pdf --repeat 3
+
+合成語料已知原文，取字量以「抽出的非空白字元 / 原文非空白字元」計算；
+自備的 PDF 沒有原文可比，改以各引擎中抽出最多字元者為 100%。
+最後建議取字量不低於最佳值 YIELD_TOLERANCE 以內、總耗時最短的引擎，可直接設為 PDF_BACKEND。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from typing import Dict, List, Optional, Sequence
+
+from backend.perf.bench import _time_runs
+from backend.perf.corpus import CorpusSpec, generate_pages, write_document
+from backend.perf.stats import percentile
+
+# 取字量比最佳引擎少超過 2 個百分點就不推薦，即使比較快
+YIELD_TOLERANCE = 0.02
+
+
+def _visible_chars(text: str) -> int:
+    return sum(1 for char in text if not char.isspace())
+
+
+def _source_chars(spec: CorpusSpec) -> int:
+    return sum(_visible_chars(paragraph) for page in generate_pages(spec) for paragraph in page)
+
+
+def _documents(
+    paths: Sequence[str], page_counts: Sequence[int], langs: Sequence[str], corpus_dir: str
+) -> List[Dict[str, object]]:
+    if paths:
+        return [{"path": path, "source_chars": None} for path in paths]
+    documents = []
+    for pages in page_counts:
+        for lang in langs:
+            spec = CorpusSpec(pages=pages, lang=lang)
+            documents.append({"path": write_document(spec, "pdf", corpus_dir), "source_chars": _source_chars(spec)})
+    return documents
+
+
+def _measure(path: str, backend: str, repeat: int) -> Dict[str, object]:
+    from backend.app.services.parsing.pdf_backends import BACKENDS
+
+    engine = BACKENDS[backend]
+    texts: List[str] = []
+
+    def run() -> None:
+        texts[:] = list(engine.pages(path))
+
+    try:
+        runs = _time_runs(run, repeat)
+    except Exception as exc:  # pylint: disable=broad-except
+        return {"backend": backend, "error": f"{type(exc).__name__}: {exc}"}
+    median = percentile(runs, 50)
+    return {
+        "backend": backend,
+        "pages": len(texts),
+        "empty_pages": sum(1 for text in texts if not text.strip()),
+        "chars": sum(_visible_chars(text) for text in texts),
+        "median_s": median,
+        "pages_per_s": len(texts) / median if median > 0 else 0.0,
+    }
+
+
+def _recommend(totals: Dict[str, Dict[str, float]]) -> Optional[str]:
+    """取字量在最佳值容許範圍內的引擎中，總耗時最短者。"""
+    if not totals:
+        return None
+    best_yield = max(total["yield"] for total in totals.values())
+    eligible = [name for name, total in totals.items() if total["yield"] >= best_yield - YIELD_TOLERANCE]
+    return min(eligible, key=lambda name: totals[name]["seconds"])
+
+
+def main(
+    paths: Sequence[str] = (),
+    page_counts: Sequence[int] = (50,),
+    langs: Sequence[str] = ("zh", "en", "mixed"),
+    backends: Optional[Sequence[str]] = None,
+    repeat: int = 3,
+    corpus_dir: Optional[str] = None,
+    json_path: Optional[str] = None,
+) -> int:
+    from backend.app.services.parsing.pdf_backends import BACKENDS, available_backends
+
+    installed = available_backends()
+    selected = list(backends or BACKENDS)
+    unknown = [name for name in selected if name not in BACKENDS]
+    if unknown:
+        print(f"[pdfbench] 未知的引擎：{', '.join(unknown)}（可用：{', '.join(BACKENDS)}）")
+        return 2
+    for name in selected:
+        if name not in installed:
+            print(f"[pdfbench] {name} 未安裝，略過")
+    selected = [name for name in selected if name in installed]
+    if not selected:
+        print("[pdfbench] 沒有可用的 PDF 引擎")
+        return 1
+
+    corpus_dir = corpus_dir or os.path.join(tempfile.gettempdir(), "autonote-pdfbench")
+    documents = _documents(paths, page_counts, langs, corpus_dir)
+    rows: List[Dict[str, object]] = []
+    totals: Dict[str, Dict[str, float]] = {name: {"seconds": 0.0, "chars": 0, "expected": 0} for name in selected}
+    failed = set()
+
+    header = f"{'document':<38}{'backend':<11}{'median':>10}{'pages/s':>10}{'chars':>10}{'yield':>8}{'empty':>7}"
+    print(header)
+    print("-" * len(header))
+    for document in documents:
+        path = str(document["path"])
+        results = [_measure(path, name, repeat) for name in selected]
+        # 自備文件沒有原文，以抽出最多字元的引擎為基準
+        expected = document["source_chars"] or max((int(r.get("chars", 0)) for r in results), default=0)
+        name = os.path.basename(path)
+        for result in results:
+            backend = str(result["backend"])
+            if "error" in result:
+                failed.add(backend)
+                print(f"{name:<38}{backend:<11}error（{result['error']}）")
+                rows.append({"document": name, **result})
+                continue
+            yield_ratio = result["chars"] / expected if expected else 0.0
+            totals[backend]["seconds"] += result["median_s"]
+            totals[backend]["chars"] += result["chars"]
+            totals[backend]["expected"] += expected
+            rows.append({"document": name, **result, "yield": round(yield_ratio, 4)})
+            print(
+                f"{name:<38}{backend:<11}{result['median_s'] * 1000:8.1f}ms{result['pages_per_s']:10.0f}"
+                f"{result['chars']:>10}{yield_ratio * 100:7.1f}%{result['empty_pages']:>7}"
+            )
+
+    print()
+    summary = {}
+    for backend, total in totals.items():
+        if backend in failed:
+            continue
+        total["yield"] = total["chars"] / total["expected"] if total["expected"] else 0.0
+        summary[backend] = total
+        print(f"{'total':<38}{backend:<11}{total['seconds'] * 1000:8.1f}ms{'':>10}{total['chars']:>10}{total['yield'] * 100:7.1f}%")
+    recommended = _recommend(summary)
+    if recommended:
+        print(f"\n[pdfbench] 建議 PDF_BACKEND={recommended}")
+
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as handle:
+            json.dump({"rows": rows, "recommended": recommended}, handle, ensure_ascii=False, indent=2)
+    return 0